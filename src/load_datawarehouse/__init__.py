@@ -3,7 +3,9 @@ import load_datawarehouse.classes as classes
 import load_datawarehouse.config as config
 import load_datawarehouse.data as data
 import load_datawarehouse.exceptions as exceptions
+import load_datawarehouse.files as files
 import load_datawarehouse.schema as schema
+import load_datawarehouse.upload as upload
 
 # Vendor specific subclasses
 import load_datawarehouse.bigquery as bigquery
@@ -1,12 +1,20 @@
 # print ("bigquery Submodule loaded")
+import asyncio
+from concurrent.futures import Executor
 from datetime import datetime
 import enum
-from typing import Any, Union, Iterable, Mapping, Tuple, Dict, Sequence
+import functools
+import inspect
+import itertools
+import json
+import os
+from typing import Any, Union, Iterable, Mapping, Tuple, Dict, Generator, Sequence
 from collections import OrderedDict
 from warnings import warn
 from load_datawarehouse.schema import is_records
 
 import pandas as pd
+import pyarrow as pa
 
 from load_datawarehouse.api import google, bigquery
 
@@ -15,14 +23,24 @@ from load_datawarehouse.classes import  DataWarehouse, \
                                         QuerySort
 from load_datawarehouse.exceptions import   WarehouseAPINotInstalled, \
                                             WarehouseInvalidInput, \
+                                            WarehouseJournalMismatch, \
+                                            WarehouseRowOversize, \
                                             WarehouseAccessDenied, \
                                             WarehouseTableNotFound, \
                                             WarehouseTableGenericError, \
+                                            WarehouseTableLoadIncomplete, \
                                             WarehouseTableRowsInvalid
 
 import load_datawarehouse.data
-from load_datawarehouse.bigquery.config import BIGQUERY_JSON_BYTES_LIMIT, BIGQUERY_DEFAULT_LOCATION
+import load_datawarehouse.files
+import load_datawarehouse.upload
+from load_datawarehouse.config import STREAM_SCHEMA_SAMPLE_SIZE
+from load_datawarehouse.bigquery.config import BIGQUERY_JSON_BYTES_LIMIT, BIGQUERY_DEFAULT_LOCATION, BIGQUERY_INSERT_ALL_FORMAT, BIGQUERY_STREAMING_LIMITS, \
+                                            BIGQUERY_PERMANENT_ROW_ERROR_REASONS, BIGQUERY_LOAD_JOB_LIMITS, \
+                                            BIGQUERY_PARQUET_LIMITS
 import load_datawarehouse.bigquery.schema
+from load_datawarehouse.bigquery.cache import SchemaCache, SchemaCacheEntry
+from load_datawarehouse.bigquery.schema import FingerprintCache
 
 try:
     from dict_tree import DictionaryTree
@@ -62,6 +80,22 @@ class locations(enum.Enum):
     ASIA_EAST1	            ="asia-east1"
     ASIA_NORTHEAST1	        ="asia-northeast1"
 
+class LoadMethod(enum.Enum):
+    """
+    How load_bigquery_table() sends data to BigQuery.
+    """
+    STREAMING               ="STREAMING"    # Streaming inserts; rows are available immediately, but ingestion is charged.
+    BATCH_JSON              ="BATCH_JSON"   # Load jobs of newline delimited JSON files; free to ingest and not capped by BIGQUERY_JSON_BYTES_LIMIT.
+    BATCH_PARQUET           ="BATCH_PARQUET"# Load jobs of Parquet files; much smaller than JSON, and keeps exact numeric and timestamp types.
+
+class WriteDisposition(enum.Enum):
+    """
+    What a batch load does to existing data in the table.
+    """
+    WRITE_APPEND            ="WRITE_APPEND"
+    WRITE_TRUNCATE          ="WRITE_TRUNCATE"
+    WRITE_EMPTY             ="WRITE_EMPTY"
+
 #=====================================================================================================================================================================
 # google.cloud is installed
 
@@ -118,6 +152,134 @@ if (not isinstance(google, Exception) and \
             table
         )
 
+    def get_bigquery_table_id(
+        client:bigquery.client.Client,
+        table: Union[
+            bigquery.table.Table,
+            bigquery.table.TableReference,
+            bigquery.table.TableListItem,
+            str
+        ],
+    )->str:
+        """
+        Get the fully qualified ID of a BigQuery table, i.e. "project.dataset.table".
+
+        If table is a str without a project, the project of client is used.
+        """
+        if (isinstance(table, str)):
+            _ref = bigquery.table.TableReference.from_string(
+                table,
+                default_project=getattr(client, "project", None),
+            )
+        elif (isinstance(table, bigquery.table.TableReference)):
+            _ref = table
+        else:
+            _ref = table.reference
+
+        return f"{_ref.project}.{_ref.dataset_id}.{_ref.table_id}"
+
+    def get_cached_bigquery_table(
+        client:bigquery.client.Client,
+        table: Union[
+            bigquery.table.Table,
+            bigquery.table.TableReference,
+            bigquery.table.TableListItem,
+            str
+        ],
+        schema_cache:SchemaCache,
+    )->Union[
+        bigquery.table.Table,
+        None,
+    ]:
+        """
+        Get a BigQuery table from schema_cache, returning a Table object with the cached schema,
+        or None if it is not cached or has expired.
+
+        Does not contact cloud servers.
+        """
+        _table_id = get_bigquery_table_id(client, table)
+        _entry = schema_cache.get(_table_id)
+
+        if (_entry is None):
+            return None
+
+        return bigquery.table.Table(
+            _table_id,
+            schema=[
+                bigquery.schema.SchemaField.from_api_repr(_field) \
+                    for _field in _entry.schema
+            ],
+        )
+
+    def cache_bigquery_table(
+        client:bigquery.client.Client,
+        table:bigquery.table.Table,
+        schema_cache:SchemaCache,
+    )->SchemaCacheEntry:
+        """
+        Put the schema of a Table fetched from the cloud into schema_cache, with its etag and last modified time.
+        """
+        return schema_cache.put(
+            get_bigquery_table_id(client, table),
+            [_field.to_api_repr() for _field in table.schema],
+            etag=table.etag,
+            modified=table.modified.isoformat() if (table.modified is not None) else None,
+        )
+
+    def refresh_cached_bigquery_table(
+        client:bigquery.client.Client,
+        table: Union[
+            bigquery.table.Table,
+            bigquery.table.TableReference,
+            bigquery.table.TableListItem,
+            str
+        ],
+        schema_cache:SchemaCache,
+    )->bool:
+        """
+        Check a BigQuery table in schema_cache against the cloud, by its etag and last modified time.
+
+        If they differ, the table was changed outside of this package since it was cached, and it is cached again as it is now;
+        if it no longer exists, it is removed from schema_cache.
+        Returns True if the cached table was out of date.
+        """
+        _table_id = get_bigquery_table_id(client, table)
+        _entry = schema_cache.get(_table_id)
+        _table = get_bigquery_table(client=client, table=_table_id)
+
+        if (isinstance(_table, Exception)):
+            schema_cache.invalidate(_table_id)
+            return _entry is not None
+
+        _modified = _table.modified.isoformat() if (_table.modified is not None) else None
+
+        if (_entry is None or \
+            (_entry.etag, _entry.modified) != (_table.etag, _modified)):
+            cache_bigquery_table(client, _table, schema_cache)
+            return True
+        else:
+            return False
+
+    def invalidate_cached_bigquery_table(
+        client:bigquery.client.Client,
+        table: Union[
+            bigquery.table.Table,
+            bigquery.table.TableReference,
+            bigquery.table.TableListItem,
+            str
+        ],
+    ):
+        """
+        Remove a BigQuery table from every SchemaCache opened in the process, after it has been changed.
+        """
+        try:
+            _table_id = get_bigquery_table_id(client, table)
+        except (ValueError, AttributeError):
+            # No project to qualify the ID with, so it cannot have been cached either
+            return
+
+        SchemaCache.invalidate_all(_table_id)
+
     def get_bigquery_table(
         client:bigquery.client.Client,
         table: Union[
@@ -214,6 +376,7 @@ if (not isinstance(google, Exception) and \
                 table=table,
                 **kwargs,
             )
+            invalidate_cached_bigquery_table(client, _bq_table)
 
             if (not set_expiry_bigquery_table(client, _bq_table, expires)):
                 warn(
@@ -243,6 +406,7 @@ if (not isinstance(google, Exception) and \
         """
 
         table = client.update_table(table, ["expires"])
+        invalidate_cached_bigquery_table(client, table)
         return table
 
     def set_expiry_bigquery_table(
@@ -349,6 +513,7 @@ if (not isinstance(google, Exception) and \
                 table,
                 **kwargs,
             )
+            invalidate_cached_bigquery_table(client, table)
             _return = True
         except google.api_core.exceptions.NotFound as e:
             _return = not_found_ok or WarehouseTableNotFound(f"{table} not found on bigquery.")
@@ -360,7 +525,181 @@ if (not isinstance(google, Exception) and \
 
         return _return
 
-    def load_bigquery_table(
+    def convert_load_exception(
+        exception:Exception,
+        data:Any=None,
+    )->Exception:
+        """
+        Convert an Exception raised during table loading into the corresponding Warehouse Exception.
+        """
+        if (isinstance(exception, (WarehouseJournalMismatch, WarehouseRowOversize))):
+            return exception
+        elif (isinstance(exception, ValueError)):
+            if ("determine schema" in str(exception)):
+                return WarehouseTableRowsInvalid(f"Data schema cannot be determined. Pass schema fields to selected_fields.")
+            else:
+                return WarehouseTableRowsInvalid(f"rows of type({type(data)}) cannot be loaded. Expected iterable of Dicts or Tuples.")
+        elif (isinstance(exception, google.api_core.exceptions.Forbidden)):
+            return WarehouseAccessDenied(
+                f"Access denied for user: {str(exception)}",
+            )
+        else:
+            return WarehouseTableGenericError(
+                f"Exception occured during table loading: {str(exception)}",
+                exception = exception,
+            )
+
+    def get_insert_all_format(
+        skip_invalid_rows:bool=None,
+        ignore_unknown_values:bool=None,
+        template_suffix:str=None,
+    )->load_datawarehouse.data.PayloadFormat:
+        """
+        Get the PayloadFormat of an insertAll request body with these options, as per client.insert_rows();
+        BIGQUERY_INSERT_ALL_FORMAT if there is none.
+
+        The options are part of the payload, so that chunks(encoded=True) includes them in the size of each request.
+        """
+        _options = {}
+
+        if (skip_invalid_rows is not None):
+            _options["skipInvalidRows"] = skip_invalid_rows
+
+        if (ignore_unknown_values is not None):
+            _options["ignoreUnknownValues"] = ignore_unknown_values
+
+        if (template_suffix is not None):
+            _options["templateSuffix"] = template_suffix
+
+        if (not _options):
+            return BIGQUERY_INSERT_ALL_FORMAT
+
+        # {"rows":[...],"skipInvalidRows":true}
+        return BIGQUERY_INSERT_ALL_FORMAT._replace(
+            suffix=b"]," + json.dumps(_options, separators=(",", ":"))[1:].encode("utf-8"),
+        )
+
+    def split_insert_kwargs(
+        **kwargs,
+    )->Tuple[
+        load_datawarehouse.data.PayloadFormat,
+        Dict[str, Any],
+    ]:
+        """
+        Split keyword arguments of client.insert_rows() into the PayloadFormat of the request body, as per get_insert_all_format(),
+        and the keyword arguments of insert_encoded_rows_bigquery_table().
+
+        Raises WarehouseInvalidInput for arguments that encoded inserts do not support, e.g. row_ids or selected_fields.
+        """
+        _payload_format = get_insert_all_format(
+            skip_invalid_rows=kwargs.pop("skip_invalid_rows", None),
+            ignore_unknown_values=kwargs.pop("ignore_unknown_values", None),
+            template_suffix=kwargs.pop("template_suffix", None),
+        )
+
+        _unsupported = set(kwargs) - {"timeout"}
+        if (_unsupported):
+            raise WarehouseInvalidInput(f"{', '.join(sorted(_unsupported))} not supported by streaming inserts.")
+
+        return _payload_format, kwargs
+
+    @functools.lru_cache(maxsize=None)
+    def supports_encoded_inserts(
+        client_class:type,
+    )->bool:
+        """
+        Determines if client_class, usually bigquery.Client, can send a pre-encoded insertAll request body
+        through its private _call_api(), as insert_encoded_rows_bigquery_table() does.
+
+        _call_api() is not part of the public API of the client and may change between versions,
+        so its signature is checked against the call made, once per class.
+        """
+        _call_api = getattr(client_class, "_call_api", None)
+
+        if (not callable(_call_api)):
+            return False
+
+        try:
+            inspect.signature(_call_api).bind(
+                None,                   # self
+                bigquery.DEFAULT_RETRY,
+                span_name=None,
+                span_attributes=None,
+                method="POST",
+                path="",
+                data=b"",
+                content_type="application/json",
+                timeout=None,
+            )
+        except (TypeError, ValueError):
+            return False
+
+        return True
+
+    def insert_encoded_rows_bigquery_table(
+        client:bigquery.client.Client,
+        table: Union[
+            bigquery.table.Table,
+            bigquery.table.TableReference,
+        ],
+        chunk:load_datawarehouse.data.EncodedChunk,
+        retry:google.api_core.retry.Retry=bigquery.DEFAULT_RETRY,
+        timeout:float=None,
+    )->Sequence[dict]:
+        """
+        Stream a pre-encoded chunk into a BigQuery Table.
+
+        This is the equivalent of client.insert_rows(), except that the payload of the chunk,
+        which needs to be in BIGQUERY_INSERT_ALL_FORMAT or get_insert_all_format(), is sent as the request body as-is
+        without serialising the rows again. Every row carries an insertId, so the request can be retried as per retry,
+        as client.insert_rows() does, without the risk of duplicating rows.
+
+        The public API of the client only accepts rows to serialise, so the request is made through client._call_api(),
+        on which client.insert_rows_json() itself is built; it takes care of retries, and of the timeout on the server side too.
+        If the client does not support that, see supports_encoded_inserts(), the payload is decoded
+        and sent through client.insert_rows_json() instead, with the same insertIds and options.
+
+        Parameters:
+        - retry             google.api_core.retry.Retry of the request as a whole, e.g. for connection errors.
+                            Rows that failed to insert are not retried by this; see upload_chunk_bigquery_table().
+        - timeout           Seconds to wait for the request, before any retry.
+
+        Returns the list of insert errors as reported by the API, in the same form as client.insert_rows().
+        """
+
+        if (not supports_encoded_inserts(type(client))):
+            _payload = json.loads(chunk.payload)
+
+            return client.insert_rows_json(
+                table,
+                [ _row["json"] for _row in _payload["rows"] ],
+                row_ids=[ _row.get("insertId", None) for _row in _payload["rows"] ],
+                skip_invalid_rows=_payload.get("skipInvalidRows", None),
+                ignore_unknown_values=_payload.get("ignoreUnknownValues", None),
+                template_suffix=_payload.get("templateSuffix", None),
+                retry=retry,
+                timeout=timeout,
+            )
+
+        _path = f"{table.path}/insertAll"
+
+        _response = client._call_api(
+            retry,
+            span_name="BigQuery.insertRowsJson",
+            span_attributes={"path": _path},
+            method="POST",
+            path=_path,
+            data=chunk.payload,
+            content_type="application/json",
+            timeout=timeout,
+        )
+
+        return [
+            {"index": int(_error["index"]), "errors": _error["errors"]} \
+                for _error in _response.get("insertErrors", ())
+        ]
+
+    def prepare_load_bigquery_table(
         client:bigquery.client.Client,
         table: Union[
             bigquery.table.Table,
@@ -371,6 +710,9 @@ if (not isinstance(google, Exception) and \
         data:Union[
             Iterable[Dict], # records
             pd.DataFrame,   # DataFrame
+            Iterable[pd.DataFrame], # stream of DataFrames
+            pa.Table,       # Arrow; also pa.RecordBatch, pa.RecordBatchReader and Polars DataFrames
+            str,            # path or glob of NDJSON, CSV or Parquet files, or a list of them
         ],
         schema:Iterable[
             Union[
@@ -379,25 +721,59 @@ if (not isinstance(google, Exception) and \
             ],
         ]=None,
         full_schema:bool=False,
-        **kwargs,
-    )->Sequence:
+        arrow:bool=False,
+        processes:int=None,
+        schema_cache:Union[
+            SchemaCache,
+            str,
+        ]=None,
+        fingerprint_cache:FingerprintCache=None,
+    )->Tuple[
+        Iterable[Dict],
+        bigquery.table.Table,
+    ]:
+        """
+        Prepare data and table for load_bigquery_table(), returning (data, table).
+
+        Cleans the data, gets the existing table or creates it with the generated schema if it does not exist.
+        If data is a stream, the returned data is a new stream that must be used in its place.
+        If arrow is True, data is prepared into Arrow (see load_datawarehouse.data.prepare()),
+        and any schema is generated from the Arrow schema rather than the values.
+        A DataFrame otherwise stays a DataFrame with its keys cleaned, and any schema is generated from its dtypes;
+        see load_datawarehouse.bigquery.schema.get_schema_from_dataframe_dtypes().
+        If processes is provided, data is cleaned and encoded in that many processes instead,
+        and the returned data is a stream of encoded rows; any schema is then generated from the first STREAM_SCHEMA_SAMPLE_SIZE records,
+        which are cleaned in this process.
+        If data is a path or glob of local files, they are opened as a stream by load_datawarehouse.files.read_files().
+        If the table already exists, its schema is used as is, and no schema is generated from the data.
+        If schema_cache is provided, as a SchemaCache or the path of its directory, the table is looked up in it first,
+        and only fetched from the cloud if it is not cached or has expired; a fetched or created table is then cached.
+        If fingerprint_cache is provided, any schema generated from records is looked up in it first by their structure;
+        see load_datawarehouse.bigquery.schema.get_schema_from_records().
         """
-        Load data into a BigQuery Table.
 
-        Parameters:
-        - schema            Can be SchemaField or api_repr. If None, schema will be automatically generated from data values.
-        - full_schema       If True, do not attempt to generate schema.
+        if (load_datawarehouse.files.is_path(data)):
+            try:
+                data = load_datawarehouse.files.read_files(data)
+            except (FileNotFoundError, ValueError) as e:
+                raise WarehouseInvalidInput(str(e))
 
-        This currently uses streaming to upload data, which is quite expensive.
+        if (isinstance(schema_cache, (str, os.PathLike))):
+            schema_cache = SchemaCache(schema_cache)
 
-        TODO allow for batch loading as a parameter.
-        """
+        # Look for table, in the cache first
+        if (schema_cache is not None):
+            table_obj = get_cached_bigquery_table(client, table, schema_cache)
+        else:
+            table_obj = None
+
+        if (table_obj is None):
+            table_obj = get_bigquery_table(client=client, table=table)
 
-        # Prepare data - sort out invalid keys and stuff
-        data = load_datawarehouse.data.prepare(data)
+            if (schema_cache is not None and \
+                not isinstance(table_obj, Exception)):
+                cache_bigquery_table(client, table_obj, schema_cache)
 
-        # Look for table
-        table_obj = get_bigquery_table(client=client, table=table)
         _table_exists = not (isinstance(
             table_obj,
             WarehouseTableNotFound,
@@ -405,16 +781,53 @@ if (not isinstance(google, Exception) and \
 
         # print (f"Table {table} {'' if _table_exists else 'DOES NOT '} exists.")
 
-        # Get schema from table if exists
-        if (_table_exists and not schema):
-            schema = table_obj.schema
+        # Create our own schema if schema provided is not full, and there is no table to take it from
+        _generate_schema = not (full_schema or _table_exists)
 
-        # Create our own schema if schema provided is not full
-        if (not full_schema):
+        if (_generate_schema and \
+            isinstance(data, pd.DataFrame) and \
+            not arrow):
+            # DataFrames carry their dtypes, which are lost once they are prepared into records; infer from them first
             schema = load_datawarehouse.bigquery.schema.extract(
                 obj = data,
                 schema = schema,
             )
+            _generate_schema = False
+
+        if (processes):
+            if (_generate_schema):
+                _schema_sample, data = load_datawarehouse.data.peek(data, STREAM_SCHEMA_SAMPLE_SIZE)
+                _schema_sample = load_datawarehouse.data.prepare(_schema_sample, arrow=arrow)
+
+            # Prepare data in other processes - only the encoded rows come back
+            data = load_datawarehouse.data.prepare(data, processes=processes)
+        elif (isinstance(data, pd.DataFrame) and \
+            not arrow):
+            # Kept as a DataFrame, so that it is encoded a block at a time with vectorised chunk boundaries,
+            # rather than turned into records as a whole; see load_datawarehouse.data.encoded_chunks()
+            data = load_datawarehouse.data.clean_keys(data)
+        else:
+            # Prepare data - sort out invalid keys and stuff
+            data = load_datawarehouse.data.prepare(data, arrow=arrow)
+
+        if (_generate_schema):
+            if (processes):
+                # Already sampled
+                pass
+            elif (load_datawarehouse.data.is_arrow(data)):
+                # Arrow data carries its own schema
+                _schema_sample = data
+            elif (load_datawarehouse.data.is_stream(data)):
+                # Only infer from the head of the stream, then put it back in front of the rest
+                _schema_sample, data = load_datawarehouse.data.peek(data, STREAM_SCHEMA_SAMPLE_SIZE)
+            else:
+                _schema_sample = data
+
+            schema = load_datawarehouse.bigquery.schema.extract(
+                obj = _schema_sample,
+                schema = schema,
+                fingerprint_cache = fingerprint_cache,
+            )
 
         # print (schema)
 
@@ -425,37 +838,784 @@ if (not isinstance(google, Exception) and \
                 table=table,
                 schema=schema,
             )
+
+            if (schema_cache is not None and \
+                not isinstance(table, Exception)):
+                cache_bigquery_table(client, table, schema_cache)
         else:
             table = table_obj
 
+        return data, table
+
+    def is_retryable_bigquery_row_error(
+        errors:Sequence[Dict[str, Any]],
+    )->bool:
+        """
+        Determines if a row that failed to insert may succeed if retried, from the list of errors reported by insertAll.
+        """
+        return not any(
+            _error.get("reason", None) in BIGQUERY_PERMANENT_ROW_ERROR_REASONS \
+                for _error in errors
+        )
+
+    def upload_chunk_bigquery_table(
+        client:bigquery.client.Client,
+        table: Union[
+            bigquery.table.Table,
+            bigquery.table.TableReference,
+        ],
+        chunk:load_datawarehouse.data.EncodedChunk,
+        retry:load_datawarehouse.upload.RetryPolicy=load_datawarehouse.upload.DEFAULT_RETRY_POLICY,
+        payload_format:load_datawarehouse.data.PayloadFormat=BIGQUERY_INSERT_ALL_FORMAT,
+        **kwargs,
+    )->load_datawarehouse.upload.ChunkResult:
+        """
+        Stream one EncodedChunk from load_datawarehouse.data.chunks(encoded=True) into a BigQuery Table.
+
+        chunk is in payload_format, and is sent as is; kwargs are passed to insert_encoded_rows_bigquery_table(), e.g. timeout.
+        Rows that failed to insert are retried on their own as per retry, unless they are invalid,
+        re-wrapped with the same insertIds; returns a ChunkResult with the errors of the rows that still failed.
+        """
+        # Retry with the same insertId for each row
+        _rows = tuple(zip(
+            chunk.encoded_rows,
+            chunk.row_ids if (chunk.row_ids is not None) else itertools.repeat(None),
+        ))
+
+        def _insert(_pending_rows):
+            if (_pending_rows is _rows):
+                _chunk = chunk
+            else:
+                _chunk = load_datawarehouse.data.make_encoded_chunk(
+                    [ _row for _row, _row_id in _pending_rows ],
+                    payload_format=payload_format,
+                    row_ids=[ _row_id for _row, _row_id in _pending_rows ] if (chunk.row_ids is not None) else None,
+                )
+
+            return insert_encoded_rows_bigquery_table(
+                client,
+                table,
+                chunk=_chunk,
+                **kwargs,
+            )
+
+        return load_datawarehouse.upload.insert_with_retries(
+            _insert,
+            _rows,
+            policy=retry,
+            is_retryable=is_retryable_bigquery_row_error,
+        )
+
+    def summarise_load(
+        tally:load_datawarehouse.upload.LoadTally,
+        exception:Exception=None,
+    )->Union[
+        load_datawarehouse.upload.LoadResult,
+        Exception,
+    ]:
+        """
+        Returns the LoadResult of tally if no chunks failed as a whole, otherwise WarehouseTableLoadIncomplete describing them.
+
+        If exception is given, the load stopped part way because of it, e.g. a WarehouseRowOversize while producing chunks;
+        it is returned as-is if no chunk was tallied, otherwise as the exception of WarehouseTableLoadIncomplete,
+        which holds the LoadResult of the chunks that were.
+        """
+        if (exception is not None):
+            if (not tally.chunks):
+                return exception
+
+            return WarehouseTableLoadIncomplete(
+                f"Load stopped after {tally.chunks:,d} chunks: {str(exception)}",
+                exception = exception,
+                chunk_errors = tally.chunk_errors,
+                result = tally.result(),
+            )
+        elif (tally.chunk_errors):
+            return WarehouseTableLoadIncomplete(
+                f"{len(tally.chunk_errors):,d} of {tally.chunks:,d} chunks failed to load; first error: {str(tally.chunk_errors[0].exception)}",
+                exception = tally.chunk_errors[0].exception,
+                chunk_errors = tally.chunk_errors,
+                result = tally.result(),
+            )
+        else:
+            return tally.result()
+
+    def load_file_bigquery_table(
+        client:bigquery.client.Client,
+        table: Union[
+            bigquery.table.Table,
+            bigquery.table.TableReference,
+        ],
+        encoded_file:load_datawarehouse.data.EncodedFile,
+        source_format:str="NEWLINE_DELIMITED_JSON",
+        write_disposition:WriteDisposition=WriteDisposition.WRITE_APPEND,
+        timeout:float=None,
+        delete:bool=True,
+    )->load_datawarehouse.upload.ChunkResult:
+        """
+        Load one file from load_datawarehouse.data.encoded_files() into a BigQuery Table with a load job,
+        then poll the job until it finishes.
+
+        Parameters:
+        - source_format     bigquery.SourceFormat of the file.
+        - write_disposition WriteDisposition of the job.
+        - timeout           Seconds to wait for the job; None to wait indefinitely.
+        - delete            If True, delete the file afterwards, whether the job succeeded or not.
+
+        Raises the Exception if the job failed; the whole file is then not loaded.
+        """
+        _job_config = bigquery.LoadJobConfig(
+            source_format=source_format,
+            write_disposition=WriteDisposition(write_disposition).value,
+        )
+
+        if (source_format == bigquery.SourceFormat.PARQUET):
+            # Parquet files carry their own schema, which parquet_files() already made to fit the table.
+            # Without list inference, REPEATED fields would be loaded as RECORDs of list.element.
+            _parquet_options = bigquery.format_options.ParquetOptions()
+            _parquet_options.enable_list_inference = True
+            _job_config.parquet_options = _parquet_options
+        else:
+            _job_config.schema = table.schema
+
+        try:
+            with open(encoded_file.path, "rb") as _fHnd:
+                _job = client.load_table_from_file(
+                    _fHnd,
+                    table,
+                    job_config=_job_config,
+                )
+
+            # This polls the job until it is done, and raises if the job failed.
+            _job.result(timeout=timeout)
+        finally:
+            if (delete):
+                os.remove(encoded_file.path)
+
+        return load_datawarehouse.upload.ChunkResult(
+            rows=encoded_file.rows,
+            retried=0,
+            row_errors=[],
+        )
+
+    def batch_load_bigquery_table(
+        client:bigquery.client.Client,
+        table: Union[
+            bigquery.table.Table,
+            bigquery.table.TableReference,
+        ],
+        data:Iterable[Dict],
+        method:LoadMethod=LoadMethod.BATCH_JSON,
+        write_disposition:WriteDisposition=WriteDisposition.WRITE_APPEND,
+        limits:load_datawarehouse.data.RequestLimits=None,
+        concurrency:int=1,
+        parquet_format:load_datawarehouse.data.ParquetFormat=load_datawarehouse.data.DEFAULT_PARQUET_FORMAT,
+        journal:load_datawarehouse.upload.LoadJournal=None,
+    )->Union[
+        load_datawarehouse.upload.LoadResult,
+        Exception,
+    ]:
+        """
+        Load prepared data into an existing BigQuery Table with load jobs, one per file of up to limits.
+
+        method is either LoadMethod.BATCH_JSON for newline delimited JSON, or LoadMethod.BATCH_PARQUET for Parquet,
+        written in parquet_format with an Arrow schema built from the schema of table.
+        If limits is None, BIGQUERY_LOAD_JOB_LIMITS or BIGQUERY_PARQUET_LIMITS is used respectively.
+
+        Only the first job uses write_disposition, and it has to finish before any other job starts;
+        the rest of the files are appended with up to concurrency jobs in flight.
+        Files already committed to journal are deleted without being loaded; if that includes the first file,
+        write_disposition is not applied again.
+
+        Internal function; use load_bigquery_table(method=...) instead.
+        """
+        method = LoadMethod(method)
+        _files = None
+        _tally = load_datawarehouse.upload.LoadTally()
+        _convert_exception = lambda e: convert_load_exception(e, data)
+
+        if (method is LoadMethod.BATCH_PARQUET):
+            _source_format = bigquery.SourceFormat.PARQUET
+        else:
+            _source_format = bigquery.SourceFormat.NEWLINE_DELIMITED_JSON
+
+        def _load_file(
+            entry:load_datawarehouse.upload.JournalEntry,
+            write_disposition:WriteDisposition=WriteDisposition.WRITE_APPEND,
+        )->load_datawarehouse.upload.ChunkResult:
+            if (entry.committed):
+                os.remove(entry.item.path)
+                return None
+
+            return load_file_bigquery_table(
+                client,
+                table,
+                encoded_file=entry.item,
+                source_format=_source_format,
+                write_disposition=write_disposition,
+            )
+
         try:
-            for _chunk in load_datawarehouse.data.chunks(
+            if (method is LoadMethod.BATCH_PARQUET):
+                _files = load_datawarehouse.data.parquet_files(
+                    data,
+                    schema=load_datawarehouse.bigquery.schema.get_arrow_schema(table.schema),
+                    parquet_format=parquet_format,
+                    limits=limits or BIGQUERY_PARQUET_LIMITS,
+                )
+            else:
+                _files = load_datawarehouse.data.encoded_files(
+                    data,
+                    payload_format=load_datawarehouse.data.NDJSON_FORMAT,
+                    limits=limits or BIGQUERY_LOAD_JOB_LIMITS,
+                )
+
+            _entries = load_datawarehouse.upload.journal_items(
+                _files,
+                rows=lambda _file: _file.rows,
+                journal=journal,
+                digest=load_datawarehouse.data.chunk_digest,
+            )
+
+            _first = next(_entries, None)
+
+            if (_first is not None):
+                try:
+                    _result = _load_file(_first, write_disposition=write_disposition)
+                except Exception as e:
+                    _result = e
+
+                _tally.add_entry(
+                    _first,
+                    _result,
+                    journal=journal,
+                    convert_exception=_convert_exception,
+                )
+
+            for _entry, _result in load_datawarehouse.upload.map_bounded(
+                _load_file,
+                _entries,
+                concurrency=concurrency,
+            ):
+                _tally.add_entry(
+                    _entry,
+                    _result,
+                    journal=journal,
+                    convert_exception=_convert_exception,
+                )
+
+            _return = summarise_load(_tally)
+        except Exception as e:
+            # Errors from writing the files themselves, e.g. WarehouseRowOversize
+            # The chunks already in flight have still been tallied, and committed to journal
+            _return = summarise_load(_tally, exception=convert_load_exception(e, data))
+        finally:
+            if (_files is not None):
+                # Removes the file being written if we stopped early
+                _files.close()
+
+        return _return
+
+    def get_stream_entries_bigquery_table(
+        data:Iterable[Dict],
+        limits:load_datawarehouse.data.RequestLimits=None,
+        payload_format:load_datawarehouse.data.PayloadFormat=BIGQUERY_INSERT_ALL_FORMAT,
+        journal:load_datawarehouse.upload.LoadJournal=None,
+    )->Generator[
+        load_datawarehouse.upload.JournalEntry,
+        None,
+        None
+    ]:
+        """
+        Generator function to cut prepared data into EncodedChunks for streaming inserts, wrapped in JournalEntry;
+        committed chunks with rows that failed are replayed with only those rows. If limits is None, BIGQUERY_STREAMING_LIMITS is used.
+
+        Internal function only, not supported.
+        """
+        yield from load_datawarehouse.upload.journal_items(
+            load_datawarehouse.data.chunks(
                 data,
                 size_limit=BIGQUERY_JSON_BYTES_LIMIT,
-                max_iteration=6
-                ):
+                limits=limits or BIGQUERY_STREAMING_LIMITS,
+                encoded=True,
+                payload_format=payload_format,
+            ),
+            rows=lambda _chunk: _chunk.rows,
+            journal=journal,
+            digest=load_datawarehouse.data.chunk_digest,
+            subset=lambda _chunk, _indices: load_datawarehouse.data.make_encoded_chunk(
+                [_chunk.encoded_rows[_index] for _index in _indices],
+                payload_format=payload_format,
+                start=_chunk.start,
+                row_ids=[_chunk.row_ids[_index] for _index in _indices],
+            ),
+        )
 
-                client.insert_rows(
-                    table,
-                    rows=_chunk,
-                    **kwargs,
+    def stream_load_bigquery_table(
+        client:bigquery.client.Client,
+        table: Union[
+            bigquery.table.Table,
+            bigquery.table.TableReference,
+        ],
+        data:Iterable[Dict],
+        limits:load_datawarehouse.data.RequestLimits=None,
+        concurrency:int=1,
+        retry:load_datawarehouse.upload.RetryPolicy=load_datawarehouse.upload.DEFAULT_RETRY_POLICY,
+        payload_format:load_datawarehouse.data.PayloadFormat=BIGQUERY_INSERT_ALL_FORMAT,
+        journal:load_datawarehouse.upload.LoadJournal=None,
+        **kwargs,
+    )->Union[
+        load_datawarehouse.upload.LoadResult,
+        Exception,
+    ]:
+        """
+        Load prepared data into an existing BigQuery Table with streaming inserts, one per chunk of up to limits.
+
+        Chunks are encoded in payload_format, see get_insert_all_format(), and sent with up to concurrency requests in flight;
+        kwargs are passed to insert_encoded_rows_bigquery_table(). If limits is None, BIGQUERY_STREAMING_LIMITS is used.
+        Chunks already committed to journal are skipped, except for their rows that failed, which are sent again.
+
+        Internal function; use load_bigquery_table(method=LoadMethod.STREAMING) instead.
+        """
+        _tally = load_datawarehouse.upload.LoadTally()
+
+        try:
+            for _entry, _result in load_datawarehouse.upload.map_bounded(
+                load_datawarehouse.upload.skip_committed(
+                    lambda _chunk: upload_chunk_bigquery_table(
+                        client,
+                        table,
+                        chunk=_chunk,
+                        retry=retry,
+                        payload_format=payload_format,
+                        **kwargs,
+                    ),
+                ),
+                get_stream_entries_bigquery_table(
+                    data,
+                    limits=limits,
+                    payload_format=payload_format,
+                    journal=journal,
+                ),
+                concurrency=concurrency,
+            ):
+                _tally.add_entry(
+                    _entry,
+                    _result,
+                    journal=journal,
+                    convert_exception=lambda e: convert_load_exception(e, data),
                 )
 
-            _return = True
-        except ValueError as e:
-            if ("determine schema" in str(e)):
-                _return = WarehouseTableRowsInvalid(f"Data schema cannot be determined. Pass schema fields to selected_fields.")
+            _return = summarise_load(_tally)
+        except Exception as e:
+            # Errors from producing the chunks themselves, e.g. WarehouseRowOversize or WarehouseJournalMismatch
+            # The chunks already in flight have still been tallied, and committed to journal
+            _return = summarise_load(_tally, exception=convert_load_exception(e, data))
+
+        return _return
+
+    def load_bigquery_table(
+        client:bigquery.client.Client,
+        table: Union[
+            bigquery.table.Table,
+            bigquery.table.TableReference,
+            bigquery.table.TableListItem,
+            str
+        ],
+        data:Union[
+            Iterable[Dict], # records
+            pd.DataFrame,   # DataFrame
+            Iterable[pd.DataFrame], # stream of DataFrames
+            pa.Table,       # Arrow; also pa.RecordBatch, pa.RecordBatchReader and Polars DataFrames
+            str,            # path or glob of NDJSON, CSV or Parquet files, or a list of them
+        ],
+        schema:Iterable[
+            Union[
+                Dict[str,str],
+                bigquery.schema.SchemaField,
+            ],
+        ]=None,
+        full_schema:bool=False,
+        encoded:bool=None,
+        limits:load_datawarehouse.data.RequestLimits=None,
+        concurrency:int=1,
+        retry:load_datawarehouse.upload.RetryPolicy=load_datawarehouse.upload.DEFAULT_RETRY_POLICY,
+        method:LoadMethod=LoadMethod.STREAMING,
+        write_disposition:WriteDisposition=WriteDisposition.WRITE_APPEND,
+        arrow:bool=False,
+        parquet_format:load_datawarehouse.data.ParquetFormat=load_datawarehouse.data.DEFAULT_PARQUET_FORMAT,
+        processes:int=None,
+        journal:str=None,
+        schema_cache:Union[
+            SchemaCache,
+            str,
+        ]=None,
+        fingerprint_cache:FingerprintCache=None,
+        **kwargs,
+    )->Union[
+        load_datawarehouse.upload.LoadResult,
+        Exception,
+    ]:
+        """
+        Load data into a BigQuery Table.
+
+        Parameters:
+        - schema            Can be SchemaField or api_repr. If None, schema will be automatically generated from data values.
+        - full_schema       If True, do not attempt to generate schema.
+        - encoded           Deprecated, and ignored with a DeprecationWarning if passed. Streaming inserts are always encoded once
+                            during chunking, and the encoded payloads are sent as-is, so that each request is measured exactly
+                            as it is sent, insertIds included; see insert_encoded_rows_bigquery_table().
+        - limits            RequestLimits profile for each request; chunks are cut at whichever limit is hit first.
+                            If None, BIGQUERY_STREAMING_LIMITS, BIGQUERY_LOAD_JOB_LIMITS or BIGQUERY_PARQUET_LIMITS depending on method.
+        - concurrency       Number of chunks to upload in parallel. Chunks are only produced as upload slots free up,
+                            so no more than concurrency chunks are held in memory.
+                            A failed chunk does not stop the others; WarehouseTableLoadIncomplete is returned
+                            with a ChunkError for each failed chunk.
+        - retry             RetryPolicy for rows that failed to insert. Only the failed rows are retried,
+                            with exponential backoff and jitter; rows rejected as invalid are not retried.
+                            Streaming only.
+        - method            LoadMethod.STREAMING to use streaming inserts, which are charged for but available immediately;
+                            LoadMethod.BATCH_JSON to write data into newline delimited JSON temporary files,
+                            each loaded by a free load job; LoadMethod.BATCH_PARQUET to do the same with Parquet files,
+                            which are much smaller and keep exact types, with nested RECORD and REPEATED fields
+                            mapped from the table schema. retry and kwargs are ignored for batch loads.
+        - write_disposition WriteDisposition of a batch load, e.g. WRITE_TRUNCATE to replace the contents of the table.
+                            Streaming inserts always append.
+        - arrow             If True, data is prepared into a pyarrow Table, or a RecordBatchReader for streams,
+                            instead of records; the schema is then generated from the Arrow schema,
+                            and chunks are zero-copy slices. Arrow data and Polars DataFrames are accepted either way.
+        - parquet_format    ParquetFormat of LoadMethod.BATCH_PARQUET: codec, e.g. "snappy" or "zstd",
+                            row group size, and the cardinality below which strings are dictionary encoded.
+        - processes         If provided, clean and JSON encode data in a pool of this many processes,
+                            see load_datawarehouse.data.prepare_encoded().
+                            Not used by LoadMethod.BATCH_PARQUET, which needs the values rather than JSON.
+        - journal           Path of a local LoadJournal file, to make the load resumable: each chunk or file
+                            that loaded is recorded in it with its offset range, content hash and any rows that failed.
+                            If the load stops part way, running it again with the same data, options and journal
+                            skips the recorded chunks, streams only the rows of them that failed again,
+                            and continues from the first one that did not load; skipped rows are counted in the LoadResult.
+        - schema_cache      SchemaCache, or the path of its directory, to look the table up in before fetching it from the cloud;
+                            see prepare_load_bigquery_table(). If any row fails to load, the cached table is checked against
+                            the cloud by its etag, and cached again if it was changed outside of this package;
+                            see refresh_cached_bigquery_table(). Otherwise it is only fetched again once its entry expires.
+        - fingerprint_cache FingerprintCache of schemas already generated from records, to reuse across loads of batches of the same structure;
+                            see load_datawarehouse.bigquery.schema.get_schema_from_records().
+
+        kwargs are options of streaming inserts, as per client.insert_rows(): skip_invalid_rows, ignore_unknown_values,
+        template_suffix and timeout. Any other raises WarehouseInvalidInput.
+
+        Returns a LoadResult with the number of rows loaded, retried and failed, which evaluates to False if any row failed.
+        If any chunk failed as a whole, WarehouseTableLoadIncomplete is returned instead, with the LoadResult as its result.
+
+        data can be a stream of records or of DataFrames (see load_datawarehouse.data.is_stream()),
+        such as a generator or pd.read_csv(chunksize=...); it is then cleaned, chunked and uploaded lazily with bounded memory.
+        If schema needs to be generated, it is inferred from the first STREAM_SCHEMA_SAMPLE_SIZE records only.
+
+        data can also be the path or glob of local NDJSON, CSV or Parquet files, or a list of them;
+        they are read as a stream in batches, through memory maps for Parquet, so memory scales with the batch size
+        rather than the size of the files. See load_datawarehouse.files.read_files().
+
+        A batch load only fails file by file, so a failed file is reported as a ChunkError and no row errors are given.
+        """
+
+        if (encoded is not None):
+            warn(
+                DeprecationWarning("encoded is deprecated and has no effect; streaming inserts are always encoded during chunking.")
+            )
+
+        # Prepare data and table - sort out invalid keys, schema and stuff
+        data, table = prepare_load_bigquery_table(
+            client=client,
+            table=table,
+            data=data,
+            schema=schema,
+            full_schema=full_schema,
+            arrow=arrow,
+            processes=processes if (LoadMethod(method) is not LoadMethod.BATCH_PARQUET) else None,
+            schema_cache=schema_cache,
+            fingerprint_cache=fingerprint_cache,
+        )
+
+        method = LoadMethod(method)
+
+        if (WriteDisposition(write_disposition) is not WriteDisposition.WRITE_APPEND and \
+            method not in (LoadMethod.BATCH_JSON, LoadMethod.BATCH_PARQUET)):
+            return WarehouseInvalidInput(f"write_disposition {write_disposition} is not supported by {method}.")
+
+        if (method is LoadMethod.STREAMING):
+            try:
+                _payload_format, _insert_kwargs = split_insert_kwargs(**kwargs)
+            except WarehouseInvalidInput as e:
+                return e
+
+        if (isinstance(schema_cache, (str, os.PathLike))):
+            schema_cache = SchemaCache(schema_cache)
+
+        _journal = load_datawarehouse.upload.LoadJournal(journal) if (journal is not None) else None
+
+        try:
+            if (method in (LoadMethod.BATCH_JSON, LoadMethod.BATCH_PARQUET)):
+                _return = batch_load_bigquery_table(
+                    client,
+                    table,
+                    data,
+                    method=method,
+                    write_disposition=write_disposition,
+                    limits=limits,
+                    concurrency=concurrency,
+                    parquet_format=parquet_format,
+                    journal=_journal,
+                )
             else:
-                _return = WarehouseTableRowsInvalid(f"rows of type({type(data)}) cannot be loaded. Expected iterable of Dicts or Tuples.")
-        except google.api_core.exceptions.Forbidden as e:
-            _return = WarehouseAccessDenied(
-                f"Access denied for user: {str(e)}",
-                exception = e,
+                _return = stream_load_bigquery_table(
+                    client,
+                    table,
+                    data,
+                    limits=limits,
+                    concurrency=concurrency,
+                    retry=retry,
+                    payload_format=_payload_format,
+                    journal=_journal,
+                    **_insert_kwargs,
+                )
+        finally:
+            if (_journal is not None):
+                _journal.close()
+
+        if (schema_cache is not None and \
+            (isinstance(_return, Exception) or not _return)):
+            # The table may have changed since it was cached, e.g. its schema; check before the next load relies on it
+            refresh_cached_bigquery_table(client, table, schema_cache)
+
+        return _return
+
+    async def astream_load_bigquery_table(
+        client:bigquery.client.Client,
+        table: Union[
+            bigquery.table.Table,
+            bigquery.table.TableReference,
+        ],
+        data:Iterable[Dict],
+        limits:load_datawarehouse.data.RequestLimits=None,
+        concurrency:int=1,
+        retry:load_datawarehouse.upload.RetryPolicy=load_datawarehouse.upload.DEFAULT_RETRY_POLICY,
+        payload_format:load_datawarehouse.data.PayloadFormat=BIGQUERY_INSERT_ALL_FORMAT,
+        journal:load_datawarehouse.upload.LoadJournal=None,
+        executor:Executor=None,
+        semaphore:asyncio.Semaphore=None,
+        **kwargs,
+    )->Union[
+        load_datawarehouse.upload.LoadResult,
+        Exception,
+    ]:
+        """
+        asyncio version of stream_load_bigquery_table().
+
+        Chunks are produced one at a time in executor as upload slots free up, and each of them is uploaded in executor,
+        with up to concurrency uploads in flight; if semaphore is given, it bounds the uploads in flight
+        across every load sharing it as well.
+
+        Internal function; use aload_bigquery_table(method=LoadMethod.STREAMING) instead.
+        """
+        _loop = asyncio.get_running_loop()
+        _tally = load_datawarehouse.upload.LoadTally()
+
+        async def _upload_entry(_entry):
+            if (_entry.committed):
+                return None
+
+            return await _loop.run_in_executor(
+                executor,
+                functools.partial(
+                    upload_chunk_bigquery_table,
+                    client,
+                    table,
+                    chunk=_entry.item,
+                    retry=retry,
+                    payload_format=payload_format,
+                    **kwargs,
+                ),
             )
+
+        try:
+            async for _entry, _result in load_datawarehouse.upload.amap_bounded(
+                _upload_entry,
+                load_datawarehouse.upload.aiter_in_executor(
+                    get_stream_entries_bigquery_table(
+                        data,
+                        limits=limits,
+                        payload_format=payload_format,
+                        journal=journal,
+                    ),
+                    executor=executor,
+                ),
+                concurrency=concurrency,
+                semaphore=semaphore,
+            ):
+                _tally.add_entry(
+                    _entry,
+                    _result,
+                    journal=journal,
+                    convert_exception=lambda e: convert_load_exception(e, data),
+                )
+
+            _return = summarise_load(_tally)
         except Exception as e:
-            _return = WarehouseTableGenericError(
-                f"Exception occured during table loading: {str(e)}",
-                exception = e,
+            # Errors from producing the chunks themselves, e.g. WarehouseRowOversize or WarehouseJournalMismatch
+            # The chunks already in flight have still been tallied, and committed to journal
+            _return = summarise_load(_tally, exception=convert_load_exception(e, data))
+
+        return _return
+
+    async def aload_bigquery_table(
+        client:bigquery.client.Client,
+        table: Union[
+            bigquery.table.Table,
+            bigquery.table.TableReference,
+            bigquery.table.TableListItem,
+            str
+        ],
+        data:Union[
+            Iterable[Dict], # records
+            pd.DataFrame,   # DataFrame
+            Iterable[pd.DataFrame], # stream of DataFrames
+            pa.Table,       # Arrow; also pa.RecordBatch, pa.RecordBatchReader and Polars DataFrames
+            str,            # path or glob of NDJSON, CSV or Parquet files, or a list of them
+        ],
+        schema:Iterable[
+            Union[
+                Dict[str,str],
+                bigquery.schema.SchemaField,
+            ],
+        ]=None,
+        full_schema:bool=False,
+        encoded:bool=None,
+        limits:load_datawarehouse.data.RequestLimits=None,
+        concurrency:int=1,
+        retry:load_datawarehouse.upload.RetryPolicy=load_datawarehouse.upload.DEFAULT_RETRY_POLICY,
+        method:LoadMethod=LoadMethod.STREAMING,
+        write_disposition:WriteDisposition=WriteDisposition.WRITE_APPEND,
+        arrow:bool=False,
+        parquet_format:load_datawarehouse.data.ParquetFormat=load_datawarehouse.data.DEFAULT_PARQUET_FORMAT,
+        processes:int=None,
+        journal:str=None,
+        schema_cache:Union[
+            SchemaCache,
+            str,
+        ]=None,
+        fingerprint_cache:FingerprintCache=None,
+        executor:Executor=None,
+        semaphore:asyncio.Semaphore=None,
+        **kwargs,
+    )->Union[
+        load_datawarehouse.upload.LoadResult,
+        Exception,
+    ]:
+        """
+        asyncio version of load_bigquery_table(); see that function for the other parameters.
+
+        The BigQuery client is blocking, so every API call and every chunk being produced is run in executor,
+        while the event loop only coordinates them. Many tables can then be loaded concurrently on one event loop,
+        e.g. with asyncio.gather(), sharing executor rather than needing a thread of their own.
+
+        Parameters:
+        - executor          concurrent.futures.Executor to run blocking calls in. If None, the event loop's default executor is used.
+        - semaphore         asyncio.Semaphore shared by concurrent loads, to bound the uploads in flight across all of them;
+                            each load still has no more than concurrency of its own. A batch load holds one slot throughout.
+        """
+        if (encoded is not None):
+            warn(
+                DeprecationWarning("encoded is deprecated and has no effect; streaming inserts are always encoded during chunking.")
+            )
+
+        _loop = asyncio.get_running_loop()
+
+        # Prepare data and table - sort out invalid keys, schema and stuff
+        data, table = await _loop.run_in_executor(
+            executor,
+            functools.partial(
+                prepare_load_bigquery_table,
+                client=client,
+                table=table,
+                data=data,
+                schema=schema,
+                full_schema=full_schema,
+                arrow=arrow,
+                processes=processes if (LoadMethod(method) is not LoadMethod.BATCH_PARQUET) else None,
+                schema_cache=schema_cache,
+                fingerprint_cache=fingerprint_cache,
+            ),
+        )
+
+        method = LoadMethod(method)
+
+        if (WriteDisposition(write_disposition) is not WriteDisposition.WRITE_APPEND and \
+            method not in (LoadMethod.BATCH_JSON, LoadMethod.BATCH_PARQUET)):
+            return WarehouseInvalidInput(f"write_disposition {write_disposition} is not supported by {method}.")
+
+        if (method is LoadMethod.STREAMING):
+            try:
+                _payload_format, _insert_kwargs = split_insert_kwargs(**kwargs)
+            except WarehouseInvalidInput as e:
+                return e
+
+        if (isinstance(schema_cache, (str, os.PathLike))):
+            schema_cache = SchemaCache(schema_cache)
+
+        _journal = load_datawarehouse.upload.LoadJournal(journal) if (journal is not None) else None
+
+        try:
+            if (method in (LoadMethod.BATCH_JSON, LoadMethod.BATCH_PARQUET)):
+                # Load jobs are polled rather than streamed, so the whole batch load can simply run in executor.
+                if (semaphore is not None):
+                    await semaphore.acquire()
+
+                try:
+                    _return = await _loop.run_in_executor(
+                        executor,
+                        functools.partial(
+                            batch_load_bigquery_table,
+                            client,
+                            table,
+                            data,
+                            method=method,
+                            write_disposition=write_disposition,
+                            limits=limits,
+                            concurrency=concurrency,
+                            parquet_format=parquet_format,
+                            journal=_journal,
+                        ),
+                    )
+                finally:
+                    if (semaphore is not None):
+                        semaphore.release()
+            else:
+                _return = await astream_load_bigquery_table(
+                    client,
+                    table,
+                    data,
+                    limits=limits,
+                    concurrency=concurrency,
+                    retry=retry,
+                    payload_format=_payload_format,
+                    journal=_journal,
+                    executor=executor,
+                    semaphore=semaphore,
+                    **_insert_kwargs,
+                )
+        finally:
+            if (_journal is not None):
+                _journal.close()
+
+        if (schema_cache is not None and \
+            (isinstance(_return, Exception) or not _return)):
+            # The table may have changed since it was cached, e.g. its schema; check before the next load relies on it
+            await _loop.run_in_executor(
+                executor,
+                refresh_cached_bigquery_table,
+                client,
+                table,
+                schema_cache,
             )
 
         return _return
@@ -607,6 +1767,43 @@ if (not isinstance(google, Exception) and \
                 raise _table
             else:
                 return cls(_table)
+
+        @classmethod
+        async def anew(
+            cls,
+            table: Union[
+                bigquery.table.Table,
+                bigquery.table.TableReference,
+                bigquery.table.TableListItem,
+                str
+            ],
+            replace:bool=False, # Default to NOT replace existing just in case
+            schema:Iterable[
+                Union[
+                    Dict[str, Any],
+                    bigquery.schema.SchemaField,
+                ],
+            ]=None,
+            expires:Union[
+                datetime,
+                None,
+            ]=None,
+            **kwargs,
+        ):
+            """
+            asyncio version of new(), run in the event loop's default executor.
+            """
+            return await asyncio.get_running_loop().run_in_executor(
+                None,
+                functools.partial(
+                    cls.new,
+                    table,
+                    replace=replace,
+                    schema=schema,
+                    expires=expires,
+                    **kwargs,
+                ),
+            )
         
 
 
@@ -676,9 +1873,88 @@ if (not isinstance(google, Exception) and \
         ):
             pass
 
-        # TODO
-        def load(self):
-            pass
+        def load(
+            self,
+            data:Union[
+                Iterable[Dict], # records
+                pd.DataFrame,   # DataFrame
+                Iterable[pd.DataFrame], # stream of DataFrames
+                pa.Table,       # Arrow; also pa.RecordBatch, pa.RecordBatchReader and Polars DataFrames
+                str,            # path or glob of NDJSON, CSV or Parquet files, or a list of them
+            ],
+            schema:Iterable[
+                Union[
+                    Dict[str, Any],
+                    bigquery.schema.SchemaField,
+                ],
+            ]=None,
+            **kwargs,
+        ):
+            """
+            Load data into the table, creating it if it does not exist.
+
+            See load_bigquery_table() for the parameters.
+            Returns the LoadResult, which evaluates to False if any row failed to load;
+            raises the Exception if the load failed as a whole.
+            """
+
+            _return = load_bigquery_table(
+                client = get_bigquery_client(),
+                table = self.bqtable,
+                data = data,
+                schema = schema,
+                **kwargs,
+            )
+
+            if (isinstance(_return, Exception)):
+                raise _return
+            else:
+                return _return
+
+        async def aload(
+            self,
+            data:Union[
+                Iterable[Dict], # records
+                pd.DataFrame,   # DataFrame
+                Iterable[pd.DataFrame], # stream of DataFrames
+                pa.Table,       # Arrow; also pa.RecordBatch, pa.RecordBatchReader and Polars DataFrames
+                str,            # path or glob of NDJSON, CSV or Parquet files, or a list of them
+            ],
+            schema:Iterable[
+                Union[
+                    Dict[str, Any],
+                    bigquery.schema.SchemaField,
+                ],
+            ]=None,
+            **kwargs,
+        ):
+            """
+            asyncio version of load().
+
+            See aload_bigquery_table() for the parameters; many tables can be loaded concurrently on one event loop,
+            sharing a semaphore to bound their uploads in flight, e.g.
+                _semaphore = asyncio.Semaphore(8)
+                await asyncio.gather(*(_warehouse.aload(_data, semaphore=_semaphore) for _warehouse, _data in ...))
+            """
+
+            _loop = asyncio.get_running_loop()
+            _client = await _loop.run_in_executor(
+                kwargs.get("executor", None),
+                get_bigquery_client,
+            )
+
+            _return = await aload_bigquery_table(
+                client = _client,
+                table = self.bqtable,
+                data = data,
+                schema = schema,
+                **kwargs,
+            )
+
+            if (isinstance(_return, Exception)):
+                raise _return
+            else:
+                return _return
 
         # TODO
         def update(self):
@@ -697,6 +1973,17 @@ if (not isinstance(google, Exception) and \
                 not_found_ok = True,
             )
 
+        async def adelete(
+            self
+        ):
+            """
+            asyncio version of delete(), run in the event loop's default executor.
+            """
+            return await asyncio.get_running_loop().run_in_executor(
+                None,
+                self.delete,
+            )
+
         drop = delete
     
 
@@ -0,0 +1,162 @@
+from collections import namedtuple
+import json
+import os
+import tempfile
+import time
+from typing import Any, Dict, List, Union
+from urllib.parse import quote
+
+from load_datawarehouse.bigquery.config import BIGQUERY_SCHEMA_CACHE_TTL
+
+
+"""
+SchemaCacheEntry is the schema of one table as kept by a SchemaCache:
+- table_id          Fully qualified ID of the table, i.e. "project.dataset.table".
+- schema            List of fields of the table, in api_repr.
+- etag              ETag of the table when its schema was cached; None if not known.
+- modified          Last modified time of the table when its schema was cached, in ISO format; None if not known.
+- cached_at         Epoch time at which the schema was cached.
+"""
+SchemaCacheEntry = namedtuple("SchemaCacheEntry", [
+    "table_id",
+    "schema",
+    "etag",
+    "modified",
+    "cached_at",
+])
+
+
+def get_entry_path(
+    path:str,
+    table_id:str,
+)->str:
+    """
+    Path of the file of table_id in the cache directory at path.
+    """
+    return os.path.join(path, quote(table_id, safe="") + ".json")
+
+def remove_entry(
+    path:str,
+    table_id:str,
+):
+    """
+    Remove the file of table_id from the cache directory at path, if any.
+    """
+    try:
+        os.remove(get_entry_path(path, table_id))
+    except FileNotFoundError:
+        pass
+
+
+class SchemaCache():
+    """
+    Persistent local cache of table schemas, so that repeated loads into the same table do not need to fetch it every time.
+
+    Each table is kept as a file of JSON in the directory at path, named after its fully qualified ID,
+    with its schema in api_repr and the etag and last modified time of the table at the time.
+    Files are replaced atomically, so the same directory can be shared by many processes.
+
+    An entry expires ttl seconds after it was cached. Entries are also invalidated when the table is changed
+    through this package, e.g. by create_bigquery_table() or set_schema_bigquery_table(), in every cache directory
+    opened in the process; tables changed elsewhere are picked up once the entry expires, or once a load into them fails
+    and their etag is found to differ, see load_datawarehouse.bigquery.refresh_cached_bigquery_table().
+
+    Parameters:
+    - path              Directory of the cache; created if it does not exist.
+    - ttl               Seconds for which an entry is valid.
+    """
+    # Directories of every SchemaCache opened in the process; caches are often opened by path for a single load,
+    # so the directories are kept rather than the instances.
+    _paths = set()
+
+    def __init__(
+        self,
+        path:str,
+        ttl:float=BIGQUERY_SCHEMA_CACHE_TTL,
+    ):
+        self.path = os.fspath(path)
+        self.ttl = ttl
+
+        os.makedirs(self.path, exist_ok=True)
+        type(self)._paths.add(os.path.realpath(self.path))
+
+    def entry_path(
+        self,
+        table_id:str,
+    )->str:
+        """
+        Path of the file of table_id.
+        """
+        return get_entry_path(self.path, table_id)
+
+    def get(
+        self,
+        table_id:str,
+    )->Union[
+        SchemaCacheEntry,
+        None,
+    ]:
+        """
+        Get the SchemaCacheEntry of table_id; None if it is not cached, has expired or cannot be read.
+        """
+        try:
+            with open(self.entry_path(table_id), "r") as _fHnd:
+                _entry = SchemaCacheEntry(**json.load(_fHnd))
+        except (OSError, ValueError, TypeError):
+            return None
+
+        if (time.time() - _entry.cached_at > self.ttl):
+            return None
+
+        return _entry
+
+    def put(
+        self,
+        table_id:str,
+        schema:List[Dict[str, Any]],
+        etag:str=None,
+        modified:str=None,
+    )->SchemaCacheEntry:
+        """
+        Cache schema of table_id, in api_repr, replacing any existing entry.
+        """
+        _entry = SchemaCacheEntry(
+            table_id=table_id,
+            schema=list(schema),
+            etag=etag,
+            modified=modified,
+            cached_at=time.time(),
+        )
+
+        _fd, _temp_path = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+
+        try:
+            with os.fdopen(_fd, "w") as _fHnd:
+                json.dump(_entry._asdict(), _fHnd)
+
+            os.replace(_temp_path, self.entry_path(table_id))
+        except Exception:
+            os.remove(_temp_path)
+            raise
+
+        return _entry
+
+    def invalidate(
+        self,
+        table_id:str,
+    ):
+        """
+        Remove the entry of table_id, if any.
+        """
+        remove_entry(self.path, table_id)
+
+    @classmethod
+    def invalidate_all(
+        cls,
+        table_id:str,
+    ):
+        """
+        Remove the entry of table_id from every cache directory opened in the process.
+        """
+        for _path in list(cls._paths):
+            remove_entry(_path, table_id)
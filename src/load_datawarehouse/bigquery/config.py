@@ -1,3 +1,53 @@
+from load_datawarehouse.data import PayloadFormat, RequestLimits
+
 
 BIGQUERY_JSON_BYTES_LIMIT = 20*(2**20)
-BIGQUERY_DEFAULT_LOCATION = "europe-west2"
\ No newline at end of file
+BIGQUERY_DEFAULT_LOCATION = "europe-west2"
+
+# Request body of tabledata.insertAll, with each row wrapped as {"insertId": id, "json": row}.
+# The insertId of every row lets BigQuery deduplicate rows sent again by a retry, as does client.insert_rows().
+BIGQUERY_INSERT_ALL_FORMAT = PayloadFormat(
+    prefix=b'{"rows":[',
+    separator=b",",
+    suffix=b"]}",
+    row_prefix=b'{"insertId":"%s","json":',
+    row_suffix=b"}",
+    row_id_size=32,
+)
+
+# Headroom kept below the 10MB cap of insertAll requests.
+# Payloads are measured exactly as they are sent, envelope and insertIds included (see BIGQUERY_INSERT_ALL_FORMAT);
+# this covers anything else the API may count towards the cap, such as the rest of the HTTP request.
+BIGQUERY_STREAMING_HEADROOM = 500*(10**3)
+
+# Streaming insert limits: insertAll requests are capped at 10MB and 50,000 rows, and each row at 10MB;
+# but Google recommends around 500 rows per request for the best throughput.
+BIGQUERY_STREAMING_LIMITS = RequestLimits(
+    max_bytes=10*(10**6) - BIGQUERY_STREAMING_HEADROOM,
+    max_rows=500,
+    max_row_bytes=10*(10**6) - BIGQUERY_STREAMING_HEADROOM,
+)
+
+# insertAll row error reasons that will fail again if retried.
+# Note that valid rows in the same request as an invalid one are reported with reason "stopped", and should be retried.
+BIGQUERY_PERMANENT_ROW_ERROR_REASONS = (
+    "invalid",
+)
+
+# Batch load job limits: newline delimited JSON rows are capped at 100MB each.
+# Files can be much larger than that; 1GB keeps temporary files manageable and allows files to be loaded in parallel.
+BIGQUERY_LOAD_JOB_LIMITS = RequestLimits(
+    max_bytes=2**30,
+    max_rows=None,
+    max_row_bytes=100*(10**6),
+)
+
+# Batch load job limits for Parquet files: the size is a target for each file, as the compressed size is only known as it is written.
+BIGQUERY_PARQUET_LIMITS = RequestLimits(
+    max_bytes=2**30,
+    max_rows=None,
+    max_row_bytes=None,
+)
+
+# Seconds for which a table schema in a SchemaCache is used without fetching the table again.
+BIGQUERY_SCHEMA_CACHE_TTL = 3600
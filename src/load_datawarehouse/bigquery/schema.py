@@ -1,15 +1,22 @@
 import enum
 from collections import OrderedDict
+from copy import deepcopy
+import itertools
+import json
+import random
+import threading
 from typing import  Any, \
                     Dict, \
                     Iterable, \
                     List, \
+                    Tuple, \
                     Union
 import warnings
 from load_datawarehouse.exceptions import WarehouseAPIFaked, WarehouseInvalidInput
 
 import numpy as np
 import pandas as pd
+import pyarrow as pa
 
 try:
     from dict_tree import DictionaryTree
@@ -25,8 +32,11 @@ except (ImportError, ModuleNotFoundError):
 from load_datawarehouse.api import google, bigquery, bigquery_types
 
 # -- This has not been implemented
-# from load_datawarehouse.config import   MAX_FACTOR_OF_RECORDS_WHICH_ADDS_FIELDS, \
-#                                         MIN_RECORDS_TO_TRIGGER_DIFF_CHECK
+# from load_datawarehouse.config import   MAX_FACTOR_OF_RECORDS_WHICH_ADDS_FIELDS
+from load_datawarehouse.config import   MIN_RECORDS_TO_TRIGGER_DIFF_CHECK, \
+                                        SCHEMA_FINGERPRINT_CACHE_SIZE, \
+                                        SCHEMA_SAMPLE_SIZE
+import load_datawarehouse.data
 import load_datawarehouse.schema
 from load_datawarehouse.schema import ListField, DeconstructedRecords, DeconstructedList, is_records
 
@@ -40,7 +50,7 @@ except (AttributeError, WarehouseAPIFaked) as e:
     _PANDAS_DTYPE_TO_BQ = {
         "bool": "BOOLEAN",
         "datetime64[ns, UTC]": "TIMESTAMP",
-        "datetime64[ns]": "TIMESTAMP",
+        "datetime64[ns]": "DATETIME",
         "float32": "FLOAT",
         "float64": "FLOAT",
         "int8": "INTEGER",
@@ -512,6 +522,206 @@ def get_api_repr_from_record_fields(
 
 
 
+class SchemaInferenceMethod(SchemaFieldProperties):
+    """
+    Which records a schema is inferred from:
+    - FULL              All records.
+    - HEAD              The first SCHEMA_SAMPLE_SIZE records.
+    - RESERVOIR         A random sample of SCHEMA_SAMPLE_SIZE records.
+    - EARLY_STOP        The first records, until MIN_RECORDS_TO_TRIGGER_DIFF_CHECK records in a row added no new fields or types.
+    """
+    FULL = enum.auto()
+    HEAD = enum.auto()
+    RESERVOIR = enum.auto()
+    EARLY_STOP = enum.auto()
+
+def sample_records(
+    obj:List[
+        Dict[str, Any]
+    ],
+    method:SchemaInferenceMethod=SchemaInferenceMethod.EARLY_STOP,
+    sample_size:int=SCHEMA_SAMPLE_SIZE,
+    stable_records:int=MIN_RECORDS_TO_TRIGGER_DIFF_CHECK,
+    validate:bool=True,
+)->List[Dict[str, Any]]:
+    """
+    Select the records of obj to infer a schema from, according to method.
+
+    If validate is True, the records not selected are then checked for any field or type not found in the sample,
+    which is much cheaper than deconstructing them; if there is any, all of obj is returned instead.
+    """
+    method = SchemaInferenceMethod(method)
+
+    if (method is SchemaInferenceMethod.FULL):
+        return obj
+    elif (method is not SchemaInferenceMethod.EARLY_STOP and len(obj) <= sample_size):
+        return obj
+
+    if (method is SchemaInferenceMethod.EARLY_STOP):
+        _sample, _signature = load_datawarehouse.schema.sample_records_until_stable(
+            obj,
+            stable_records=stable_records,
+        )
+        _rest = itertools.islice(obj, len(_sample), None)
+    elif (method is SchemaInferenceMethod.HEAD):
+        _sample = obj[:sample_size]
+        _rest = itertools.islice(obj, sample_size, None)
+    else:
+        _indices = set(random.sample(range(len(obj)), sample_size))
+        _sample = [ _record for _id, _record in enumerate(obj) if (_id in _indices) ]
+        _rest = ( _record for _id, _record in enumerate(obj) if (_id not in _indices) )
+
+    if (validate):
+        if (method is not SchemaInferenceMethod.EARLY_STOP):
+            _signature = set()
+            for _record in _sample:
+                load_datawarehouse.schema.add_signature(_record, _signature)
+
+        if (load_datawarehouse.schema.has_new_signature(_rest, _signature)):
+            return obj
+
+    return _sample
+
+def sample_records_with_fingerprint(
+    obj:List[
+        Dict[str, Any]
+    ],
+    method:SchemaInferenceMethod=SchemaInferenceMethod.EARLY_STOP,
+    sample_size:int=SCHEMA_SAMPLE_SIZE,
+    stable_records:int=MIN_RECORDS_TO_TRIGGER_DIFF_CHECK,
+    validate:bool=True,
+)->Tuple[
+    List[Dict[str, Any]],
+    str,
+]:
+    """
+    Select the records of obj to infer a schema from as per sample_records(), and get the structural fingerprint of all of obj,
+    see load_datawarehouse.schema.fingerprint_records().
+
+    Returns (sample, fingerprint). The fingerprint is taken in the pass over obj that validates the sample, rather than in a pass of its own;
+    with EARLY_STOP, that is also the pass that samples.
+    """
+    method = SchemaInferenceMethod(method)
+
+    if (method is SchemaInferenceMethod.EARLY_STOP):
+        _sample, _sample_signature, _signature = load_datawarehouse.schema.sample_records_with_signature(
+            obj,
+            stable_records=stable_records,
+        )
+    else:
+        _signature = load_datawarehouse.schema.get_records_signature(obj)
+
+        if (method is SchemaInferenceMethod.FULL or len(obj) <= sample_size):
+            _sample, _sample_signature = obj, _signature
+        elif (method is SchemaInferenceMethod.HEAD):
+            _sample = obj[:sample_size]
+        else:
+            _indices = set(random.sample(range(len(obj)), sample_size))
+            _sample = [ _record for _id, _record in enumerate(obj) if (_id in _indices) ]
+
+        if (_sample is not obj):
+            _sample_signature = load_datawarehouse.schema.get_records_signature(_sample)
+
+    if (validate and not _signature.issubset(_sample_signature)):
+        # The records not sampled have a field or type not in the sample
+        _sample = obj
+
+    return _sample, load_datawarehouse.schema.get_signature_fingerprint(_signature)
+
+class FingerprintCache():
+    """
+    Size limited cache of schemas already inferred from records, by the structural fingerprint of the records;
+    see load_datawarehouse.schema.fingerprint_records().
+
+    Batches of the same structure then only need to be fingerprinted, rather than deconstructed and condensed again.
+    The least recently used schema is dropped once maxsize schemas are cached. Safe to share between threads.
+
+    Parameters:
+    - maxsize           Maximum number of schemas to keep.
+    """
+    def __init__(
+        self,
+        maxsize:int=SCHEMA_FINGERPRINT_CACHE_SIZE,
+    ):
+        self.maxsize = maxsize
+        self._schemas = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_key(
+        fingerprint:str,
+        schema:Union[
+            Iterable[
+                bigquery_types.SchemaField,
+            ],
+            Dict,
+        ] = {},
+    )->tuple:
+        """
+        Key of the schema inferred from records of fingerprint; fields already in schema are kept by inference,
+        so schema is part of the key.
+        """
+        if (not schema):
+            return (fingerprint, None)
+        elif (isinstance(schema, dict)):
+            return (fingerprint, json.dumps(schema, sort_keys=True, default=str))
+        else:
+            return (
+                fingerprint,
+                json.dumps(
+                    [
+                        _field.to_api_repr() if (isinstance(_field, bigquery_types.SchemaField)) else _field \
+                            for _field in schema
+                    ],
+                    sort_keys=True,
+                    default=str,
+                ),
+            )
+
+    def get(
+        self,
+        key:tuple,
+    )->Union[
+        List[Dict[str, Any]],
+        None,
+    ]:
+        """
+        Get a copy of the schema of key, or None if it is not cached.
+        """
+        with self._lock:
+            _schema = self._schemas.get(key, None)
+
+            if (_schema is None):
+                return None
+
+            self._schemas.move_to_end(key)
+
+        return deepcopy(_schema)
+
+    def put(
+        self,
+        key:tuple,
+        schema:List[Dict[str, Any]],
+    ):
+        """
+        Cache a copy of schema under key, dropping the least recently used schema if full.
+        """
+        _schema = deepcopy(schema)
+
+        with self._lock:
+            self._schemas[key] = _schema
+            self._schemas.move_to_end(key)
+
+            while (len(self._schemas) > self.maxsize):
+                self._schemas.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._schemas.clear()
+
+    def __len__(self):
+        return len(self._schemas)
+
 def get_schema_from_records(
     obj:Iterable[
         Dict[str, Any]
@@ -522,10 +732,62 @@ def get_schema_from_records(
         ],
         Dict,
     ] = {},
+    method:SchemaInferenceMethod=SchemaInferenceMethod.FULL,
+    sample_size:int=SCHEMA_SAMPLE_SIZE,
+    validate:bool=True,
+    processes:int=None,
+    fingerprint_cache:FingerprintCache=None,
 )->Iterable[Dict[str,Any]]:
-    _deconstructed = load_datawarehouse.schema.deconstruct_records(
-        obj
-    )
+    """
+    Infer the BigQuery Schema in api_repr form from the values of records.
+
+    Parameters:
+    - method            SchemaInferenceMethod to select which records to infer from; see sample_records().
+    - sample_size       Number of records to sample for HEAD and RESERVOIR.
+    - validate          If True, fall back to all records if the others have a field or type not in the sample.
+    - processes         If provided, deconstruct the records in a pool of this many processes;
+                        see load_datawarehouse.schema.deconstruct_records_parallel().
+    - fingerprint_cache FingerprintCache to look the structural fingerprint of the records up in first;
+                        records are only deconstructed if it is not found, and the schema is then cached.
+                        The fingerprint is taken while sampling, see sample_records_with_fingerprint().
+                        Only used if records is a list, and either validate is True or method is FULL,
+                        so that the schema covers every record. If None, the schema is always inferred.
+    """
+    _fingerprint_key = None
+
+    if (isinstance(obj, list) and \
+        fingerprint_cache is not None and \
+        (validate or SchemaInferenceMethod(method) is SchemaInferenceMethod.FULL)):
+        obj, _fingerprint = sample_records_with_fingerprint(
+            obj,
+            method=method,
+            sample_size=sample_size,
+            validate=validate,
+        )
+
+        _fingerprint_key = fingerprint_cache.get_key(_fingerprint, schema)
+        _cached_schema = fingerprint_cache.get(_fingerprint_key)
+
+        if (_cached_schema is not None):
+            return _cached_schema
+    elif (isinstance(obj, list)):
+        obj = sample_records(
+            obj,
+            method=method,
+            sample_size=sample_size,
+            validate=validate,
+        )
+
+    if (processes):
+        _deconstructed = load_datawarehouse.schema.deconstruct_records_parallel(
+            obj,
+            processes=processes,
+        )
+    else:
+        _deconstructed = load_datawarehouse.schema.deconstruct_records(
+            obj,
+            keep_records=False,
+        )
 
     if (isinstance(_deconstructed, load_datawarehouse.schema.DeconstructedRecords)):
         _condensed_schema = load_datawarehouse.schema.condense_record_fields(
@@ -535,7 +797,12 @@ def get_schema_from_records(
             schema=schema,
         )
 
-        return get_api_repr_from_record_fields(_condensed_schema, schema, )
+        _schema = get_api_repr_from_record_fields(_condensed_schema, schema, )
+
+        if (_fingerprint_key is not None):
+            fingerprint_cache.put(_fingerprint_key, _schema)
+
+        return _schema
     elif (isinstance(_deconstructed, load_datawarehouse.schema.DeconstructedList)):
         # Its a simple list
         pass
@@ -545,6 +812,7 @@ def get_schema_from_records(
 class SchemaFromDataframeMethod(SchemaFieldProperties):
     SEARCH_VALUES = enum.auto()
     GOOGLE_NATIVE = enum.auto()
+    DTYPES = enum.auto()        # Column dtypes first; only search the values of columns that need it
 
 def get_schema_from_dataframe(
     dataframe:pd.DataFrame,
@@ -555,10 +823,17 @@ def get_schema_from_dataframe(
         Dict,
     ] = {},
     method:SchemaFromDataframeMethod = SchemaFromDataframeMethod.SEARCH_VALUES,
+    **kwargs,
 )->Iterable[Dict[str,Any]]:
+    """
+    Infer the BigQuery Schema in api_repr form from a DataFrame, with the given SchemaFromDataframeMethod.
+
+    kwargs are passed to the method, e.g. inference_method of SEARCH_VALUES.
+    """
     _method_switch = {
         SchemaFromDataframeMethod.SEARCH_VALUES:get_schema_from_dataframe_search_values,
         SchemaFromDataframeMethod.GOOGLE_NATIVE:get_schema_from_dataframe_google_native,
+        SchemaFromDataframeMethod.DTYPES:get_schema_from_dataframe_dtypes,
     }
     
     return _method_switch.get(
@@ -570,6 +845,7 @@ def get_schema_from_dataframe(
         # Call the function
         dataframe=dataframe,
         schema=schema,
+        **kwargs,
     )
 
 def get_schema_from_dataframe_search_values(
@@ -580,21 +856,181 @@ def get_schema_from_dataframe_search_values(
         ],
         Dict,
     ] = {},
+    inference_method:SchemaInferenceMethod=SchemaInferenceMethod.FULL,
+    sample_size:int=SCHEMA_SAMPLE_SIZE,
+    validate:bool=True,
+    processes:int=None,
 )->Iterable[Dict[str,Any]]:
+    """
+    Infer the BigQuery Schema in api_repr form from a DataFrame, by searching its values as records; see get_schema_from_records().
+
+    The timezone of a value is not part of its type, so datetime64 columns with a timezone are told apart by their dtype,
+    and are TIMESTAMP rather than DATETIME, as per get_bq_type_from_dtype().
+    """
     if (isinstance(dataframe, pd.DataFrame)):
         _records = dataframe.to_dict(
             orient="records",
         )
         
-        return get_schema_from_records(
+        _schema = get_schema_from_records(
                 _records,
                 schema=schema,
+                method=inference_method,
+                sample_size=sample_size,
+                validate=validate,
+                processes=processes,
             )
+
+        _timestamp_fields = {
+            load_datawarehouse.data.clean_field_key(_column) \
+                for _column, _dtype in dataframe.dtypes.items() \
+                    if (isinstance(_dtype, pd.DatetimeTZDtype))
+        }
+
+        return [
+            dict(_field, type=SchemaFieldType.TIMESTAMP.value) \
+                if (_field["name"] in _timestamp_fields and _field["type"] == SchemaFieldType.DATETIME.value) \
+                else _field \
+                    for _field in _schema
+        ]
     else:
         raise WarehouseInvalidInput(
             f"Pandas Dataframe expected; {type(dataframe).__name__} found."
         )
 
+# Results of pd.api.types.infer_dtype() on object columns that map straight to a BigQuery type,
+# as per the rules of guess_bq_dtype(); anything else, e.g. "mixed", is searched value by value.
+_INFERRED_DTYPE_TO_BQ = {
+    "string":               SchemaFieldType.STRING,
+    "bytes":                SchemaFieldType.BYTES,
+    "integer":              SchemaFieldType.INTEGER,
+    "floating":             SchemaFieldType.FLOAT,
+    "mixed-integer-float":  SchemaFieldType.FLOAT,
+    "boolean":              SchemaFieldType.BOOLEAN,
+    "datetime":             SchemaFieldType.DATETIME,
+    "date":                 SchemaFieldType.DATE,
+    "time":                 SchemaFieldType.TIME,
+}
+
+def get_bq_type_from_dtype(
+    dtype:Any,
+)->Union[
+    SchemaFieldType,
+    None,
+]:
+    """
+    Map a pandas dtype to the BigQuery type of its values, as per _PANDAS_DTYPE_TO_BQ and the nullable and Arrow-backed equivalents.
+
+    datetime64 is mapped as get_bq_type_from_arrow() maps Arrow timestamps, whatever its unit:
+    to TIMESTAMP with a timezone, and to DATETIME without one, as a civil time.
+
+    Returns None for object dtypes and anything else that does not tell the type of the values.
+    """
+    if (isinstance(dtype, pd.CategoricalDtype)):
+        return get_bq_type_from_dtype(dtype.categories.dtype)
+    elif (isinstance(dtype, pd.ArrowDtype)):
+        return get_bq_type_from_arrow(dtype.pyarrow_dtype)
+    elif (isinstance(dtype, pd.DatetimeTZDtype)):
+        return SchemaFieldType.TIMESTAMP
+    elif (pd.api.types.is_datetime64_dtype(dtype)):
+        return SchemaFieldType.DATETIME
+    elif (str(dtype) in _PANDAS_DTYPE_TO_BQ):
+        return SchemaFieldType(_PANDAS_DTYPE_TO_BQ[str(dtype)])
+    elif (pd.api.types.is_object_dtype(dtype)):
+        return None
+    elif (pd.api.types.is_bool_dtype(dtype)):
+        return SchemaFieldType.BOOLEAN
+    elif (pd.api.types.is_integer_dtype(dtype)):
+        return SchemaFieldType.INTEGER
+    elif (pd.api.types.is_float_dtype(dtype)):
+        return SchemaFieldType.FLOAT
+    elif (pd.api.types.is_string_dtype(dtype)):
+        return SchemaFieldType.STRING
+    else:
+        return None
+
+def get_schema_from_dataframe_dtypes(
+    dataframe:pd.DataFrame,
+    schema:Union[
+        Iterable[
+            bigquery_types.SchemaField,
+        ],
+        Dict,
+    ] = {},
+    **kwargs,
+)->Iterable[Dict[str,Any]]:
+    """
+    Infer the BigQuery Schema in api_repr form from a DataFrame, column by column, looking at as few values as possible:
+    - columns of a typed dtype, e.g. int64, float64, bool or datetime64, are mapped from the dtype alone;
+    - Arrow-backed columns are mapped from their Arrow type, including lists and structs;
+    - object columns are classified by pd.api.types.infer_dtype(), which is vectorised;
+    - only the remaining columns, e.g. those holding dicts, lists or mixed types, are searched value by value,
+      with get_schema_from_records(); kwargs are passed to it, e.g. inference_method.
+
+    Fields already in schema are kept as they are.
+    """
+    if (not isinstance(dataframe, pd.DataFrame)):
+        raise WarehouseInvalidInput(
+            f"Pandas Dataframe expected; {type(dataframe).__name__} found."
+        )
+
+    _existing_fields = {
+        _field["name"]:_field \
+            for _field in convert_schema_to_api_repr(schema or []) \
+                if (is_api_repr(_field))
+    }
+
+    _fields = {}
+    _search_columns = []
+
+    for _column in dataframe.columns:
+        # This function self-protects against fields having invalid names - but these should have been done at data level before calling this function.
+        _name = load_datawarehouse.data.clean_field_key(_column)
+        _series = dataframe[_column]
+
+        if (_name in _existing_fields):
+            _fields[_name] = _existing_fields[_name]
+            continue
+
+        if (isinstance(_series.dtype, pd.ArrowDtype)):
+            _fields[_name] = get_api_repr_from_arrow_field(pa.field(_name, _series.dtype.pyarrow_dtype))
+            continue
+
+        _type = get_bq_type_from_dtype(_series.dtype)
+
+        if (_type is None):
+            _inferred = pd.api.types.infer_dtype(_series, skipna=True)
+
+            if (_inferred == "empty"):
+                # No values at all
+                _type = SchemaFieldType.STRING
+            else:
+                _type = _INFERRED_DTYPE_TO_BQ.get(_inferred, None)
+
+        if (_type is None):
+            _fields[_name] = None
+            _search_columns.append(_column)
+        else:
+            _fields[_name] = build_api_repr(
+                name = _name,
+                type_= _type,
+                mode = SchemaFieldMode.NULLABLE,
+            )
+
+    if (_search_columns):
+        _searched_fields = get_schema_from_dataframe_search_values(
+            dataframe=dataframe[_search_columns],
+            schema=schema,
+            **kwargs,
+        ) or []
+
+        for _field in _searched_fields:
+            _fields[_field["name"]] = _field
+
+    return [
+        _field for _field in _fields.values() if (_field is not None)
+    ]
+
 def get_schema_from_dataframe_google_native(
     dataframe:pd.DataFrame,
     schema:Union[
@@ -603,6 +1039,7 @@ def get_schema_from_dataframe_google_native(
         ],
         Dict,
     ] = {},
+    **kwargs,
 )->Iterable[Dict[str,Any]]:
     # Internal module of google.cloud.bigquery
     # https://github.com/googleapis/python-bigquery/blob/main/google/cloud/bigquery/_pandas_helpers.py
@@ -612,10 +1049,171 @@ def get_schema_from_dataframe_google_native(
         schema,
     )
 
+def get_bq_type_from_arrow(
+    arrow_type:pa.DataType,
+)->SchemaFieldType:
+    """
+    Map a scalar Arrow type to the BigQuery type it is loaded as.
+    Types without a BigQuery equivalent are loaded as STRING.
+    """
+    if (pa.types.is_dictionary(arrow_type)):
+        return get_bq_type_from_arrow(arrow_type.value_type)
+    elif (pa.types.is_boolean(arrow_type)):
+        return SchemaFieldType.BOOLEAN
+    elif (pa.types.is_integer(arrow_type)):
+        return SchemaFieldType.INTEGER
+    elif (pa.types.is_floating(arrow_type)):
+        return SchemaFieldType.FLOAT
+    elif (pa.types.is_decimal(arrow_type)):
+        # NUMERIC holds up to 38 digits, 9 of which after the decimal point
+        if (arrow_type.precision - arrow_type.scale <= 29 and arrow_type.scale <= 9):
+            return SchemaFieldType.NUMERIC
+        else:
+            return SchemaFieldType.BIGNUMERIC
+    elif (pa.types.is_binary(arrow_type) or pa.types.is_large_binary(arrow_type) or pa.types.is_fixed_size_binary(arrow_type)):
+        return SchemaFieldType.BYTES
+    elif (pa.types.is_timestamp(arrow_type)):
+        # Timestamps without a timezone are civil times, as per BigQuery's own Arrow/Parquet mapping
+        return SchemaFieldType.TIMESTAMP if (arrow_type.tz) else SchemaFieldType.DATETIME
+    elif (pa.types.is_date(arrow_type)):
+        return SchemaFieldType.DATE
+    elif (pa.types.is_time(arrow_type)):
+        return SchemaFieldType.TIME
+    else:
+        return SchemaFieldType.STRING
+
+def get_api_repr_from_arrow_field(
+    field:pa.Field,
+)->Dict[str,Any]:
+    """
+    Build the api_repr of a BigQuery SchemaField from an Arrow field.
+
+    Structs become RECORDs, and lists become REPEATED fields of their value type.
+    """
+    _mode = SchemaFieldMode.NULLABLE
+    _type = field.type
+
+    if (pa.types.is_list(_type) or pa.types.is_large_list(_type) or pa.types.is_fixed_size_list(_type)):
+        _mode = SchemaFieldMode.REPEATED
+        _type = _type.value_type
+
+    if (pa.types.is_struct(_type)):
+        return build_api_repr(
+            name = field.name,
+            type_= SchemaFieldType.RECORD,
+            mode = _mode,
+            fields = [
+                get_api_repr_from_arrow_field(_type.field(_id)) \
+                    for _id in range(_type.num_fields)
+            ],
+        )
+    else:
+        return build_api_repr(
+            name = field.name,
+            type_= get_bq_type_from_arrow(_type),
+            mode = _mode,
+            fields = None,
+        )
+
+def get_schema_from_arrow(
+    arrow_schema:pa.Schema,
+    schema:Union[
+        Iterable[
+            bigquery_types.SchemaField,
+        ],
+        Dict,
+    ] = {},
+)->Iterable[Dict[str,Any]]:
+    """
+    Build the BigQuery Schema in api_repr form from the schema of Arrow data, without looking at any values.
+
+    Fields already in schema are kept as they are; columns not in schema are added after them.
+    """
+    _schema = convert_schema_to_api_repr(schema or [])
+    _existing_fields = set(
+        _field["name"] for _field in _schema if (is_api_repr(_field))
+    )
+
+    return _schema + [
+        get_api_repr_from_arrow_field(_field) \
+            for _field in arrow_schema \
+                if (_field.name not in _existing_fields)
+    ]
+
+_BQ_TYPE_TO_ARROW = {
+    SchemaFieldType.STRING:     pa.string(),
+    SchemaFieldType.BYTES:      pa.binary(),
+    SchemaFieldType.INTEGER:    pa.int64(),
+    SchemaFieldType.FLOAT:      pa.float64(),
+    SchemaFieldType.BOOLEAN:    pa.bool_(),
+    SchemaFieldType.TIMESTAMP:  pa.timestamp("us", tz="UTC"),
+    SchemaFieldType.DATE:       pa.date32(),
+    SchemaFieldType.TIME:       pa.time64("us"),
+    SchemaFieldType.DATETIME:   pa.timestamp("us"),
+    SchemaFieldType.GEOGRAPHY:  pa.string(),
+    SchemaFieldType.NUMERIC:    pa.decimal128(38, 9),
+    SchemaFieldType.BIGNUMERIC: pa.decimal256(76, 38),
+}
+
+def get_arrow_field_from_api_repr(
+    field:Union[
+        Dict[str,Any],
+        bigquery_types.SchemaField,
+    ],
+)->pa.Field:
+    """
+    Build the Arrow field that a BigQuery SchemaField is loaded from; the reverse of get_api_repr_from_arrow_field().
+
+    RECORDs become structs, and REPEATED fields become lists of their type.
+    Types without an Arrow equivalent, such as JSON, are written as strings.
+    """
+    if (isinstance(field, bigquery_types.SchemaField)):
+        field = convert_schema_to_api_repr([field])[0]
+
+    try:
+        # By name, so that aliases such as INT64 are found as well
+        _type = SchemaFieldType[field["type"]]
+    except KeyError as e:
+        _type = SchemaFieldType.STRING
+
+    if (_type is SchemaFieldType.RECORD):
+        _arrow_type = pa.struct([
+            get_arrow_field_from_api_repr(_field) for _field in field.get("fields", ())
+        ])
+    else:
+        _arrow_type = _BQ_TYPE_TO_ARROW[_type]
+
+    _mode = SchemaFieldMode(field.get("mode", SchemaFieldMode.NULLABLE.value) or SchemaFieldMode.NULLABLE.value)
+
+    if (_mode is SchemaFieldMode.REPEATED):
+        # Nullable on the Arrow side, so that missing lists can be written; BigQuery loads them as empty arrays.
+        return pa.field(field["name"], pa.list_(pa.field("element", _arrow_type)))
+    else:
+        return pa.field(field["name"], _arrow_type, nullable=(_mode is not SchemaFieldMode.REQUIRED))
+
+def get_arrow_schema(
+    schema:Iterable[
+        Union[
+            Dict[str,Any],
+            bigquery_types.SchemaField,
+        ]
+    ],
+)->pa.Schema:
+    """
+    Build the pa.Schema that data has to fit to be loaded into a table of the BigQuery schema, e.g. as Parquet.
+    """
+    return pa.schema([
+        get_arrow_field_from_api_repr(_field) for _field in schema
+    ])
+
 def extract(
     obj:Union[
         Iterable[Dict[str,Any]],
         pd.DataFrame,
+        pa.Table,
+        pa.RecordBatch,
+        pa.RecordBatchReader,
+        pa.Schema,
     ],
     schema:Union[
         Iterable[
@@ -623,20 +1221,64 @@ def extract(
         ],
         Dict,
     ] = {},
+    method:SchemaInferenceMethod=SchemaInferenceMethod.EARLY_STOP,
+    sample_size:int=SCHEMA_SAMPLE_SIZE,
+    validate:bool=True,
+    processes:int=None,
+    fingerprint_cache:FingerprintCache=None,
+    dataframe_method:SchemaFromDataframeMethod=SchemaFromDataframeMethod.DTYPES,
 ):
-    if (isinstance(obj, list)):
+    """
+    Infer the BigQuery Schema in api_repr form from data; fields already in schema are kept as they are.
+
+    Arrow data is inferred from its own schema, without looking at any values.
+    DataFrames are inferred as per dataframe_method: by default from their dtypes, only searching the values
+    of the columns that need it, e.g. object columns of dicts; see get_schema_from_dataframe_dtypes().
+    Records, and DataFrames with SchemaFromDataframeMethod.SEARCH_VALUES, are inferred from their values,
+    from the records selected by method; see sample_records().
+    With validate, the rest of the records are checked for new fields or types, and if any is found,
+    the schema is inferred from all records instead, so that no field or type is missed.
+    Records of a structure already seen are not inferred again, but looked up in fingerprint_cache; see get_schema_from_records().
+
+    Parameters:
+    - method            SchemaInferenceMethod to select which records to infer from.
+    - sample_size       Number of records to sample for HEAD and RESERVOIR.
+    - validate          If True, fall back to all records if the others have a field or type not in the sample.
+    - processes         If provided, deconstruct records in a pool of this many processes.
+    - fingerprint_cache FingerprintCache of schemas already inferred from records; if None, records are always inferred.
+    - dataframe_method  SchemaFromDataframeMethod of DataFrames. Both DTYPES and SEARCH_VALUES map datetimes
+                        without a timezone to DATETIME, and with one to TIMESTAMP.
+    """
+    if (isinstance(obj, (pa.Table, pa.RecordBatch, pa.RecordBatchReader))):
+        obj = obj.schema
+
+    if (isinstance(obj, pa.Schema)):
+        return get_schema_from_arrow(
+            obj,
+            schema=schema,
+        )
+    elif (isinstance(obj, list)):
         return get_schema_from_records(
             obj,
             schema=schema,
+            method=method,
+            sample_size=sample_size,
+            validate=validate,
+            processes=processes,
+            fingerprint_cache=fingerprint_cache,
         )
     elif (isinstance(obj, pd.DataFrame)):
         return get_schema_from_dataframe(
             dataframe=obj,
             schema=schema,
-            method=SchemaFromDataframeMethod.SEARCH_VALUES,
+            method=dataframe_method,
+            inference_method=method,
+            sample_size=sample_size,
+            validate=validate,
+            processes=processes,
         )
     else:
-        raise WarehouseInvalidInput(f"List of Dicts or Pandas DataFrame expected, {type(obj).__name__} found.")
+        raise WarehouseInvalidInput(f"List of Dicts, Pandas DataFrame or Arrow data expected, {type(obj).__name__} found.")
 
 if __name__=="__main__":
 
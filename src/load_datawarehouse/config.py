@@ -1,8 +1,52 @@
+"""
+Schema inference:
+with early stopping, records are only deconstructed until MIN_RECORDS_TO_TRIGGER_DIFF_CHECK records in a row
+added no new fields or types; with sampling, SCHEMA_SAMPLE_SIZE records are deconstructed.
+"""
+MIN_RECORDS_TO_TRIGGER_DIFF_CHECK = 50
+SCHEMA_SAMPLE_SIZE = 10000
+
+"""
+Type promotion:
+number of distinct tuples of types whose common type is cached.
+"""
+TYPE_PROMOTION_CACHE_SIZE = 4096
+
+"""
+Schema fingerprints:
+number of distinct structures of records whose inferred schema is cached.
+"""
+SCHEMA_FINGERPRINT_CACHE_SIZE = 1024
+
 """
 Unimplemented variables:
 not currently used.
 
 TODO review if obsolete.
 """
-MIN_RECORDS_TO_TRIGGER_DIFF_CHECK = 50
-MAX_FACTOR_OF_RECORDS_WHICH_ADDS_FIELDS = 0.25
\ No newline at end of file
+MAX_FACTOR_OF_RECORDS_WHICH_ADDS_FIELDS = 0.25
+
+"""
+Streaming:
+when data is a stream of unknown length, schema is inferred from the first records only.
+"""
+STREAM_SCHEMA_SAMPLE_SIZE = 10000
+
+"""
+Key cleaning:
+number of distinct field names, and of distinct sets of keys, whose cleaned versions are cached.
+"""
+KEY_PLAN_CACHE_SIZE = 4096
+
+"""
+Parallel preparation:
+number of rows sent to each process at a time by load_datawarehouse.data.prepare_encoded().
+"""
+PARALLEL_SHARD_SIZE = 10000
+
+"""
+Files:
+local files are read in batches of FILE_BATCH_ROWS rows (Parquet) or blocks of FILE_BLOCK_BYTES bytes (CSV and NDJSON).
+"""
+FILE_BATCH_ROWS = 65536
+FILE_BLOCK_BYTES = 16*(2**20)
@@ -1,15 +1,201 @@
 import os, sys
 
+import base64
+from collections import namedtuple
+from collections.abc import Iterable as IterableABC, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, time
+import functools
+import hashlib
+import itertools
 import json
 import random
 import re
-from typing import Any, Dict, Generator, Iterable, List, Union
+import tempfile
+from typing import Any, Callable, Dict, Generator, Iterable, List, Tuple, Union
+from warnings import warn
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 
-from load_datawarehouse.exceptions import WarehouseRowOversize
+from load_datawarehouse.config import KEY_PLAN_CACHE_SIZE, PARALLEL_SHARD_SIZE
+from load_datawarehouse.exceptions import WarehouseKeyCollision, WarehouseRowOversize
+import load_datawarehouse.upload
 
 
+"""
+PayloadFormat describes how encoded rows are wrapped into a single payload:
+    prefix + row_prefix + row + row_suffix + separator + row_prefix + row + row_suffix + ... + suffix
+
+If row_id_size is not 0, row_prefix contains a %s, which is replaced by an ID of row_id_size ASCII bytes unique to each row;
+see new_row_ids().
+"""
+PayloadFormat = namedtuple("PayloadFormat", [
+    "prefix",
+    "separator",
+    "suffix",
+    "row_prefix",
+    "row_suffix",
+    "row_id_size",
+], defaults=[0])
+
+JSON_ARRAY_FORMAT = PayloadFormat(
+    prefix=b"[",
+    separator=b",",
+    suffix=b"]",
+    row_prefix=b"",
+    row_suffix=b"",
+)
+
+# Newline delimited JSON, as used by batch loads; every row is terminated by a line break.
+NDJSON_FORMAT = PayloadFormat(
+    prefix=b"",
+    separator=b"\n",
+    suffix=b"\n",
+    row_prefix=b"",
+    row_suffix=b"",
+)
+
+"""
+EncodedChunk is what chunks(encoded=True) yields:
+- payload           The ready-to-send bytes, wrapped in the PayloadFormat.
+- rows              Number of rows in the payload.
+- size              Size of payload in bytes.
+- start             Index of the first row of this chunk in the input data.
+- encoded_rows      Tuple of the encoded bytes of each row, without the PayloadFormat wrappers.
+- row_ids           Tuple of the ID of each row in the payload, if the PayloadFormat has row IDs; otherwise None.
+"""
+EncodedChunk = namedtuple("EncodedChunk", [
+    "payload",
+    "rows",
+    "size",
+    "start",
+    "encoded_rows",
+    "row_ids",
+], defaults=[None])
+
+"""
+EncodedFile is what encoded_files() yields:
+- path              Path of the file written; it is for the caller to delete it when done.
+- rows              Number of rows in the file.
+- size              Size of the file in bytes.
+- start             Index of the first row of this file in the input data.
+"""
+EncodedFile = namedtuple("EncodedFile", [
+    "path",
+    "rows",
+    "size",
+    "start",
+])
+
+"""
+RequestLimits is a profile of the limits of a single upload request; chunks are cut at whichever is hit first.
+- max_bytes         Maximum size of a request in bytes.
+- max_rows          Maximum number of rows in a request.
+- max_row_bytes     Maximum size of a single row in bytes; rows above this raise WarehouseRowOversize.
+
+Any of these can be None for no limit. Each platform provides its own default profile in its config module.
+"""
+RequestLimits = namedtuple("RequestLimits", [
+    "max_bytes",
+    "max_rows",
+    "max_row_bytes",
+], defaults=[None, None, None])
+
+"""
+ParquetFormat describes how parquet_files() writes each file:
+- compression       Parquet codec, e.g. "snappy" or "zstd".
+- compression_level Level of the codec; None for the codec's default.
+- row_group_bytes   Target size of each row group in bytes, as held in memory before compression.
+- dictionary_ratio  String and binary columns with no more than this ratio of distinct values to rows are dictionary encoded.
+                    0 disables dictionary encoding, apart from columns that are already dictionaries.
+"""
+ParquetFormat = namedtuple("ParquetFormat", [
+    "compression",
+    "compression_level",
+    "row_group_bytes",
+    "dictionary_ratio",
+], defaults=["snappy", None, 128*(2**20), 0.1])
+
+DEFAULT_PARQUET_FORMAT = ParquetFormat()
+
+
+def json_default(obj:Any)->Any:
+    """
+    Default handler for objects that are not JSON serialisable, for use in encoded payloads.
+
+    Missing values, i.e. pd.NaT, pd.NA and numpy floats that are NaN or infinite, are null;
+    bytes are base64 encoded and temporal types are in ISO format, as expected by most warehouses;
+    everything else is converted by str().
+    """
+    if (obj is pd.NaT or obj is pd.NA):
+        return None
+    elif (isinstance(obj, np.floating)):
+        return float(obj) if (np.isfinite(obj)) else None
+    elif (isinstance(obj, bytes)):
+        return base64.b64encode(obj).decode("ascii")
+    elif (isinstance(obj, (datetime, date, time))):
+        return obj.isoformat()
+    else:
+        return str(obj)
+
+def json_null_non_finite(obj:Any)->Any:
+    """
+    Replace float NaN and infinities in obj, including those nested in dicts and lists, with None.
+
+    These are not valid JSON; this is the same as DataFrame.to_json() does with them.
+    """
+    if (isinstance(obj, float)):
+        return obj if (np.isfinite(obj)) else None
+    elif (isinstance(obj, dict)):
+        return { _key: json_null_non_finite(_value) for _key, _value in obj.items() }
+    elif (isinstance(obj, (list, tuple))):
+        return [ json_null_non_finite(_value) for _value in obj ]
+    else:
+        return obj
+
+class JSONEncoder(json.JSONEncoder):
+    """
+    JSONEncoder that never emits NaN or Infinity, which are not valid JSON and are rejected by warehouse APIs;
+    they are encoded as null instead.
+
+    Data without them, which is the vast majority, is encoded in a single pass at full speed.
+    """
+    def __init__(self, **kwargs):
+        super().__init__(allow_nan=False, **kwargs)
+
+    def encode(self, obj:Any)->str:
+        try:
+            return super().encode(obj)
+        except ValueError:
+            # Out of range float values; encode again without them
+            return super().encode(json_null_non_finite(obj))
+
+# Compact, UTF-8 (not \u escaped) JSON; this is also the format used to measure sizes.
+_json_encoder = JSONEncoder(
+    ensure_ascii=False,
+    separators=(",", ":"),
+    default=json_default,
+)
+
+def utf8_size(text:str)->int:
+    """
+    Size of a str in bytes once UTF-8 encoded.
+
+    ASCII text, which is most of JSON, is measured without encoding at all.
+    """
+    if (text.isascii()):
+        return len(text)
+    else:
+        return len(text.encode("utf-8", errors="surrogatepass"))
+
+
+_PROHIBITED_KEY_CHARACTERS = re.compile(r"\W")
+
+@functools.lru_cache(maxsize=KEY_PLAN_CACHE_SIZE)
 def clean_field_key(key:str)->str:
     """
     Substitute all prohibited characters in field names with an underscore.
@@ -18,53 +204,118 @@ def clean_field_key(key:str)->str:
     As the field names will be used in a NamedTuple, which goes by the syntax:
         NamedTupleClass(field_name1=something, field_name2=something...)
     all field names have to be allowable in python syntax as well.
+
+    Results are cached, as the same field names are cleaned over and over again.
     """
     if (not isinstance(key, str)):
         key = str(key)
-        
-    _prohibited = re.compile(r"\W")
-    return _prohibited.sub("_", key)
 
+    return _PROHIBITED_KEY_CHARACTERS.sub("_", key)
 
-def clean_keys(obj:Any)->Any:
+
+"""
+KeyPlan is how the keys of a dict, or columns of a DataFrame, are renamed by clean_field_key():
+- keys          Tuple of the cleaned keys, in the same order as the original keys.
+- renamed       False if every key is already clean, so the keys can be kept as they are.
+- collisions    Dict of cleaned key to the tuple of original keys that all clean to it, e.g. {"b_1": ("b 1", "b.1")}.
+                Only the value of the last of these keys survives cleaning.
+"""
+KeyPlan = namedtuple("KeyPlan", [
+    "keys",
+    "renamed",
+    "collisions",
+])
+
+@functools.lru_cache(maxsize=KEY_PLAN_CACHE_SIZE)
+def key_plan(keys:Tuple[Any])->KeyPlan:
     """
-    Universal function for cleaning the keys/columns of multiple types of objects.
+    Work out the KeyPlan for a tuple of keys.
+
+    Records usually repeat the same few sets of keys, so plans are cached by the tuple of keys,
+    up to KEY_PLAN_CACHE_SIZE distinct sets; each set of keys is only cleaned once.
+
+    A WarehouseKeyCollision warning is issued when the plan is first made for keys that collide after cleaning.
     """
-    _default = lambda obj: obj
+    _keys = tuple(clean_field_key(_key) for _key in keys)
+
+    _collisions = {}
+    if (len(set(_keys)) < len(_keys)):
+        _originals = {}
+        for _key, _clean_key in zip(keys, _keys):
+            _originals.setdefault(_clean_key, []).append(_key)
+
+        _collisions = {
+            _clean_key:tuple(_original_keys) \
+                for _clean_key, _original_keys in _originals.items() \
+                    if (len(_original_keys) > 1)
+        }
+
+        warn(
+            WarehouseKeyCollision(
+                "Keys collide after cleaning, only the last value of each will be kept: " + \
+                ", ".join(f"{_original_keys} -> {repr(_clean_key)}" for _clean_key, _original_keys in _collisions.items())
+            )
+        )
+
+    return KeyPlan(
+        keys=_keys,
+        renamed=(_keys != tuple(keys)),
+        collisions=_collisions,
+    )
+
 
-    _type_switch = {
-        dict: clean_dict_keys,
-        list: clean_list_keys,
-        pd.DataFrame: clean_dataframe_keys,
-    }
+def clean_keys(obj:Any)->Any:
+    """
+    Universal function for cleaning the keys/columns of multiple types of objects.
 
-    return _type_switch.get(
+    Objects that need no cleaning are returned as-is rather than copied.
+    """
+    return _CLEAN_KEYS_TYPE_SWITCH.get(
         type(obj),
-        _default
+        _clean_keys_default,
     )(
         obj
     )
 
+def _clean_keys_default(obj:Any)->Any:
+    return obj
+
 def clean_dict_keys(dictobj:Dict[Any, Any])->Dict[str, Any]:
     """
     As per clean_field_key(), but takes a dictionary as arguments.
+
+    Keys are renamed by the cached key_plan() of the dict, so only the values are visited for each record.
+    If neither the keys nor any values need cleaning, dictobj itself is returned.
     """
     if (isinstance(dictobj, dict)):
-        return {
-            clean_field_key(_key): clean_keys(_value) \
-                for _key, _value in zip(dictobj, dictobj.values())
-        }
+        _plan = key_plan(tuple(dictobj))
+        _values = dictobj.values()
+        _cleaned_values = [ clean_keys(_value) for _value in _values ]
+
+        if (not _plan.renamed and \
+            all(_cleaned is _value for _cleaned, _value in zip(_cleaned_values, _values))):
+            return dictobj
+
+        return dict(zip(_plan.keys, _cleaned_values))
     else:
         return clean_keys(dictobj)
 
 def clean_list_keys(listobj:List[Any])->List[Any]:
     """
     As per clean_field_key(), but takes an iterable as arguments.
+
+    If no items need cleaning, a list is returned as-is.
     """
     if (isinstance(listobj, (list, tuple))):
-        return [
+        _cleaned_items = [
             clean_keys(_item) for _item in listobj
         ]
+
+        if (isinstance(listobj, list) and \
+            all(_cleaned is _item for _cleaned, _item in zip(_cleaned_items, listobj))):
+            return listobj
+
+        return _cleaned_items
     else:
         return clean_keys(listobj)
 
@@ -79,239 +330,1660 @@ def clean_dataframe_keys(dataframe:pd.DataFrame)->pd.DataFrame:
     """
     dataframe = clean_dataframe_columns(dataframe)
     dataframe = clean_dataframe_values(dataframe)
-    return dataframe # We are muting pd.DataFrame in place so returning this or not does not actually matter
+    return dataframe
+
 
 
+# pd.api.types.infer_dtype() results of object columns that cannot contain dicts or lists.
+_SCALAR_INFERRED_DTYPES = (
+    "empty",
+    "string",
+    "bytes",
+    "floating",
+    "integer",
+    "mixed-integer-float",
+    "decimal",
+    "complex",
+    "categorical",
+    "boolean",
+    "datetime64",
+    "datetime",
+    "date",
+    "timedelta64",
+    "timedelta",
+    "time",
+    "period",
+    "interval",
+)
 
 def clean_dataframe_values(dataframe:pd.DataFrame)->pd.DataFrame:
     """
     Clean up the values of any columns that are Objects in dtype.
 
     e.g. if one column contains dicts as its values, this function will clean the keys of those.
+
+    This works column by column: only object columns which may hold dicts or lists are walked,
+    and only columns that actually changed are replaced, in a shallow copy of dataframe.
+    If nothing needs cleaning, dataframe itself is returned.
     """
-    _object_columns = dataframe.select_dtypes(include='object')
+    _return = dataframe
 
-    def clean_row(row:pd.Series)->pd.Series:
-        return row.apply(func=clean_keys)
+    for _position, _dtype in enumerate(dataframe.dtypes):
+        if (_dtype != object):
+            continue
 
-    _object_columns = _object_columns.apply(
-        clean_row,
-        axis=1,
-    )
+        _column = dataframe.iloc[:, _position]
 
-    dataframe = dataframe.copy()
+        if (pd.api.types.infer_dtype(_column, skipna=True) in _SCALAR_INFERRED_DTYPES):
+            continue
 
-    dataframe.update(
-        other = _object_columns,
-        join="left",
-        overwrite=True,
-    )
+        _values = _column.to_numpy()
+        _cleaned_values = [ clean_keys(_value) for _value in _values ]
 
-    return dataframe
+        if (all(_cleaned is _value for _cleaned, _value in zip(_cleaned_values, _values))):
+            continue
+
+        if (_return is dataframe):
+            _return = dataframe.copy(deep=False)
+
+        _return.isetitem(
+            _position,
+            pd.Series(_cleaned_values, index=dataframe.index, dtype=object),
+        )
+
+    return _return
 
 def clean_dataframe_columns(dataframe:pd.DataFrame)->pd.DataFrame:
     """
     Clean up the name of all columns in a DataFrame.
     """
-    _mapper = {
-        _column:clean_field_key(_column) \
-            for _column in dataframe.columns
-    }
-    return dataframe.rename(_mapper, inplace=False)
+    _plan = key_plan(tuple(dataframe.columns))
 
+    if (not _plan.renamed):
+        return dataframe
 
-def prepare(
+    dataframe = dataframe.copy(deep=False)
+    dataframe.columns = _plan.keys
+    return dataframe
+
+
+_CLEAN_KEYS_TYPE_SWITCH = {
+    dict: clean_dict_keys,
+    list: clean_list_keys,
+    pd.DataFrame: clean_dataframe_keys,
+}
+
+
+def is_polars(obj:Any)->bool:
+    """
+    Determines if obj is a Polars DataFrame, without importing polars.
+    """
+    return type(obj).__module__.split(".")[0] == "polars" and \
+        callable(getattr(obj, "to_arrow", None))
+
+def is_arrow(obj:Any)->bool:
+    """
+    Determines if obj is columnar data that can be used by Arrow without going through Python objects,
+    i.e. a pyarrow Table, RecordBatch, RecordBatchReader or a Polars DataFrame.
+    """
+    return isinstance(obj, (pa.Table, pa.RecordBatch, pa.RecordBatchReader)) or \
+        is_polars(obj)
+
+def clean_arrow_type(arrow_type:pa.DataType)->pa.DataType:
+    """
+    Clean up the names of the fields in a struct type, including structs nested in structs and lists.
+
+    Returns arrow_type itself if no fields need renaming.
+    """
+    if (pa.types.is_struct(arrow_type)):
+        _fields = [ arrow_type.field(_id) for _id in range(arrow_type.num_fields) ]
+        _plan = key_plan(tuple(_field.name for _field in _fields))
+        _types = [ clean_arrow_type(_field.type) for _field in _fields ]
+
+        if (not _plan.renamed and \
+            all(_type is _field.type for _type, _field in zip(_types, _fields))):
+            return arrow_type
+
+        return pa.struct([
+            pa.field(_name, _type, nullable=_field.nullable, metadata=_field.metadata) \
+                for _name, _type, _field in zip(_plan.keys, _types, _fields)
+        ])
+    elif (pa.types.is_list(arrow_type) or pa.types.is_large_list(arrow_type)):
+        _value_type = clean_arrow_type(arrow_type.value_type)
+
+        if (_value_type is arrow_type.value_type):
+            return arrow_type
+
+        return (pa.list_ if (pa.types.is_list(arrow_type)) else pa.large_list)(
+            arrow_type.value_field.with_type(_value_type)
+        )
+    else:
+        return arrow_type
+
+def clean_arrow_schema(schema:pa.Schema)->pa.Schema:
+    """
+    Clean up the names of all columns in an Arrow schema, and of the fields of any structs within.
+
+    Returns schema itself if nothing needs renaming.
+    """
+    _plan = key_plan(tuple(schema.names))
+    _types = [ clean_arrow_type(_field.type) for _field in schema ]
+
+    if (not _plan.renamed and \
+        all(_type is _field.type for _type, _field in zip(_types, schema))):
+        return schema
+
+    return pa.schema(
+        [
+            pa.field(_name, _type, nullable=_field.nullable, metadata=_field.metadata) \
+                for _name, _type, _field in zip(_plan.keys, _types, schema)
+        ],
+        metadata=schema.metadata,
+    )
+
+def _view_arrow_column(
+    column:Union[
+        pa.Array,
+        pa.ChunkedArray,
+    ],
+    arrow_type:pa.DataType,
+)->Union[
+    pa.Array,
+    pa.ChunkedArray,
+]:
+    """
+    Zero-copy view of column as arrow_type, which has to have the same memory layout, e.g. a struct with renamed fields.
+
+    Internal function only, not supported.
+    """
+    if (column.type is arrow_type):
+        return column
+    elif (isinstance(column, pa.ChunkedArray)):
+        return pa.chunked_array(
+            [ _chunk.view(arrow_type) for _chunk in column.chunks ],
+            type=arrow_type,
+        )
+    else:
+        return column.view(arrow_type)
+
+def clean_arrow_keys(
     data:Union[
-        Iterable[Dict[str,str]],
-        pd.DataFrame
+        pa.Table,
+        pa.RecordBatch,
+        pa.RecordBatchReader,
     ],
 )->Union[
-    List[Dict[str, Any]],
-    pd.DataFrame,
+    pa.Table,
+    pa.RecordBatch,
+    pa.RecordBatchReader,
 ]:
     """
-    Prepare data for use, such as :
-    1. cleaning the keys
-    2. turning the data into records (list of dicts)
+    As per clean_keys(), but for Arrow data.
+
+    Only the schema is rewritten; the columns are zero-copy views of the original buffers.
+    RecordBatchReaders are cleaned lazily, one batch at a time.
     """
-    data = clean_keys(data)
-    if (isinstance(data, list)):
-        pass
-    elif (isinstance(data, pd.DataFrame)):
-        data = clean_keys(data)
-        data = data.to_dict(orient="records")
-    
-    return data
+    _schema = clean_arrow_schema(data.schema)
 
-def json_size(
+    if (_schema is data.schema):
+        return data
+
+    if (isinstance(data, pa.RecordBatchReader)):
+        return pa.RecordBatchReader.from_batches(
+            _schema,
+            ( clean_arrow_keys(_batch) for _batch in data ),
+        )
+
+    _columns = [
+        _view_arrow_column(_column, _field.type) \
+            for _column, _field in zip(data.columns, _schema)
+    ]
+
+    if (isinstance(data, pa.RecordBatch)):
+        return pa.RecordBatch.from_arrays(_columns, schema=_schema)
+    else:
+        return pa.Table.from_arrays(_columns, schema=_schema)
+
+def conform_arrow(
+    data:Union[
+        pa.Table,
+        pa.RecordBatch,
+    ],
+    schema:pa.Schema,
+)->Union[
+    pa.Table,
+    pa.RecordBatch,
+]:
+    """
+    Make Arrow data fit schema: columns are selected by name, in the order of schema, and cast to its types.
+
+    If the columns cannot be cast, e.g. a column is missing, they are rebuilt from Python objects instead,
+    with anything missing set to null.
+    """
+    if (data.schema.equals(schema)):
+        return data
+
+    _table = data if (isinstance(data, pa.Table)) else pa.Table.from_batches([data])
+
+    try:
+        _table = _table.select(schema.names).cast(schema)
+    except (KeyError, pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        _table = pa.Table.from_pylist(_table.to_pylist(), schema=schema)
+
+    if (isinstance(data, pa.Table)):
+        return _table
+    else:
+        return _table.combine_chunks().to_batches()[0] if (len(_table)) else \
+            pa.RecordBatch.from_pylist([], schema=schema)
+
+def _iter_record_batches(
+    data:Iterable[Any],
+    block_size:int,
+    schema:pa.Schema=None,
+)->Generator[pa.RecordBatch, None, None]:
+    """
+    Generator function to turn a stream of records, DataFrames or Arrow data into RecordBatches.
+
+    Internal function only, not supported.
+    """
+    _records = []
+
+    for _item in data:
+        if (isinstance(_item, (pd.DataFrame, pa.Table, pa.RecordBatch)) or is_polars(_item)):
+            if (_records):
+                yield pa.RecordBatch.from_pylist(_records, schema=schema)
+                _records = []
+
+            yield from to_arrow(_item).to_batches()
+        else:
+            _records.append(_item)
+
+            if (len(_records) >= block_size):
+                yield pa.RecordBatch.from_pylist(_records, schema=schema)
+                _records = []
+
+    if (_records):
+        yield pa.RecordBatch.from_pylist(_records, schema=schema)
+
+def to_arrow(
     data:Union[
         Iterable[Dict[str,str]],
-        pd.DataFrame
+        pd.DataFrame,
+        pa.Table,
+        pa.RecordBatch,
+        pa.RecordBatchReader,
     ],
-)->int:
+    block_size:int=10000,
+    schema:pa.Schema=None,
+)->Union[
+    pa.Table,
+    pa.RecordBatchReader,
+]:
     """
-    Calculate the size of records or DataFrame in json format.
-    
-    Since JSON is a common format for data loading, which occasionally has size limits,
-    this function allows JSON size to be checked prior to uploading.
+    Convert data into Arrow, without cleaning the keys.
 
-    See chunks() function for a better solution to chunk up JSONs by size.
+    Arrow data and Polars DataFrames are taken as-is, without copying. DataFrames are converted column by column.
+    Streams (see is_stream()) become a RecordBatchReader, with records grouped into batches of block_size rows;
+    the schema of the stream is that of its first batch, which every later batch is made to fit.
+
+    Parameters:
+    - schema            If provided, the data is made to fit this pa.Schema instead, as per conform_arrow().
     """
-    if (isinstance(data, pd.DataFrame)):
-        return sys.getsizeof(
-            data.to_json(
-                path_or_buf=None, # Return as string,
-                orient="records",
-                default_handler=str,
-                indent=0,
-            )
+    if (is_stream(data)):
+        _batches = _iter_record_batches(data, block_size=block_size, schema=schema)
+
+        if (schema is None):
+            _first = next(_batches, None)
+
+            if (_first is None):
+                return pa.RecordBatchReader.from_batches(pa.schema([]), [])
+
+            schema = _first.schema
+            _batches = itertools.chain((_first, ), _batches)
+
+        return pa.RecordBatchReader.from_batches(
+            schema,
+            ( conform_arrow(_batch, schema) for _batch in _batches ),
         )
-    elif (isinstance(data, list)):
-        return sys.getsizeof(
-            json.dumps(
-                data,
-                default=str,
-            )
+
+    if (isinstance(data, (pa.Table, pa.RecordBatchReader))):
+        pass
+    elif (isinstance(data, pa.RecordBatch)):
+        data = pa.Table.from_batches([data])
+    elif (is_polars(data)):
+        data = data.to_arrow()
+    elif (isinstance(data, pd.DataFrame)):
+        data = pa.Table.from_pandas(data, preserve_index=False)
+    else:
+        return pa.Table.from_pylist(list(data), schema=schema)
+
+    if (schema is None or data.schema.equals(schema)):
+        return data
+    elif (isinstance(data, pa.RecordBatchReader)):
+        return pa.RecordBatchReader.from_batches(
+            schema,
+            ( conform_arrow(_batch, schema) for _batch in data ),
         )
     else:
-        return sys.getsizeof(data)
+        return conform_arrow(data, schema)
 
-def sample(
+def prepare_arrow(
     data:Union[
         Iterable[Dict[str,str]],
-        pd.DataFrame
+        pd.DataFrame,
+        pa.Table,
+        pa.RecordBatch,
+        pa.RecordBatchReader,
     ],
-    size:int,
 )->Union[
-    List[Dict[str, Any]],
-    pd.DataFrame,
+    pa.Table,
+    pa.RecordBatchReader,
 ]:
     """
-    Randomly sample a number of records from data.
+    Arrow version of prepare() - convert data into a pyarrow Table, or a RecordBatchReader for streams, with cleaned keys.
 
-    Primarily for internal use only in chunks().
+    See to_arrow() for the conversion.
     """
+    return clean_arrow_keys(to_arrow(data))
 
-    if (isinstance(data, pd.DataFrame)):
-        return data.sample(
-            n=size,
-            axis=0,
-        )
+def arrow_to_dataframe(
+    data:Union[
+        pa.Table,
+        pa.RecordBatch,
+    ],
+)->pd.DataFrame:
+    """
+    Convert Arrow data into a DataFrame of Arrow-backed dtypes for serialisation;
+    unlike the default conversion, integers with nulls are not turned into floats.
+    """
+    return data.to_pandas(types_mapper=pd.ArrowDtype)
+
+def iter_arrow_tables(
+    data:Union[
+        pa.Table,
+        pa.RecordBatch,
+        pa.RecordBatchReader,
+    ],
+)->Generator[pa.Table, None, None]:
+    """
+    Generator function to yield Arrow data as Tables; a RecordBatchReader yields one Table per batch.
+    """
+    if (isinstance(data, pa.RecordBatchReader)):
+        for _batch in data:
+            yield pa.Table.from_batches([_batch])
     else:
-        return random.sample(
-            data,
-            size,
-        )
+        yield to_arrow(data)
 
-def subset(
+
+def is_stream(obj:Any)->bool:
+    """
+    Determines if obj is a stream of data, i.e. an iterable that is not a list, tuple or DataFrame.
+
+    Streams include generators, file readers and iterators of DataFrames such as pd.read_csv(chunksize=...).
+    They can only be consumed once and their length is unknown, so they cannot be sliced, sampled by index or len()'ed.
+
+    Arrow data (see is_arrow()) is never considered a stream, including RecordBatchReaders; those are handled natively.
+    """
+    return isinstance(obj, IterableABC) and \
+        not isinstance(obj, (list, tuple, dict, str, bytes, pd.DataFrame)) and \
+        not is_arrow(obj)
+
+def iter_records(
     data:Union[
         Iterable[Dict[str,str]],
-        pd.DataFrame
+        Iterable[pd.DataFrame],
+        pd.DataFrame,
     ],
-    start:int,
-    size:int,
+)->Generator[Dict[str, Any], None, None]:
+    """
+    Generator function to yield records one at a time from data.
+
+    Any DataFrames, either as data itself or as items in a stream, are converted into records one at a time,
+    so that only one DataFrame of a stream needs to be in memory at once.
+    Arrow data is converted one Table or RecordBatch at a time.
+    """
+    if (isinstance(data, pd.DataFrame)):
+        data = (data, )
+    elif (is_arrow(data)):
+        data = iter_arrow_tables(data)
+
+    for _item in data:
+        if (isinstance(_item, pd.DataFrame)):
+            yield from _item.to_dict(orient="records")
+        elif (isinstance(_item, pa.Table)):
+            yield from _item.to_pylist()
+        else:
+            yield _item
+
+def prepare_stream(
+    data:Iterable[
+        Union[
+            Dict[str,str],
+            pd.DataFrame,
+        ]
+    ],
+)->Generator[Dict[str, Any], None, None]:
+    """
+    Streaming version of prepare() - generator function to clean and yield records one at a time.
+
+    data can be any iterable of dicts, or an iterator of DataFrames such as pd.read_csv(chunksize=...).
+    """
+    for _item in data:
+        if (isinstance(_item, pd.DataFrame)):
+            yield from clean_keys(_item).to_dict(orient="records")
+        else:
+            yield clean_keys(_item)
+
+def prepare(
+    data:Union[
+        Iterable[Dict[str,str]],
+        pd.DataFrame,
+        pa.Table,
+        pa.RecordBatch,
+        pa.RecordBatchReader,
+    ],
+    arrow:bool=False,
+    processes:int=None,
 )->Union[
     List[Dict[str, Any]],
     pd.DataFrame,
+    Generator[Dict[str, Any], None, None],
+    pa.Table,
+    pa.RecordBatchReader,
+    Generator[bytes, None, None],
 ]:
     """
-    Return a specific range of records in data.
+    Prepare data for use, such as :
+    1. cleaning the keys
+    2. turning the data into records (list of dicts)
 
-    Primarily for internal use only in chunks().
+    If data is a stream (see is_stream()), a generator of cleaned records is returned instead;
+    the data is then cleaned lazily as it is consumed.
+
+    Parameters:
+    - arrow             If True, turn the data into a pyarrow Table instead of records, or a RecordBatchReader for streams;
+                        see prepare_arrow(). All the functions in this module accept these in place of records,
+                        so that columnar data never needs to be turned into Python objects as a whole.
+    - processes         If provided, clean and encode the data in a pool of this many processes instead;
+                        a generator of encoded rows is returned, see prepare_encoded().
     """
-    if (isinstance(data, pd.DataFrame)):
-        return data.iloc[start:start+size, :]
-    else:
-        return data[start:start+size]
+    if (processes):
+        return prepare_encoded(data, processes=processes)
 
-def chunks(
+    if (arrow):
+        return prepare_arrow(data)
+
+    if (is_arrow(data)):
+        data = clean_arrow_keys(to_arrow(data))
+
+        if (isinstance(data, pa.RecordBatchReader)):
+            return iter_records(data)
+        else:
+            return data.to_pylist()
+
+    if (is_stream(data)):
+        return prepare_stream(data)
+
+    data = clean_keys(data)
+    if (isinstance(data, list)):
+        pass
+    elif (isinstance(data, pd.DataFrame)):
+        data = clean_keys(data)
+        data = data.to_dict(orient="records")
+    
+    return data
+
+def iter_shards(
     data:Union[
         Iterable[Dict[str,str]],
-        pd.DataFrame
+        pd.DataFrame,
+        pa.Table,
+        pa.RecordBatchReader,
     ],
-    size_limit:int=20*(2**20), # 20MB is BigQuery's default JSON limit
-    max_iteration:int=6,
+    shard_size:int=PARALLEL_SHARD_SIZE,
 )->Generator[
     Union[
         List[Dict[str, Any]],
         pd.DataFrame,
+        pa.Table,
     ],
     None,
     None
 ]:
     """
-    Generator function to slice the data into chunks, guaranteed to be below a maximum size.
+    Generator function to split data into consecutive shards of up to shard_size rows, in order, for processing elsewhere.
 
-    This is actually a commutationally heavy function - we are essentially JSON serialising a LOT of combination of data in order to chunk them up in the right size.
-    The benefit of this is to minimise the number of API calls as well as maximising network throughput.
+    Records are grouped into lists; DataFrames and Arrow Tables are sliced, so that they are pickled as columns.
+    Streams are consumed lazily, including streams of DataFrames.
     """
+    if (isinstance(data, (pd.DataFrame, pa.Table))):
+        for _start in range(0, len(data), shard_size):
+            yield subset(data, start=_start, size=shard_size)
+    elif (is_arrow(data)):
+        for _table in iter_arrow_tables(data):
+            yield from iter_shards(_table, shard_size=shard_size)
+    elif (isinstance(data, (list, tuple))):
+        for _start in range(0, len(data), shard_size):
+            yield list(data[_start:_start+shard_size])
+    else:
+        _records = []
+        for _item in data:
+            if (isinstance(_item, pd.DataFrame)):
+                if (_records):
+                    yield _records
+                    _records = []
 
-    sample_size = 10
+                yield from iter_shards(_item, shard_size=shard_size)
+            else:
+                _records.append(_item)
+
+                if (len(_records) >= shard_size):
+                    yield _records
+                    _records = []
+
+        if (_records):
+            yield _records
+
+def encode_shard(
+    shard:Union[
+        List[Dict[str, Any]],
+        pd.DataFrame,
+        pa.Table,
+    ],
+)->Tuple[bytes, np.ndarray]:
+    """
+    Clean and encode a shard from iter_shards(), returning (buffer, row sizes):
+    the encoded rows concatenated into a single buffer, and a numpy array of the size of each row.
+
+    This is what runs in each process of prepare_encoded(); a single buffer is much cheaper to send back
+    to the parent process than the rows or records themselves.
+    """
+    if (isinstance(shard, pa.Table)):
+        shard = clean_arrow_keys(shard)
+    else:
+        shard = clean_keys(shard)
+
+    _rows = list(encode_rows(shard))
+
+    return (
+        b"".join(_rows),
+        np.fromiter(map(len, _rows), dtype=np.int64, count=len(_rows)),
+    )
+
+def prepare_encoded(
+    data:Union[
+        Iterable[Dict[str,str]],
+        pd.DataFrame,
+        pa.Table,
+        pa.RecordBatchReader,
+    ],
+    processes:int=None,
+    shard_size:int=PARALLEL_SHARD_SIZE,
+)->Generator[bytes, None, None]:
+    """
+    Parallel version of prepare() - generator function to clean and encode data in a pool of processes,
+    yielding each row as compact, UTF-8 encoded JSON bytes, in the same order as data.
+
+    data is split into shards of shard_size rows by iter_shards(), and each shard is cleaned and encoded by encode_shard()
+    in one of the processes. No more than processes shards are in flight at a time, so memory stays bounded for streams.
+
+    The encoded rows can be given to chunks(encoded=True), encoded_chunks() and encoded_files() in place of records.
+
+    Parameters:
+    - processes         Number of processes. If None, os.cpu_count(); if 1 or less, shards are encoded in this process.
+    - shard_size        Number of rows sent to a process at a time.
+    """
+    if (processes is None):
+        processes = os.cpu_count() or 1
+
+    for _shard, _result in load_datawarehouse.upload.map_bounded(
+        encode_shard,
+        iter_shards(data, shard_size=shard_size),
+        concurrency=processes,
+        executor_class=ProcessPoolExecutor,
+    ):
+        if (isinstance(_result, Exception)):
+            raise _result
+
+        _buffer, _row_sizes = _result
+        _buffer = memoryview(_buffer)
+
+        _offset = 0
+        for _row_size in _row_sizes.tolist():
+            yield bytes(_buffer[_offset:_offset+_row_size])
+            _offset += _row_size
+
+def peek(
+    data:Iterable[Any],
+    size:int,
+)->Tuple[List[Any], Iterable[Any]]:
+    """
+    Take the first size items of data, without losing them.
+
+    Returns a tuple of (list of the first size items, data).
+    If data is a stream, the returned data is a new iterator that yields the peeked items before the rest of the stream.
+    A RecordBatchReader is peeked batch by batch; the first items are then returned as a Table,
+    and data is a new RecordBatchReader of the same batches.
+    """
+    if (isinstance(data, pa.RecordBatchReader)):
+        _batches = []
+        _rows = 0
+        for _batch in data:
+            _batches.append(_batch)
+            _rows += _batch.num_rows
+            if (_rows >= size):
+                break
+
+        _head = pa.Table.from_batches(_batches, schema=data.schema).slice(0, size)
+        return _head, pa.RecordBatchReader.from_batches(
+            data.schema,
+            itertools.chain(_batches, data),
+        )
+    elif (is_stream(data)):
+        data = iter(data)
+        _head = list(itertools.islice(data, size))
+        return _head, itertools.chain(_head, data)
+    else:
+        return list(subset(data, start=0, size=size)), data
+
+def json_size(
+    data:Union[
+        Iterable[Dict[str,str]],
+        pd.DataFrame
+    ],
+)->int:
+    """
+    Calculate the size of records or DataFrame in json format, in bytes as sent over the wire.
+    
+    Since JSON is a common format for data loading, which occasionally has size limits,
+    this function allows JSON size to be checked prior to uploading.
 
-    if (len(data) <= sample_size):
-        yield data
+    The size is that of compact, UTF-8 encoded JSON. It is counted one row at a time,
+    so the JSON document as a whole is never built in memory.
+
+    See chunks() function for a better solution to chunk up JSONs by size.
+    """
+    if (isinstance(data, (list, tuple, pd.DataFrame)) or is_stream(data) or is_arrow(data)):
+        _total = len(JSON_ARRAY_FORMAT.prefix) + len(JSON_ARRAY_FORMAT.suffix)
+        for _id, _row_size in enumerate(row_json_sizes(data)):
+            _total += _row_size + (len(JSON_ARRAY_FORMAT.separator) if (_id) else 0)
+
+        return _total
+    else:
+        return utf8_size(_json_encoder.encode(data))
+
+def sample(
+    data:Union[
+        Iterable[Dict[str,str]],
+        pd.DataFrame
+    ],
+    size:int,
+)->Union[
+    List[Dict[str, Any]],
+    pd.DataFrame,
+]:
+    """
+    Randomly sample a number of records from data.
+
+    If data is a stream, it is consumed in full using reservoir sampling, holding no more than size records in memory.
+    Arrow Tables are sampled into a Table; RecordBatchReaders are sampled as streams.
+    """
+
+    if (isinstance(data, pd.DataFrame)):
+        return data.sample(
+            n=size,
+            axis=0,
+        )
+    elif (is_arrow(data) and not isinstance(data, pa.RecordBatchReader)):
+        data = to_arrow(data)
+        return data.take(
+            sorted(random.sample(range(len(data)), size))
+        )
+    elif (is_stream(data) or is_arrow(data)):
+        _reservoir = []
+        for _id, _record in enumerate(iter_records(data)):
+            if (_id < size):
+                _reservoir.append(_record)
+            else:
+                _replace = random.randint(0, _id)
+                if (_replace < size):
+                    _reservoir[_replace] = _record
+
+        return _reservoir
     else:
-        estimated_total_size = json_size(sample(
+        return random.sample(
             data,
-            sample_size
-        )) * len(data) / sample_size
-
-        chunk_length = max(1, int(estimated_total_size / size_limit))
-        chunk_start = 0
-
-        while (chunk_start < len(data)):
-            # Bisecting to find the rough chunking point
-            for _iteration in range(max_iteration+1):
-                if (_iteration>0):
-                    # Don't do this on the first iteration
-                    existing_length = chunk_length
-                    chunk_length = min(
-                        (
-                            chunk_length + \
-                            max(
-                                1,
-                                int(chunk_length * size_limit / chunk_size),
-                            )
-                        )//2, # Average the existing chunk_length and the new one - which is the bisection method
-                        len(data)-chunk_start, # this is quite essential - if the starting chunk_length vastly exceed the entire length of the data set, the subsequent procedure to "walk back" chunk_length will take AGES!
-                    )
+            size,
+        )
+
+def subset(
+    data:Union[
+        Iterable[Dict[str,str]],
+        pd.DataFrame
+    ],
+    start:int,
+    size:int,
+)->Union[
+    List[Dict[str, Any]],
+    pd.DataFrame,
+]:
+    """
+    Return a specific range of records in data.
+
+    If data is a stream, the records before start are consumed and discarded.
+    Arrow Tables are sliced without copying.
+    """
+    if (isinstance(data, pd.DataFrame)):
+        return data.iloc[start:start+size, :]
+    elif (isinstance(data, (pa.Table, pa.RecordBatch))):
+        return data.slice(start, size)
+    elif (is_stream(data) or is_arrow(data)):
+        return list(itertools.islice(iter_records(data), start, start+size))
+    else:
+        return data[start:start+size]
+
+def row_json_sizes(
+    data:Union[
+        Iterable[Dict[str,str]],
+        pd.DataFrame
+    ],
+)->Generator[int, None, None]:
+    """
+    Generator function to yield the JSON size of each row in data in bytes, in the same order.
+
+    Each row is serialised exactly once, in the same format as encode_rows().
+
+    The sizes are measured in the same format as json_size(), so that
+        json_size(empty) + sum(row sizes) + separator * (rows - 1)
+    equals json_size() of the rows concatenated.
+    """
+    if (isinstance(data, pd.DataFrame)):
+        for _row_size in dataframe_row_json_sizes(data):
+            yield int(_row_size)
+    elif (is_arrow(data)):
+        for _table in iter_arrow_tables(data):
+            for _row_size in dataframe_row_json_sizes(_table):
+                yield int(_row_size)
+    else:
+        for _row in data:
+            if (isinstance(_row, pd.DataFrame)):
+                # A stream of DataFrames
+                yield from row_json_sizes(_row)
+            elif (isinstance(_row, bytes)):
+                # Already encoded, e.g. by prepare_encoded()
+                yield len(_row)
+            else:
+                yield utf8_size(_json_encoder.encode(_row))
+
+# pd.api.types.infer_dtype() results of object columns that may hold values DataFrame.to_json() does not encode as json_default() does.
+_JSON_DEFAULT_INFERRED_DTYPES = (
+    "bytes",
+    "date",
+    "mixed",
+)
+
+def _json_default_value(value:Any)->Any:
+    """
+    Encode value by json_default() if DataFrame.to_json() would encode it differently, i.e. bytes and dates;
+    DataFrame.to_json() takes bytes as text, and dates as midnight timestamps.
+
+    Internal function only, not supported.
+    """
+    if (isinstance(value, bytes) or \
+        (isinstance(value, date) and not isinstance(value, datetime))):
+        return json_default(value)
+    else:
+        return value
+
+def json_lines(
+    data:Union[
+        pd.DataFrame,
+        pa.Table,
+    ],
+)->str:
+    """
+    Serialise a DataFrame or an Arrow Table into newline delimited JSON, in the same format as encode_rows().
+
+    Missing values are null, and timestamps are in ISO format to the microsecond.
+    Object columns holding bytes or dates are encoded by json_default() first, as they would be in records.
+    """
+    if (isinstance(data, pa.Table)):
+        data = arrow_to_dataframe(data)
+
+    _converted = data
+
+    for _position, _dtype in enumerate(data.dtypes):
+        if (_dtype != object or \
+            pd.api.types.infer_dtype(data.iloc[:, _position], skipna=True) not in _JSON_DEFAULT_INFERRED_DTYPES):
+            continue
+
+        if (_converted is data):
+            _converted = data.copy(deep=False)
+
+        _converted.isetitem(
+            _position,
+            pd.Series(
+                [ _json_default_value(_value) for _value in data.iloc[:, _position].to_numpy() ],
+                index=data.index,
+                dtype=object,
+            ),
+        )
+
+    return _converted.to_json(
+        path_or_buf=None,
+        orient="records",
+        lines=True,
+        date_format="iso",
+        date_unit="us",
+        force_ascii=False,
+        default_handler=json_default,
+    )
+
+def dataframe_row_json_sizes(
+    dataframe:Union[
+        pd.DataFrame,
+        pa.Table,
+    ],
+    block_size:int=10000,
+)->np.ndarray:
+    """
+    Calculate the JSON size of every row of a DataFrame or Arrow Table in bytes, as a numpy array.
+
+    Each block of block_size rows is serialised once by DataFrame.to_json(lines=True);
+    the row sizes are then found from the positions of the line breaks in a single vectorised pass,
+    without splitting the block into Python strings.
+
+    The sizes are measured in the same format as row_json_sizes().
+    """
+    _sizes = [np.zeros(0, dtype=np.int64)]
+
+    for _block_start in range(0, len(dataframe), block_size):
+        _buffer = json_lines(
+            subset(
+                dataframe,
+                start=_block_start,
+                size=block_size,
+            )
+        ).encode("utf-8")
+
+        if (not _buffer.endswith(b"\n")):
+            # Older versions of pandas do not terminate the last line
+            _buffer += b"\n"
+
+        # JSON escapes line breaks within values, so these are the row delimiters
+        _line_ends = np.flatnonzero(
+            np.frombuffer(_buffer, dtype=np.uint8) == ord("\n")
+        )
+
+        _sizes.append(
+            np.diff(_line_ends, prepend=-1) - 1
+        )
+
+    return np.concatenate(_sizes).astype(np.int64, copy=False)
+
+def dataframe_chunk_spans(
+    row_sizes:np.ndarray,
+    size_limit:int,
+    empty_size:int=0,
+    separator_size:int=0,
+    row_limit:int=None,
+    row_size_limit:int=None,
+    offset:int=0,
+)->Generator[
+    Tuple[int, int],
+    None,
+    None
+]:
+    """
+    Vectorised version of chunk_spans() for when all the row sizes are known in advance, such as from dataframe_row_json_sizes().
+
+    The cumulative sum of (row size + separator) is computed once; each chunk boundary is then a binary search
+    for the last row that keeps the chunk below size_limit. This runs in O(n) for the cumulative sum plus O(log n) per chunk.
+
+    Raises WarehouseRowOversize if a single row cannot fit into size_limit or row_size_limit on its own;
+    the row is numbered from offset, for when row_sizes are those of a part of the data.
+    """
+    row_sizes = np.asarray(row_sizes, dtype=np.int64)
+
+    if (size_limit is not None):
+        _oversize = np.flatnonzero(empty_size + row_sizes > size_limit)
+        if (_oversize.size):
+            raise WarehouseRowOversize(
+                f"Row #{offset + _oversize[0]} has a size of {empty_size + row_sizes[_oversize[0]]:,d}, which exceeds size limit of {size_limit:,d} bytes."
+            )
+
+    if (row_size_limit is not None):
+        _oversize = np.flatnonzero(row_sizes > row_size_limit)
+        if (_oversize.size):
+            raise WarehouseRowOversize(
+                f"Row #{offset + _oversize[0]} has a size of {row_sizes[_oversize[0]]:,d}, which exceeds row size limit of {row_size_limit:,d} bytes."
+            )
+
+    if (size_limit is None):
+        # Only row_limit applies
+        _cumulative = None
+    else:
+        # _cumulative[i] is the size of rows [0, i) with a separator after every row
+        _cumulative = np.concatenate((
+            np.zeros(1, dtype=np.int64),
+            np.cumsum(row_sizes + separator_size),
+        ))
+        # The last row in a chunk has no separator after it, so we can afford one more separator
+        _budget = size_limit - empty_size + separator_size
+
+    _start = 0
+    while (_start < len(row_sizes)):
+        if (_cumulative is not None):
+            _stop = int(np.searchsorted(
+                _cumulative,
+                _cumulative[_start] + _budget,
+                side="right",
+            )) - 1
+        else:
+            _stop = len(row_sizes)
+
+        if (row_limit is not None):
+            _stop = min(_stop, _start + row_limit)
+
+        yield (_start, _stop)
+        _start = _stop
+
+def encode_rows(
+    data:Union[
+        Iterable[Dict[str,str]],
+        pd.DataFrame
+    ],
+    block_size:int=1000,
+)->Generator[bytes, None, None]:
+    """
+    Generator function to yield each row in data as compact, UTF-8 encoded JSON bytes.
+
+    Rows that are bytes are taken as already encoded, and yielded as-is.
+
+    DataFrames, including those in a stream of DataFrames, and Arrow data are encoded in blocks of block_size rows.
+    """
+    if (isinstance(data, (pd.DataFrame, pa.Table))):
+        for _block_start in range(0, len(data), block_size):
+            _lines = json_lines(
+                subset(
+                    data,
+                    start=_block_start,
+                    size=block_size,
+                )
+            ).rstrip("\n").encode("utf-8").split(b"\n")
+
+            for _line in _lines:
+                yield _line
+    elif (is_arrow(data)):
+        for _table in iter_arrow_tables(data):
+            yield from encode_rows(_table, block_size=block_size)
+    else:
+        for _row in data:
+            if (isinstance(_row, pd.DataFrame)):
+                # A stream of DataFrames
+                yield from encode_rows(_row, block_size=block_size)
+            elif (isinstance(_row, bytes)):
+                # Already encoded, e.g. by prepare_encoded()
+                yield _row
+            else:
+                yield _json_encoder.encode(_row).encode("utf-8")
+
+def new_row_ids(
+    rows:int,
+    size:int=32,
+)->Tuple[bytes]:
+    """
+    Generate random hex IDs of size ASCII bytes for rows rows, e.g. for the insertId of each row of a streaming insert.
+    """
+    return tuple(
+        os.urandom((size+1)//2).hex()[:size].encode("ascii") \
+            for _ in range(rows)
+    )
+
+def get_row_overhead(
+    payload_format:PayloadFormat,
+)->int:
+    """
+    Number of bytes that payload_format adds to each row, not counting separators; this includes the row ID if any.
+    """
+    _overhead = len(payload_format.row_prefix) + len(payload_format.row_suffix)
+
+    if (payload_format.row_id_size):
+        # The %s in row_prefix is replaced by the ID
+        _overhead += payload_format.row_id_size - 2
+
+    return _overhead
+
+def wrap_row(
+    encoded_row:bytes,
+    payload_format:PayloadFormat=JSON_ARRAY_FORMAT,
+    row_id:bytes=None,
+)->bytes:
+    """
+    Wrap an encoded row in the row_prefix and row_suffix of payload_format.
+
+    If payload_format has row IDs, row_id is put in row_prefix; a new one is generated if it is None.
+    """
+    if (payload_format.row_id_size):
+        if (row_id is None):
+            row_id, = new_row_ids(1, size=payload_format.row_id_size)
+
+        return (payload_format.row_prefix % row_id) + encoded_row + payload_format.row_suffix
+    else:
+        return payload_format.row_prefix + encoded_row + payload_format.row_suffix
+
+def encode_payload(
+    encoded_rows:Iterable[bytes],
+    payload_format:PayloadFormat=JSON_ARRAY_FORMAT,
+    row_ids:Iterable[bytes]=None,
+)->bytes:
+    """
+    Wrap a collection of encoded rows into a single payload.
+
+    If payload_format has row IDs, row_ids are used in the same order as encoded_rows; new ones are generated if None.
+    """
+    if (row_ids is None):
+        row_ids = itertools.repeat(None)
+
+    return payload_format.prefix + \
+        payload_format.separator.join(
+            wrap_row(_row, payload_format=payload_format, row_id=_row_id) \
+                for _row, _row_id in zip(encoded_rows, row_ids)
+        ) + \
+        payload_format.suffix
+
+def make_encoded_chunk(
+    encoded_rows:Iterable[bytes],
+    payload_format:PayloadFormat=JSON_ARRAY_FORMAT,
+    start:int=0,
+    row_ids:Iterable[bytes]=None,
+)->EncodedChunk:
+    """
+    Wrap a collection of encoded rows into an EncodedChunk.
+
+    This can also be used to re-wrap a subset of the encoded_rows of an existing EncodedChunk, e.g. to retry a few rows;
+    pass the row_ids of the same rows to keep their IDs. If payload_format has row IDs and row_ids is None, new ones are generated.
+    """
+    encoded_rows = tuple(encoded_rows)
+
+    if (payload_format.row_id_size):
+        row_ids = tuple(row_ids) if (row_ids is not None) else new_row_ids(len(encoded_rows), size=payload_format.row_id_size)
+    else:
+        row_ids = None
+
+    _payload = encode_payload(
+        encoded_rows,
+        payload_format=payload_format,
+        row_ids=row_ids,
+    )
+
+    return EncodedChunk(
+        payload=_payload,
+        rows=len(encoded_rows),
+        size=len(_payload),
+        start=start,
+        encoded_rows=encoded_rows,
+        row_ids=row_ids,
+    )
+
+def chunk_digest(
+    chunk:Union[
+        EncodedChunk,
+        EncodedFile,
+        Iterable[Dict[str,str]],
+        pd.DataFrame,
+        pa.Table,
+    ],
+    block_bytes:int=2**20,
+)->str:
+    """
+    SHA-256 hex digest of the content of a chunk, for a LoadJournal to tell if the chunk was already loaded.
+
+    EncodedFiles are digested by the content of the file, and anything else by its rows encoded as JSON,
+    so that an EncodedChunk has the same digest as the rows it was encoded from, regardless of its row IDs.
+    """
+    _hash = hashlib.sha256()
+
+    if (isinstance(chunk, EncodedChunk)):
+        for _row in chunk.encoded_rows:
+            _hash.update(_row)
+            _hash.update(b"\n")
+    elif (isinstance(chunk, EncodedFile)):
+        with open(chunk.path, "rb") as _fHnd:
+            for _block in iter(lambda: _fHnd.read(block_bytes), b""):
+                _hash.update(_block)
+    else:
+        for _row in encode_rows(chunk):
+            _hash.update(_row)
+            _hash.update(b"\n")
+
+    return _hash.hexdigest()
+
+def chunk_spans(
+    row_sizes:Iterable[int],
+    size_limit:int,
+    empty_size:int=0,
+    separator_size:int=0,
+    row_limit:int=None,
+    row_size_limit:int=None,
+)->Generator[
+    Tuple[int, int],
+    None,
+    None
+]:
+    """
+    Generator function to yield (start, stop) index pairs of consecutive rows, such that each span is below size_limit.
+
+    Parameters:
+    - row_sizes         Iterable of the serialised size of each row; consumed lazily in a single pass.
+    - size_limit        Hard cap on the size of each span, inclusive of empty_size and separators. None for no limit.
+    - empty_size        Size of a serialised container holding no rows, e.g. "[]".
+    - separator_size    Size of the separator between two rows, e.g. ", ".
+    - row_limit         Maximum number of rows in each span. None for no limit.
+    - row_size_limit    Maximum size of a single row. None for no limit.
+
+    Raises WarehouseRowOversize if a single row cannot fit into size_limit or row_size_limit on its own.
+    """
+    if (size_limit is None):    size_limit = float("inf")
+    if (row_limit is None):     row_limit = float("inf")
+
+    _start = 0
+    _stop = 0
+    _total = empty_size
+
+    for _id, _row_size in enumerate(row_sizes):
+        if (empty_size + _row_size > size_limit):
+            raise WarehouseRowOversize(
+                f"Row #{_id} has a size of {empty_size + _row_size:,d}, which exceeds size limit of {size_limit:,d} bytes."
+            )
+
+        if (row_size_limit is not None and _row_size > row_size_limit):
+            raise WarehouseRowOversize(
+                f"Row #{_id} has a size of {_row_size:,d}, which exceeds row size limit of {row_size_limit:,d} bytes."
+            )
+
+        _new_total = _total + _row_size + (separator_size if (_id > _start) else 0)
+
+        if (_new_total > size_limit or \
+            _id - _start >= row_limit):
+            # Cut the chunk before this row, and start a new one with it
+            yield (_start, _id)
+            _start = _id
+            _total = empty_size + _row_size
+        else:
+            _total = _new_total
+
+        _stop = _id + 1
+
+    if (_stop > _start):
+        yield (_start, _stop)
+
+def buffered_chunk_spans(
+    rows:Iterable[Any],
+    row_size:Callable[[Any], int],
+    **kwargs,
+)->Generator[
+    Tuple[int, List[Any]],
+    None,
+    None
+]:
+    """
+    Generator function to yield (start, rows) of consecutive rows from an iterable, as cut by chunk_spans().
+
+    Unlike chunk_spans(), this does not require rows to be sliceable - rows are consumed once and buffered,
+    and the buffer never holds more than one chunk plus one row. This allows streams of any length to be chunked in bounded memory.
+
+    Parameters:
+    - rows              Iterable of rows.
+    - row_size          Function to get the size of a row.
+    - kwargs            Passed to chunk_spans().
+    """
+    _buffer = []
+
+    def _buffered_sizes():
+        # chunk_spans() yields each span before it asks for the next row's size,
+        # so at the time of yield, _buffer holds the rows of the span plus the one that tipped it over.
+        for _row in rows:
+            _buffer.append(_row)
+            yield row_size(_row)
+
+    for _start, _stop in chunk_spans(
+        _buffered_sizes(),
+        **kwargs,
+    ):
+        _rows = _buffer[:_stop-_start]
+        del _buffer[:_stop-_start]
+
+        yield _start, _rows
+
+def chunks(
+    data:Union[
+        Iterable[Dict[str,str]],
+        pd.DataFrame
+    ],
+    size_limit:int=20*(2**20), # 20MB is BigQuery's default JSON limit
+    max_iteration:int=None,
+    encoded:bool=False,
+    payload_format:PayloadFormat=JSON_ARRAY_FORMAT,
+    limits:RequestLimits=None,
+)->Generator[
+    Union[
+        List[Dict[str, Any]],
+        pd.DataFrame,
+        EncodedChunk,
+    ],
+    None,
+    None
+]:
+    """
+    Generator function to slice the data into chunks, guaranteed to be below a maximum size.
+
+    Each row is JSON serialised exactly once; a running total of the chunk size is kept,
+    and the chunk is cut as soon as the next row would take it over size_limit.
+    This runs in O(n) rows, and only ever holds one chunk worth of serialised data in memory.
+
+    data can also be a stream (see is_stream()) of records or of DataFrames, in which case lists of records are yielded,
+    and no more than one chunk of the stream is held in memory at a time.
+
+    Arrow Tables are chunked into zero-copy slices. A RecordBatchReader is chunked one batch at a time,
+    so chunks never span two batches.
+
+    Parameters:
+    - size_limit        Hard cap on json_size() of each chunk.
+    - max_iteration     Obsolete; kept for backward compatibility only. The chunk boundaries are no longer searched for.
+    - encoded           If True, yield EncodedChunk instead of subsets of data.
+                        The bytes used to measure the rows are kept and wrapped in payload_format,
+                        so that the payload can be sent as-is without serialising the rows again.
+                        size_limit is then a hard cap on the size of the whole payload.
+    - payload_format    PayloadFormat to wrap the encoded rows in. Only used if encoded is True.
+    - limits            RequestLimits profile. If provided, its max_bytes replaces size_limit,
+                        and chunks are also cut at max_rows rows, whichever comes first.
+
+    Raises WarehouseRowOversize if a single row exceeds size_limit or limits.max_row_bytes on its own.
+    """
+
+    if (limits is None):
+        limits = RequestLimits(max_bytes=size_limit)
+
+    if (encoded):
+        yield from encoded_chunks(
+            data,
+            payload_format=payload_format,
+            limits=limits,
+        )
+        return
+
+    if (is_arrow(data)):
+        for _table in iter_arrow_tables(data):
+            for _start, _stop in dataframe_chunk_spans(
+                dataframe_row_json_sizes(_table),
+                size_limit=limits.max_bytes,
+                empty_size=len(JSON_ARRAY_FORMAT.prefix) + len(JSON_ARRAY_FORMAT.suffix),
+                separator_size=len(JSON_ARRAY_FORMAT.separator),
+                row_limit=limits.max_rows,
+                row_size_limit=limits.max_row_bytes,
+            ):
+                yield _table.slice(_start, _stop-_start)
+        return
 
-                    if (existing_length == chunk_length):
-                        break
+    if (is_stream(data)):
+        for _start, _rows in buffered_chunk_spans(
+            iter_records(data),
+            row_size=lambda _row: utf8_size(_json_encoder.encode(_row)),
+            size_limit=limits.max_bytes,
+            empty_size=len(JSON_ARRAY_FORMAT.prefix) + len(JSON_ARRAY_FORMAT.suffix),
+            separator_size=len(JSON_ARRAY_FORMAT.separator),
+            row_limit=limits.max_rows,
+            row_size_limit=limits.max_row_bytes,
+        ):
+            yield _rows
+        return
 
-                chunk_size = json_size(
-                    subset(
-                        data,
-                        start=chunk_start,
-                        size=chunk_length,
+    if (isinstance(data, pd.DataFrame)):
+        _spans = dataframe_chunk_spans(
+            dataframe_row_json_sizes(data),
+            size_limit=limits.max_bytes,
+            empty_size=len(JSON_ARRAY_FORMAT.prefix) + len(JSON_ARRAY_FORMAT.suffix),
+            separator_size=len(JSON_ARRAY_FORMAT.separator),
+            row_limit=limits.max_rows,
+            row_size_limit=limits.max_row_bytes,
+        )
+    else:
+        _spans = chunk_spans(
+            row_json_sizes(data),
+            size_limit=limits.max_bytes,
+            empty_size=len(JSON_ARRAY_FORMAT.prefix) + len(JSON_ARRAY_FORMAT.suffix),
+            separator_size=len(JSON_ARRAY_FORMAT.separator),
+            row_limit=limits.max_rows,
+            row_size_limit=limits.max_row_bytes,
+        )
+
+    for _start, _stop in _spans:
+        yield subset(
+            data,
+            start=_start,
+            size=_stop-_start,
+        )
+
+def encoded_chunks(
+    data:Union[
+        Iterable[Dict[str,str]],
+        pd.DataFrame
+    ],
+    size_limit:int=20*(2**20),
+    payload_format:PayloadFormat=JSON_ARRAY_FORMAT,
+    limits:RequestLimits=None,
+    block_size:int=10000,
+)->Generator[
+    EncodedChunk,
+    None,
+    None
+]:
+    """
+    Generator function to slice the data into EncodedChunks, each with a payload guaranteed to be below size_limit in bytes.
+
+    DataFrames and Arrow data are encoded block_size rows at a time, see encode_rows();
+    the chunk boundaries within each block are then found at once by dataframe_chunk_spans(),
+    and the rows after the last boundary are carried over to the next block.
+    Other data is encoded and cut one row at a time.
+
+    See chunks(encoded=True).
+    """
+    if (limits is None):
+        limits = RequestLimits(max_bytes=size_limit)
+
+    _row_overhead = get_row_overhead(payload_format)
+
+    if (isinstance(data, pd.DataFrame) or is_arrow(data)):
+        def _blocks():
+            for _table in ((data,) if (isinstance(data, pd.DataFrame)) else iter_arrow_tables(data)):
+                for _block_start in range(0, len(_table), block_size):
+                    yield subset(_table, start=_block_start, size=block_size)
+
+        _blocks = _blocks()
+        _block = next(_blocks, None)
+        _pending_rows = []
+        _offset = 0
+
+        while (_block is not None):
+            _pending_rows.extend(encode_rows(_block, block_size=block_size))
+            _block = next(_blocks, None)
+
+            _spans = list(dataframe_chunk_spans(
+                np.fromiter(map(len, _pending_rows), dtype=np.int64, count=len(_pending_rows)) + _row_overhead,
+                size_limit=limits.max_bytes,
+                empty_size=len(payload_format.prefix) + len(payload_format.suffix),
+                separator_size=len(payload_format.separator),
+                row_limit=limits.max_rows,
+                row_size_limit=limits.max_row_bytes,
+                offset=_offset,
+            ))
+
+            if (_block is not None and _spans):
+                # The last span may still be extended by the rows of the next block
+                _spans.pop()
+
+            for _start, _stop in _spans:
+                yield make_encoded_chunk(
+                    _pending_rows[_start:_stop],
+                    payload_format=payload_format,
+                    start=_offset+_start,
+                )
+
+            _consumed = _spans[-1][1] if (_spans) else 0
+            del _pending_rows[:_consumed]
+            _offset += _consumed
+
+        return
+
+    for _start, _encoded_rows in buffered_chunk_spans(
+        encode_rows(data),
+        row_size=lambda _row: len(_row) + _row_overhead,
+        size_limit=limits.max_bytes,
+        empty_size=len(payload_format.prefix) + len(payload_format.suffix),
+        separator_size=len(payload_format.separator),
+        row_limit=limits.max_rows,
+        row_size_limit=limits.max_row_bytes,
+    ):
+        yield make_encoded_chunk(
+            _encoded_rows,
+            payload_format=payload_format,
+            start=_start,
+        )
+
+def encoded_files(
+    data:Union[
+        Iterable[Dict[str,str]],
+        pd.DataFrame
+    ],
+    payload_format:PayloadFormat=NDJSON_FORMAT,
+    limits:RequestLimits=None,
+    suffix:str=".json",
+    directory:str=None,
+)->Generator[
+    EncodedFile,
+    None,
+    None
+]:
+    """
+    Generator function to encode data into temporary files, each guaranteed to be within limits.
+
+    Rows are written to the file as soon as they are encoded, so only one row is held in memory at a time,
+    regardless of how big the files are allowed to be. Each file is closed before it is yielded.
+
+    Parameters:
+    - payload_format    PayloadFormat of each file; newline delimited JSON by default.
+    - limits            RequestLimits for each file, as per chunks().
+    - suffix            File name suffix of the temporary files.
+    - directory         Directory to write the files in. If None, the system temporary directory is used.
+    """
+    if (limits is None):
+        limits = RequestLimits()
+
+    _row_overhead = get_row_overhead(payload_format)
+    _file = None
+    _file_rows = 0
+
+    def _open():
+        nonlocal _file, _file_rows
+        _file = tempfile.NamedTemporaryFile(
+            mode="wb",
+            suffix=suffix,
+            dir=directory,
+            delete=False,
+        )
+        _file.write(payload_format.prefix)
+        _file_rows = 0
+
+    def _written_sizes():
+        nonlocal _file_rows
+        for _row in encode_rows(data):
+            yield len(_row) + _row_overhead
+
+            # chunk_spans() only asks for the next size once it has decided which file this row belongs to;
+            # if it cut a span before this row, the previous file has been closed and a new one opened by now.
+            if (_file_rows):
+                _file.write(payload_format.separator)
+            _file.write(wrap_row(_row, payload_format=payload_format))
+            _file_rows += 1
+
+    _open()
+    try:
+        for _start, _stop in chunk_spans(
+            _written_sizes(),
+            size_limit=limits.max_bytes,
+            empty_size=len(payload_format.prefix) + len(payload_format.suffix),
+            separator_size=len(payload_format.separator),
+            row_limit=limits.max_rows,
+            row_size_limit=limits.max_row_bytes,
+        ):
+            _file.write(payload_format.suffix)
+            _file.close()
+
+            _encoded_file = EncodedFile(
+                path=_file.name,
+                rows=_stop-_start,
+                size=os.path.getsize(_file.name),
+                start=_start,
+            )
+            # Once yielded, the file belongs to the caller
+            _file = None
+
+            yield _encoded_file
+
+            _open()
+    finally:
+        # The last file opened is always empty, or left over by an Exception
+        if (_file is not None):
+            _file.close()
+            os.remove(_file.name)
+
+def dictionary_columns(
+    table:pa.Table,
+    ratio:float,
+)->List[str]:
+    """
+    Find the columns of table worth dictionary encoding: dictionaries,
+    and strings or binaries with no more than ratio distinct values per row.
+    """
+    _columns = []
+
+    for _field, _column in zip(table.schema, table.columns):
+        if (pa.types.is_dictionary(_field.type)):
+            _columns.append(_field.name)
+        elif (ratio > 0 and len(_column) and \
+            (pa.types.is_string(_field.type) or pa.types.is_large_string(_field.type) or \
+                pa.types.is_binary(_field.type) or pa.types.is_large_binary(_field.type))):
+            if (pc.count_distinct(_column).as_py() <= ratio * len(_column)):
+                _columns.append(_field.name)
+
+    return _columns
+
+def parquet_files(
+    data:Union[
+        Iterable[Dict[str,str]],
+        pd.DataFrame,
+        pa.Table,
+        pa.RecordBatchReader,
+    ],
+    schema:pa.Schema=None,
+    parquet_format:ParquetFormat=DEFAULT_PARQUET_FORMAT,
+    limits:RequestLimits=None,
+    suffix:str=".parquet",
+    directory:str=None,
+)->Generator[
+    EncodedFile,
+    None,
+    None
+]:
+    """
+    Generator function to write data into temporary Parquet files, each of about limits.max_bytes and no more than limits.max_rows rows.
+
+    data is converted by to_arrow(schema=schema), so that every file has exactly the same schema.
+    Row groups are sized from the in-memory size of the data, to about parquet_format.row_group_bytes each.
+    The compressed size of the rows written so far is then used to size the last row group of each file,
+    so that the file ends close to limits.max_bytes; as the size is only known after compression,
+    limits.max_bytes is a target rather than a hard cap. limits.max_row_bytes is not used.
+
+    Parameters:
+    - schema            pa.Schema of the files. If None, that of the data.
+    - parquet_format    ParquetFormat of the files: codec, row group size and dictionary encoding.
+    - limits            RequestLimits for each file.
+    - suffix            File name suffix of the temporary files.
+    - directory         Directory to write the files in. If None, the system temporary directory is used.
+    """
+    if (limits is None):
+        limits = RequestLimits()
+
+    _max_bytes = limits.max_bytes if (limits.max_bytes is not None) else float("inf")
+    _max_rows = limits.max_rows if (limits.max_rows is not None) else float("inf")
+
+    data = to_arrow(data, schema=schema)
+
+    _file = None
+    _writer = None
+    _file_rows = 0
+    _start = 0
+
+    def _close()->EncodedFile:
+        nonlocal _file, _writer, _start
+        _writer.close()
+        _file.close()
+
+        _encoded_file = EncodedFile(
+            path=_file.name,
+            rows=_file_rows,
+            size=os.path.getsize(_file.name),
+            start=_start,
+        )
+        _start += _file_rows
+
+        # Once yielded, the file belongs to the caller
+        _file = None
+        _writer = None
+
+        return _encoded_file
+
+    try:
+        for _table in iter_arrow_tables(data):
+            _row_group_rows = max(
+                1,
+                int(parquet_format.row_group_bytes * len(_table) / max(1, _table.nbytes)),
+            )
+
+            _offset = 0
+            while (_offset < len(_table)):
+                if (_writer is None):
+                    _file = tempfile.NamedTemporaryFile(
+                        mode="wb",
+                        suffix=suffix,
+                        dir=directory,
+                        delete=False,
                     )
+                    _writer = pq.ParquetWriter(
+                        _file,
+                        _table.schema,
+                        compression=parquet_format.compression,
+                        compression_level=parquet_format.compression_level,
+                        use_dictionary=dictionary_columns(
+                            _table.slice(_offset, _row_group_rows),
+                            ratio=parquet_format.dictionary_ratio,
+                        ),
+                    )
+                    _file_rows = 0
+
+                _rows = min(
+                    _row_group_rows,
+                    len(_table) - _offset,
+                    _max_rows - _file_rows,
                 )
 
-            # size_limit is a hard cap, so if the size exceeds it, we have to cut it back.
-            if (chunk_size > size_limit):
-                _oversize = True
-                for chunk_length in range(chunk_length, 1, -1):
-                    _chunk = subset(
-                                data,
-                                start=chunk_start,
-                                size=chunk_length,
-                            )
-                    if (json_size(_chunk) <= size_limit):
-                        _oversize = False
-                        yield _chunk
-                        break
-
-                if (_oversize):
-                    raise WarehouseRowOversize(
-                        f"Row #{chunk_start} has a size of {json_size(_chunk):d}, which exceeds size limit of {size_limit:,d} bytes."
+                if (_file_rows and limits.max_bytes is not None):
+                    # Estimate how many more rows fit from the compressed size so far
+                    _rows = min(
+                        _rows,
+                        int((_max_bytes - _file.tell()) * _file_rows / max(1, _file.tell())),
                     )
-            else:
-                yield subset(
-                                data,
-                                start=chunk_start,
-                                size=chunk_length,
-                            )
-            
-            # move the start index
-            chunk_start += chunk_length
-        
+
+                if (_rows <= 0):
+                    yield _close()
+                    continue
+
+                _writer.write_table(
+                    _table.slice(_offset, _rows),
+                    row_group_size=_rows,
+                )
+                _offset += _rows
+                _file_rows += _rows
+
+                if (_file.tell() >= _max_bytes or _file_rows >= _max_rows):
+                    yield _close()
+
+        if (_writer is not None):
+            yield _close()
+    finally:
+        # Left over by an Exception or by the generator being closed early
+        if (_writer is not None):
+            _writer.close()
+            _file.close()
+            os.remove(_file.name)
@@ -20,6 +20,11 @@ class WarehouseAPINotInstalled(WarehouseAPIFaked):
 class WarehouseAPICredentialsMissing(WarehouseAPIFaked):
     pass
 
+class WarehouseKeyCollision(UserWarning):
+    """
+    Warning issued when different keys are cleaned into the same field name, e.g. "b 1" and "b.1".
+    """
+
 class WarehouseInvalidInput(RuntimeError):
     def __bool__(self):
         return False
@@ -42,8 +47,38 @@ class WarehouseTableGenericError(RuntimeError):
     def __bool__(self):
         return False
     __nonzero__ = __bool__
+
+class WarehouseTableLoadIncomplete(WarehouseTableGenericError):
+    """
+    Some chunks of the data failed to load.
+
+    chunk_errors holds a load_datawarehouse.upload.ChunkError for each failed chunk,
+    and exception is that of the first failed chunk.
+    result holds the load_datawarehouse.upload.LoadResult of the whole load, if available.
+    """
+    def __init__(
+        self,
+        *args,
+        exception:Exception,
+        chunk_errors:list,
+        result:tuple=None,
+        **kwargs,
+    )->None:
+        super().__init__(
+            *args,
+            exception=exception,
+            **kwargs,
+        )
+
+        self.chunk_errors = chunk_errors
+        self.result = result
         
 
+class WarehouseJournalMismatch(WarehouseInvalidInput):
+    """
+    The input of a load does not match the LoadJournal it is resumed from.
+    """
+
 class WarehouseAccessDenied(RuntimeError):
     def __bool__(self):
         return False
@@ -0,0 +1,228 @@
+import os, sys
+
+import enum
+import glob
+import gzip
+import itertools
+import json
+from typing import Any, Dict, Generator, Iterable, List, Union
+
+import pyarrow as pa
+import pyarrow.csv
+import pyarrow.parquet as pq
+
+from load_datawarehouse.config import FILE_BATCH_ROWS, FILE_BLOCK_BYTES
+import load_datawarehouse.data
+
+
+class FileFormat(enum.Enum):
+    """
+    Formats of local files that can be read as data.
+    """
+    NDJSON                  ="NDJSON"       # Newline delimited JSON; one record per line.
+    CSV                     ="CSV"
+    PARQUET                 ="PARQUET"
+
+# File name extensions of each FileFormat; a further ".gz" is allowed for text formats.
+FILE_FORMAT_EXTENSIONS = {
+    ".json":    FileFormat.NDJSON,
+    ".jsonl":   FileFormat.NDJSON,
+    ".ndjson":  FileFormat.NDJSON,
+    ".csv":     FileFormat.CSV,
+    ".parquet": FileFormat.PARQUET,
+    ".pq":      FileFormat.PARQUET,
+}
+
+
+def is_path(obj:Any)->bool:
+    """
+    Determines if obj is a path or glob of local files, or a list of them, rather than data itself.
+    """
+    if (isinstance(obj, (list, tuple))):
+        return len(obj) > 0 and all(is_path(_item) for _item in obj)
+    else:
+        return isinstance(obj, (str, os.PathLike))
+
+def expand_paths(
+    paths:Union[
+        str,
+        os.PathLike,
+        Iterable[Union[str, os.PathLike]],
+    ],
+)->List[str]:
+    """
+    Expand paths and globs into a list of file paths, in order; each glob is sorted by name.
+
+    Raises FileNotFoundError if a path does not exist or a glob matches no files.
+    """
+    if (isinstance(paths, (str, os.PathLike))):
+        paths = (paths, )
+
+    _paths = []
+    for _path in paths:
+        _path = os.fspath(_path)
+
+        if (os.path.exists(_path)):
+            _paths.append(_path)
+        else:
+            _matches = sorted(glob.glob(_path, recursive=True))
+
+            if (not _matches):
+                raise FileNotFoundError(f"No files found at {_path}.")
+
+            _paths.extend(_matches)
+
+    return _paths
+
+def detect_file_format(path:str)->FileFormat:
+    """
+    Find the FileFormat of path from its extension.
+
+    Raises ValueError if the extension is not recognised.
+    """
+    _root, _extension = os.path.splitext(path.lower())
+
+    if (_extension == ".gz"):
+        _root, _extension = os.path.splitext(_root)
+
+    if (_extension not in FILE_FORMAT_EXTENSIONS):
+        raise ValueError(f"Cannot tell the format of {path}; expected one of {', '.join(FILE_FORMAT_EXTENSIONS)}.")
+
+    return FILE_FORMAT_EXTENSIONS[_extension]
+
+def read_ndjson(
+    path:str,
+    block_bytes:int=FILE_BLOCK_BYTES,
+)->Generator[Dict[str, Any], None, None]:
+    """
+    Generator function to read records from a newline delimited JSON file, one line at a time through a buffered reader.
+
+    Records of NDJSON do not need to share the same keys or types, so they are read as records rather than Arrow.
+    Blank lines are skipped.
+    """
+    if (path.lower().endswith(".gz")):
+        _fHnd = gzip.open(path, "rb")
+    else:
+        _fHnd = open(path, "rb", buffering=block_bytes)
+
+    with _fHnd:
+        for _line in _fHnd:
+            if (_line.strip()):
+                yield json.loads(_line)
+
+def read_csv(
+    path:str,
+    block_bytes:int=FILE_BLOCK_BYTES,
+)->pa.RecordBatchReader:
+    """
+    Open a CSV file as a RecordBatchReader; it is parsed one block of block_bytes at a time,
+    with the column types inferred from the first block.
+    """
+    return pyarrow.csv.open_csv(
+        pa.input_stream(path, compression="detect"),
+        read_options=pyarrow.csv.ReadOptions(block_size=block_bytes),
+    )
+
+def read_parquet(
+    path:str,
+    batch_rows:int=FILE_BATCH_ROWS,
+)->pa.RecordBatchReader:
+    """
+    Open a Parquet file as a RecordBatchReader through a memory map; batches of batch_rows rows are decoded as they are read.
+    """
+    _file = pq.ParquetFile(path, memory_map=True)
+
+    return pa.RecordBatchReader.from_batches(
+        _file.schema_arrow,
+        _file.iter_batches(batch_size=batch_rows),
+    )
+
+def read_file(
+    path:str,
+    file_format:FileFormat=None,
+    batch_rows:int=FILE_BATCH_ROWS,
+    block_bytes:int=FILE_BLOCK_BYTES,
+)->Union[
+    pa.RecordBatchReader,
+    Generator[Dict[str, Any], None, None],
+]:
+    """
+    Open a local file as a stream: a RecordBatchReader for CSV and Parquet, or a generator of records for NDJSON.
+
+    Nothing is read until the stream is consumed, and only one batch or block is held in memory at a time.
+
+    Parameters:
+    - file_format       FileFormat of the file. If None, it is detected from the extension.
+    - batch_rows        Number of rows in each batch read from Parquet.
+    - block_bytes       Size of each block read from CSV, and of the read buffer of NDJSON.
+    """
+    if (file_format is None):
+        file_format = detect_file_format(path)
+
+    file_format = FileFormat(file_format)
+
+    if (file_format is FileFormat.PARQUET):
+        return read_parquet(path, batch_rows=batch_rows)
+    elif (file_format is FileFormat.CSV):
+        return read_csv(path, block_bytes=block_bytes)
+    else:
+        return read_ndjson(path, block_bytes=block_bytes)
+
+def read_files(
+    paths:Union[
+        str,
+        os.PathLike,
+        Iterable[Union[str, os.PathLike]],
+    ],
+    file_format:FileFormat=None,
+    batch_rows:int=FILE_BATCH_ROWS,
+    block_bytes:int=FILE_BLOCK_BYTES,
+)->Union[
+    pa.RecordBatchReader,
+    Generator[Dict[str, Any], None, None],
+]:
+    """
+    Open local files, paths or globs as a single stream, in order; see read_file() for each file.
+
+    Each file is only opened once the previous one is exhausted, so memory scales with the batch size rather than the files.
+
+    If all the files are CSV or Parquet, a single RecordBatchReader is returned,
+    with the schema of the first file; batches of the other files are made to fit it, as per load_datawarehouse.data.conform_arrow().
+    Otherwise, a generator of records of all the files is returned.
+
+    Parameters:
+    - paths             Path, glob or a list of them; see expand_paths().
+    - file_format       FileFormat of all the files. If None, it is detected from the extension of each file.
+    """
+    _paths = expand_paths(paths)
+    _formats = [
+        FileFormat(file_format) if (file_format is not None) else detect_file_format(_path) \
+            for _path in _paths
+    ]
+
+    _streams = (
+        read_file(
+            _path,
+            file_format=_format,
+            batch_rows=batch_rows,
+            block_bytes=block_bytes,
+        ) for _path, _format in zip(_paths, _formats)
+    )
+
+    if (FileFormat.NDJSON in _formats):
+        return itertools.chain.from_iterable(
+            load_datawarehouse.data.iter_records(_stream) for _stream in _streams
+        )
+
+    _first = next(_streams)
+
+    def _batches():
+        yield from _first
+        for _stream in _streams:
+            for _batch in _stream:
+                yield load_datawarehouse.data.conform_arrow(_batch, _first.schema)
+
+    return pa.RecordBatchReader.from_batches(
+        _first.schema,
+        _batches(),
+    )
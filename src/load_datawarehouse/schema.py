@@ -1,5 +1,10 @@
+import os, sys
 from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
 from copy import copy
+import functools
+import hashlib
+import json
 from datetime import date, datetime, time
 
 from typing import List, OrderedDict, Union, Iterable, Dict, Any, Generator
@@ -7,13 +12,17 @@ from typing import List, OrderedDict, Union, Iterable, Dict, Any, Generator
 import numpy as np
 import pandas as pd
 
-# from load_datawarehouse.config import   MIN_RECORDS_TO_TRIGGER_DIFF_CHECK, \
-#                                         MAX_FACTOR_OF_RECORDS_WHICH_ADDS_FIELDS                                
+from load_datawarehouse.config import   MIN_RECORDS_TO_TRIGGER_DIFF_CHECK, \
+                                        PARALLEL_SHARD_SIZE, \
+                                        SCHEMA_SAMPLE_SIZE, \
+                                        TYPE_PROMOTION_CACHE_SIZE
+# from load_datawarehouse.config import   MAX_FACTOR_OF_RECORDS_WHICH_ADDS_FIELDS
 
 from load_datawarehouse.api import bigquery, bigquery_types
 
 
 import load_datawarehouse.data
+import load_datawarehouse.upload
 
 from ordered_set import OrderedSet
 
@@ -34,7 +43,7 @@ from ordered_set import OrderedSet
     TODO: Read through API Reference of BigQuery, Snowflake and Redshift to determine a UniversalSchema class - this module should be built around UniversalSchema, with platform specific submodules
     doing their own conversions to the respective schemas.
 
-    Currently the closest thing to UniversalSchema is RecordFields - which is a namedtuple that may contain instances of itself, allowing sub-fields etc.
+    Currently the closest thing to UniversalSchema is RecordFields - which is a schema node that may contain instances of itself, allowing sub-fields etc.
     However it was designed mostly for BigQuery and thus require some reviewing down the line.
 """
 
@@ -81,6 +90,82 @@ class ListField(tuple):
     """
     pass
 
+class RecordFields():
+    """
+    Immutable schema node of a record: a value, usually a tuple of types or a condensed warehouse type, for each field name.
+
+    This behaves like a namedtuple - iterating it gives the values, _fields gives the field names,
+    and each field can be read as an attribute or by index - without creating a class for every node.
+    Field names are interned, and nodes with the same field names share the same _fields tuple.
+
+    Nodes are equal if their field names and values are, so they can be used in sets of types.
+    """
+    __slots__ = (
+        "_fields",
+        "_values",
+        "_hash",
+    )
+
+    # Tuples of field names seen so far, so that nodes of the same shape share them
+    _field_names = {}
+
+    def __init__(
+        self,
+        fields:Dict[str, Any]=None,
+        **kwargs,
+    ):
+        if (fields is None):
+            fields = kwargs
+        elif (kwargs):
+            fields = {**fields, **kwargs}
+
+        _names = tuple(sys.intern(str(_name)) for _name in fields.keys())
+
+        self._fields = self._field_names.setdefault(_names, _names)
+        self._values = tuple(fields.values())
+        self._hash = None
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __len__(self)->int:
+        return len(self._values)
+
+    def __getitem__(self, index:int)->Any:
+        return self._values[index]
+
+    def __getattr__(self, name:str)->Any:
+        # Only called for names that are not slots; those are not set yet when unpickling.
+        try:
+            _fields = object.__getattribute__(self, "_fields")
+        except AttributeError as e:
+            raise AttributeError(name)
+
+        if (name in _fields):
+            return self._values[_fields.index(name)]
+        else:
+            raise AttributeError(f"RecordFields has no field {name}.")
+
+    def __eq__(self, other:Any)->bool:
+        return isinstance(other, RecordFields) and \
+            self._fields == other._fields and \
+            self._values == other._values
+
+    def __hash__(self)->int:
+        if (self._hash is None):
+            self._hash = hash((self._fields, self._values))
+
+        return self._hash
+
+    def __repr__(self)->str:
+        return "RecordFields(" + ", ".join(f"{_name}={_value!r}" for _name, _value in zip(self._fields, self._values)) + ")"
+
+    def __reduce__(self):
+        return (RecordFields, (self._asdict(), ))
+
+    def _asdict(self)->Dict[str, Any]:
+        return dict(zip(self._fields, self._values))
+
 def is_records(
     obj:Any
     )->bool:
@@ -91,13 +176,9 @@ def is_records(
     """
 
     if (isinstance(obj, type)):
-        _type = obj
-        return (issubclass(_type, tuple) and \
-                _type.__name__ == "RecordFields")
+        return issubclass(obj, RecordFields)
     else:
-        _instance = obj
-        return (isinstance(_instance, tuple) and \
-                type(_instance).__name__ == "RecordFields")
+        return isinstance(obj, RecordFields)
 
 def expand_iterable(
     obj:Iterable,
@@ -217,7 +298,7 @@ def convert_schema_field_to_record_field(
             Dict,
         ],
     ],
-)->tuple:
+)->RecordFields:
     """
     Converts a field from an existing platform specific schema to RecordFields.
 
@@ -257,10 +338,7 @@ def convert_schema_field_to_record_field(
             # its SCALAR
             _fields[_cleaned_field_name] = _field_type
     
-    return namedtuple("RecordFields",
-                    field_names=_fields.keys())(
-                    **_fields,
-                )
+    return RecordFields(_fields)
 
 def condense_record_fields(
     record_fields:tuple,
@@ -397,10 +475,7 @@ def condense_record_fields(
     }
     """
 
-    return namedtuple("RecordFields",
-                    field_names=_record_fields_condensed.keys())(
-                    **_record_fields_condensed,
-                )
+    return RecordFields(_record_fields_condensed)
 
     
 
@@ -431,6 +506,79 @@ def condense_list_fields(
         )
     )
 
+"""
+Python types that take precedence over any numeric type, in order; e.g. a field of str and int values is a STRING.
+"""
+_TYPE_SWITCH = (
+    (bytes,     "BYTES"),
+    (datetime,  "DATETIME"),
+    (date,      "DATE"),
+    (time,      "TIME"),
+    (str,       "STRING"),
+)
+_WAREHOUSE_DTYPES_SWITCHED = set(_warehouse_dtype for _py_dtype, _warehouse_dtype in _TYPE_SWITCH)
+
+@functools.lru_cache(maxsize=TYPE_PROMOTION_CACHE_SIZE)
+def _get_type_category(
+    type_:Union[
+        np.dtype,
+        type,
+    ],
+    force_numeric:bool=False,
+)->Union[
+    str,
+    np.dtype,
+]:
+    """
+    The place of a single type in the promotion lattice: the warehouse type of _TYPE_SWITCH if it is one of those,
+    otherwise its numpy dtype.
+
+    Internal function only, not supported.
+    """
+    if (not force_numeric and isinstance(type_, type)):
+        for _py_dtype, _warehouse_dtype in _TYPE_SWITCH:
+            if (issubclass(type_, _py_dtype)):
+                return _warehouse_dtype
+
+    try:
+        return np.dtype(type_)
+    except TypeError as e:
+        return np.dtype("O")
+
+@functools.lru_cache(maxsize=TYPE_PROMOTION_CACHE_SIZE)
+def promote_types(
+    types:tuple,
+    force_numeric:bool=False,
+)->Union[
+    str,
+    None,
+]:
+    """
+    Find the common type of a tuple of types, which is cached for each distinct tuple:
+    - the warehouse type of the first type in _TYPE_SWITCH, e.g. "STRING", which wins over any numeric type;
+    - otherwise the name of the numpy dtype that all the types promote to, e.g. int and float to "float64",
+      or None if there is no common numeric type.
+
+    If force_numeric is True, _TYPE_SWITCH is ignored.
+    """
+    _categories = tuple(
+        _get_type_category(_type, force_numeric=force_numeric) for _type in types
+    )
+
+    for _category in _categories:
+        if (isinstance(_category, str)):
+            return _category
+
+    if (not _categories):
+        return None
+
+    _np_dtype = functools.reduce(np.promote_types, _categories)
+
+    if (_np_dtype == np.dtype("O")):
+        return None
+    else:
+        return _np_dtype.name
+
 def guess_warehouse_dtype(
     types:Iterable[
         Union[
@@ -446,55 +594,478 @@ def guess_warehouse_dtype(
     Guess the best platformspecific data type from an iterable of types.
     Note that the input is of TYPES, not INSTANCES of the types.
 
-    Pass the correct platform specific warehouse_dtype_mapper to get the correct type.
+    Pass the correct platform specific warehouse_dtype_mapper to get the correct type;
+    the common type itself is looked up from promote_types(), which is cached for each distinct tuple of types.
     '''
 
     types = tuple(types) # Make it a tuple to get around StopIteration on generators
 
-    if (not force_numeric):
-        _type_switch = OrderedDict({
-            bytes: "BYTES",
-            datetime: "DATETIME",
-            date: "DATE",
-            time: "TIME",
-            str: "STRING",
-        })
-        
-        for _type in types:
-            for _py_dtype, _warehouse_dtype in zip(_type_switch.keys(), _type_switch.values()):
-                if (issubclass(_py_dtype, _type)):
-                    return _warehouse_dtype
-
-    _np_dtype = np.find_common_type(
-        [],
-        list(types)
-    )
+    _common_type = promote_types(types, force_numeric=force_numeric)
 
-    if (_np_dtype and \
-        _np_dtype is not np.dtype("O")):
-        _warehouse_dtype = warehouse_dtype_mapper.get(
-            _np_dtype.name,
-            None
-        )
+    if (_common_type is None):
+        return None
+    elif (_common_type in warehouse_dtype_mapper):
+        return warehouse_dtype_mapper[_common_type]
+    elif (_common_type in _WAREHOUSE_DTYPES_SWITCHED):
+        return _common_type
     else:
-        _warehouse_dtype = None
+        return None
 
-    return _warehouse_dtype
+def add_signature(
+    obj:Any,
+    signature:set,
+    path:tuple=(),
+)->set:
+    """
+    Add the structure of obj to signature, a set of (path, type) for every value found in obj, including Nones and containers.
+    Items of lists are under path + (None, ).
 
-    
+    Two collections of records with the same signature deconstruct into the same fields and types,
+    so this is a much cheaper way to tell if more records would add anything to a schema than deconstruct_records().
+    """
+    signature.add((path, type(obj)))
+
+    if (isinstance(obj, dict)):
+        for _key, _value in obj.items():
+            add_signature(_value, signature, path + (_key, ))
+    elif (isinstance(obj, pd.DataFrame)):
+        for _item in obj.to_dict(orient="records"):
+            add_signature(_item, signature, path + (None, ))
+    elif (isinstance(obj, (list, tuple, np.ndarray, pd.Series))):
+        for _item in obj:
+            add_signature(_item, signature, path + (None, ))
+
+    return signature
+
+def sample_records_until_stable(
+    records:Iterable[dict],
+    stable_records:int=MIN_RECORDS_TO_TRIGGER_DIFF_CHECK,
+)->tuple:
+    """
+    Take records from the head of records until stable_records records in a row added no new fields or types.
+
+    Returns (sample, signature), where sample is the list of records taken, and signature is as per add_signature().
+    """
+    _sample = []
+    _signature = set()
+    _stable_count = 0
+
+    for _record in records:
+        _signature_size = len(_signature)
+        add_signature(_record, _signature)
+        _sample.append(_record)
+
+        if (len(_signature) > _signature_size):
+            _stable_count = 0
+        else:
+            _stable_count += 1
+
+            if (_stable_count >= stable_records):
+                break
+
+    return _sample, _signature
+
+def sample_records_with_signature(
+    records:Iterable[dict],
+    stable_records:int=MIN_RECORDS_TO_TRIGGER_DIFF_CHECK,
+)->tuple:
+    """
+    Take records from the head of records as per sample_records_until_stable(),
+    while getting the signature of all of records as per get_records_signature(), in a single pass.
+
+    Returns (sample, sample_signature, signature); the records after the sample have a field or type not in the sample
+    if, and only if, signature is larger than sample_signature.
+    """
+    _sample = []
+    _sample_signature = None
+    _signature = set()
+    _shapes = set()
+    _stable_count = 0
+
+    for _record in records:
+        _signature_size = len(_signature)
+        _shape = _get_shape(_record)
+
+        if (_shape is None):
+            add_signature(_record, _signature)
+        elif (_shape not in _shapes):
+            _shapes.add(_shape)
+            add_signature(_record, _signature)
+
+        if (_sample_signature is None):
+            # Still sampling; a record of a shape already seen adds nothing to the signature, as in sample_records_until_stable()
+            _sample.append(_record)
+
+            if (len(_signature) > _signature_size):
+                _stable_count = 0
+            else:
+                _stable_count += 1
+
+                if (_stable_count >= stable_records):
+                    _sample_signature = frozenset(_signature)
+
+    if (_sample_signature is None):
+        _sample_signature = frozenset(_signature)
+
+    return _sample, _sample_signature, frozenset(_signature)
+
+def get_records_signature(
+    records:Iterable[dict],
+)->frozenset:
+    """
+    Get the signature of all of records, as per add_signature().
+
+    Each record is only scanned for its shape, i.e. its keys and the types of its values, which is much cheaper than
+    adding it to the signature; only the first record of each shape is added.
+    """
+    _signature = set()
+    _shapes = set()
+
+    for _record in records:
+        _shape = _get_shape(_record)
+
+        if (_shape is None):
+            add_signature(_record, _signature)
+        elif (_shape not in _shapes):
+            _shapes.add(_shape)
+            add_signature(_record, _signature)
+
+    return frozenset(_signature)
+
+# Types found by _get_shape() not to be containers, so that values of these types need no further checks.
+_SCALAR_TYPES = set()
+
+def _get_shape(
+    obj:Any,
+)->Any:
+    """
+    Get the shape of obj: a hashable of its type, and for containers, of their keys and the shapes of their items.
+    Objects of the same shape add the same (path, type)s to a signature, see add_signature().
+    Returns None if obj has no cheap shape, such as a DataFrame.
+
+    Internal function only, not supported.
+    """
+    _type = type(obj)
+
+    if (_type in _SCALAR_TYPES):
+        return _type
+    elif (isinstance(obj, dict)):
+        _types = tuple(map(type, obj.values()))
+
+        if (_SCALAR_TYPES.issuperset(_types)):
+            return (_type, tuple(obj), _types)
+
+        _shapes = tuple(map(_get_shape, obj.values()))
+
+        if (None in _shapes):
+            return None
+
+        return (_type, tuple(obj), _shapes)
+    elif (isinstance(obj, (list, tuple, np.ndarray, pd.Series))):
+        _types = frozenset(map(type, obj))
+
+        if (_SCALAR_TYPES.issuperset(_types)):
+            return (_type, _types)
+
+        _shapes = frozenset(map(_get_shape, obj))
+
+        if (None in _shapes):
+            return None
+
+        return (_type, _shapes)
+    elif (isinstance(obj, pd.DataFrame)):
+        return None
+    else:
+        _SCALAR_TYPES.add(_type)
+        return _type
+
+def fingerprint_records(
+    records:Iterable[dict],
+)->str:
+    """
+    Get the structural fingerprint of records: a hex digest of every nested key path and type of value found in them,
+    see get_records_signature().
+
+    Records with the same fingerprint deconstruct into the same fields and types, regardless of their values or how many there are.
+    The fingerprint does not depend on the order of the records or keys, and is the same across processes.
+    """
+    return get_signature_fingerprint(
+        get_records_signature(records)
+    )
+
+def get_signature_fingerprint(
+    signature:Iterable[tuple],
+)->str:
+    """
+    Get the hex digest of a signature, as per add_signature(); see fingerprint_records().
+    """
+    _items = sorted(
+        json.dumps([_path, f"{_type.__module__}.{_type.__qualname__}"], default=repr) \
+            for _path, _type in signature
+    )
+
+    return hashlib.sha256("\n".join(_items).encode("utf-8")).hexdigest()
+
+def has_new_signature(
+    records:Iterable[dict],
+    signature:set,
+)->bool:
+    """
+    Validation pass: check if any of records has a field or type not in signature, stopping at the first one found.
+
+    signature is not modified.
+    """
+    for _record in records:
+        if (_has_new_signature(_record, signature)):
+            return True
+
+    return False
+
+def _has_new_signature(
+    obj:Any,
+    signature:set,
+    path:tuple=(),
+)->bool:
+    """
+    Check if obj has anything that add_signature() would add to signature, without building its signature.
+
+    Internal function only, not supported.
+    """
+    if ((path, type(obj)) not in signature):
+        return True
+
+    if (isinstance(obj, dict)):
+        for _key, _value in obj.items():
+            if (_has_new_signature(_value, signature, path + (_key, ))):
+                return True
+    elif (isinstance(obj, pd.DataFrame)):
+        for _item in obj.to_dict(orient="records"):
+            if (_has_new_signature(_item, signature, path + (None, ))):
+                return True
+    elif (isinstance(obj, (list, tuple, np.ndarray, pd.Series))):
+        for _item in obj:
+            if (_has_new_signature(_item, signature, path + (None, ))):
+                return True
+
+    return False
+
+"""
+Types of values that are deconstructed as a collection of records or list items, rather than as a scalar.
+"""
+_NESTED_TYPES = (
+    dict,
+    tuple,
+    list,
+    np.ndarray,
+    pd.DataFrame,
+    pd.Series,
+)
+
+class RecordsAccumulator():
+    """
+    Mutable accumulator of the fields and types found in records, behind deconstruct_records().
+
+    Records can be added one at a time with add(), or in batches with update(); result() then gives the
+    DeconstructedRecords or DeconstructedList of all the records so far, and can be called at any point.
+
+    Each field keeps a dict of the types found under it, in the order first found, which is updated in place;
+    adding a record only touches the keys of that record, so the cost is linear in the total number of keys.
+    Nested records are kept as a child RecordsAccumulator per field, and the item types of nested lists as a child dict;
+    they are keyed by the DeconstructedRecords and DeconstructedList classes respectively among the types of the field.
+    """
+    def __init__(
+        self,
+        keep_records:bool=True,
+    ):
+        self.keep_records = keep_records
+        self.fields = OrderedDict()
+        self.records = []
+        self.type_errors = []
+        self.records_count = 0
+        self.total_count = 0
+        self.records_adding_fields = 0
+        self._clean_keys = {}
+
+    def update(
+        self,
+        records:Iterable[dict],
+    )->"RecordsAccumulator":
+        """
+        Add a batch of records.
+        """
+        for _record in records:
+            self.add(_record)
+
+        return self
+
+    def add(
+        self,
+        record:dict,
+    ):
+        """
+        Add a single record; anything that is not a dict is kept as a type error.
+        """
+        self.total_count += 1
+
+        if (not isinstance(record, dict)):
+            # What if this is a list??
+            self.type_errors.append(record)
+            return
+
+        _field_count = len(self.fields)
+
+        for _key, _value in record.items():
+            # This function self-protects against fields having invalid names - but these should have been done at data level before calling this function.
+            _clean_key = self._clean_keys.get(_key, None)
+            if (_clean_key is None):
+                _clean_key = self._clean_keys[_key] = load_datawarehouse.data.clean_field_key(_key)
+
+            _types = self.fields.get(_clean_key, None)
+            if (_types is None):
+                _types = self.fields[_clean_key] = {}
+
+            # Nones are not types; the field is still recorded.
+            if (_value is None):
+                continue
+            elif (isinstance(_value, _NESTED_TYPES)):
+                self._add_nested(_types, _value)
+            else:
+                _types[type(_value)] = None
+
+        if (self.records_count and len(self.fields) > _field_count):
+            self.records_adding_fields += 1
+
+        self.records_count += 1
+
+        if (self.keep_records):
+            self.records.append(record)
+
+    def _add_nested(
+        self,
+        types:Dict[Any, Any],
+        value:Any,
+    ):
+        """
+        Add a nested value to the types of a field.
+
+        If the value contains any dict, these are added to the child RecordsAccumulator, and its other items are dropped;
+        otherwise the types of its items are added to the child dict of list item types.
+
+        Internal function only, not supported.
+        """
+        if (isinstance(value, pd.DataFrame)):
+            value = value.to_dict(orient="records")
+
+        _item_types = {}
+        _child = None
+
+        for _item in value:
+            if (isinstance(_item, dict)):
+                if (_child is None):
+                    _child = types.get(DeconstructedRecords, None)
+                    if (_child is None):
+                        _child = types[DeconstructedRecords] = RecordsAccumulator(keep_records=False)
+
+                _child.add(_item)
+            elif (_child is None):
+                _item_types[type(_item)] = None
+
+        if (_child is None):
+            types.setdefault(DeconstructedList, {}).update(_item_types)
+
+    def merge(
+        self,
+        other:"RecordsAccumulator",
+    )->"RecordsAccumulator":
+        """
+        Merge the fields and types of other into this accumulator, as if its records were added after those of this one.
+
+        Merging is associative, so partial accumulators of consecutive shards of records, e.g. from different processes or hosts,
+        can be merged in any grouping; the types of each field are a union, so the schema condensed from them
+        does not depend on the order either, other than the order of the fields.
+        factor_of_records_adding_fields is only an estimate after merging: records are counted as adding fields
+        against their own part rather than against the whole.
+
+        Nested accumulators of other are taken over, so other should not be used afterwards.
+        """
+        for _key, _other_types in other.fields.items():
+            _types = self.fields.get(_key, None)
+            if (_types is None):
+                _types = self.fields[_key] = {}
+
+            for _type, _nested in _other_types.items():
+                if (_type is DeconstructedRecords):
+                    if (DeconstructedRecords in _types):
+                        _types[DeconstructedRecords].merge(_nested)
+                    else:
+                        _types[DeconstructedRecords] = _nested
+                elif (_type is DeconstructedList):
+                    _types.setdefault(DeconstructedList, {}).update(_nested)
+                else:
+                    _types[_type] = None
+
+        self.records.extend(other.records)
+        self.type_errors.extend(other.type_errors)
+        self.records_count += other.records_count
+        self.total_count += other.total_count
+        self.records_adding_fields += other.records_adding_fields
+
+        return self
+
+    def record_fields(self)->RecordFields:
+        """
+        RecordFields of the fields so far, each containing a tuple of its types, RecordFields and/or ListField.
+        """
+        return RecordFields({
+            _key:tuple(
+                _types[_type].record_fields() if (_type is DeconstructedRecords) else \
+                    ListField(_types[_type]) if (_type is DeconstructedList) else \
+                        _type \
+                    for _type in _types
+            ) for _key, _types in self.fields.items()
+        })
+
+    def result(self)->Union[
+        DeconstructedRecords,
+        DeconstructedList,
+    ]:
+        """
+        DeconstructedRecords of the records so far, or DeconstructedList if none of them was a dict.
+        """
+        if (not self.records_count):
+            # Its a List
+            return DeconstructedList(
+                types = ListField(
+                            OrderedSet(
+                                [type(_list_item) for _list_item in self.type_errors]
+                            ),
+                ),
+                list = self.type_errors,
+                type_errors = self.records,
+            )
+        else:
+            return DeconstructedRecords(
+                fields=self.record_fields(),
+                factor_of_records_adding_fields=self.records_adding_fields/self.total_count,
+                records=self.records,
+                type_errors=self.type_errors,
+            )
 
 def deconstruct_records(
     records:Iterable[
         dict # in programming terms, this function will allow records to be a generator object. However it will still consume the generator making it a bit useless.
     ],
+    keep_records:bool=True,
 ):
     """
     Internal function.
     Takes a List[Dict[]], and returns a namedtuple of type DeconstructedRecords with the following fields:
       "fields"
-          A namedtuple of type RecordFields, containing a named field for each key found inside at least one of the records.
+          A RecordFields, containing a named field for each key found inside at least one of the records.
           Each field will contain a tuple of type objects - representing all the unique types of object found under that key.
           If the field is nested, it will contain a tuple of RecordFields instead.
+          Nested records under the same key are merged into one RecordFields, and nested lists into one ListField;
+          condense_record_fields() treats them the same as one RecordFields or ListField per record.
     
           
       "factor_of_records_adding_fields"
@@ -502,6 +1073,7 @@ def deconstruct_records(
           
       "records"
           This is a list of all the dicts found. Anything that is not a dict (i.e. a record) will be excluded.
+          If keep_records is False, this will be an empty list, so that records do not have to be kept in memory.
           
       "type_errors"
           This is a list of all the non-dicts found. Evaluate these to warn the users of dropped data.
@@ -658,116 +1230,59 @@ def deconstruct_records(
           └─── [1]                                                         int                     123
     """
 
-    _field_names = OrderedSet()
-    _fields = OrderedDict({})
-    _added_fields_count = []
-    _type_errors = []
-    _list_out = _type_errors # These are aliases - because both started as lists of something; we don't know whether its a simple list of values or a list of records with invalid entries
-    _records_out = []
+    _accumulator = RecordsAccumulator(keep_records=keep_records)
 
     try:
-        if (records):
-            for _id, _record in enumerate(records):
-                if (isinstance(_record, dict)):
-                    _existing_field_count = len(_field_names)
-                    _dict_keys = list(_record.keys())
-                    _field_names = _field_names | OrderedSet(_dict_keys)
-                    _added_fields_count.append(len(_field_names) - _existing_field_count)
-
-                    # Record all the _py_dtypes involved
-                    for _field in _field_names:
-                        # This function self-protects against fields having invalid names - but these should have been done at data level before calling this function.
-                        _clean_field_name = load_datawarehouse.data.clean_field_key(_field)
-
-                        # See if we have had this field before
-                        if (not _field in _fields):
-                            _fields[_clean_field_name] = OrderedSet()
-
-                        # Using .get() instead of _field in _record allows us to catch _record[_field] that are Nones; which should not be added to _py_dtypes.
-                        if (_record.get(_field, None) is not None):
-                            if (isinstance(
-                                _record[_field],
-                                (
-                                    dict,
-                                    tuple,
-                                    list,
-                                    np.ndarray,
-                                    pd.DataFrame,
-                                    pd.Series,
-                                )
-                            )):
-                                if (isinstance(
-                                    _record[_field],
-                                    (
-                                        pd.DataFrame,
-                                    )
-                                )):
-                                    _obj = _record[_field].to_dict(orient="records")
-                                else:
-                                    _obj = _record[_field]
-
-                                _deconstructed = deconstruct_records(_obj)
-
-                                if (hasattr(_deconstructed, "fields")):
-                                    # Its a RecordFields
-                                    _type = (_deconstructed.fields, )
-                                else:
-                                    # Its a simple List
-                                    _type = (_deconstructed.types, )
-                            else:
-                                _type = (type(_record[_field]), )
-
-                            _fields[_clean_field_name] = _fields[_clean_field_name] | OrderedSet(_type)
-
-                    _records_out.append(
-                        _record,
-                    )
-                else:
-                    # What if this is a list??
-                    _list_out.append(
-                        _record
-                    )
+        _accumulator.update(records)
+    except TypeError as e:
+        raise TypeError(f"Provided records are not iterable; expected Iterable[Dict], {type(records).__name__} found.")
 
-            _total_count = _id+1
-        else:
-            _total_count = 0
+    return _accumulator.result()
 
+def deconstruct_shard(
+    shard:List[dict],
+)->RecordsAccumulator:
+    """
+    Deconstruct a shard of records into a RecordsAccumulator, without keeping the records.
 
-        # Determine if this is a Records or a List
+    This is what runs in each process of deconstruct_records_parallel().
+    """
+    return RecordsAccumulator(keep_records=False).update(shard)
+
+def deconstruct_records_parallel(
+    records:Iterable[dict],
+    processes:int=None,
+    shard_size:int=PARALLEL_SHARD_SIZE,
+)->Union[
+    DeconstructedRecords,
+    DeconstructedList,
+]:
+    """
+    Parallel version of deconstruct_records(keep_records=False), using a pool of processes.
 
-        if (not _records_out):
-            # Its a List
-            return DeconstructedList(
-                types = ListField(
-                            # Force a generator into a tuple so that it becomes immutable; allows set() to be used on it
-                            OrderedSet(
-                                [type(_list_item) for _list_item in _list_out]
-                            ),
-                ),
-                list = _list_out,
-                type_errors = _records_out,
-            )
+    records are split into shards of shard_size records, each deconstructed by deconstruct_shard() in one of the processes;
+    the partial RecordsAccumulators are then merged in order, so the fields are the same as those of deconstruct_records();
+    see RecordsAccumulator.merge() for factor_of_records_adding_fields.
+    No more than processes shards are in flight at a time.
 
-        else:
+    Parameters:
+    - processes         Number of processes. If None, os.cpu_count(); if 1 or less, shards are deconstructed in this process.
+    - shard_size        Number of records sent to a process at a time.
+    """
+    if (processes is None):
+        processes = os.cpu_count() or 1
 
-            if (_added_fields_count):
-                _void = _added_fields_count.pop(0)
-            _factor_of_records_adding_fields = np.count_nonzero(np.array(_added_fields_count))/_total_count
+    _accumulator = RecordsAccumulator(keep_records=False)
 
-            # This function self-protects against fields having invalid names - but these should have been done at data level before calling this function.
-            return DeconstructedRecords(
-            fields=namedtuple("RecordFields",
-                    field_names=( load_datawarehouse.data.clean_field_key(_key) for _key in _fields.keys() ))(
-                    **{
-                    load_datawarehouse.data.clean_field_key(_key):tuple(_py_dtypes) \
-                        for _key, _py_dtypes in \
-                            zip(_fields, _fields.values())
-                    }
-                ),
-            factor_of_records_adding_fields=_factor_of_records_adding_fields,
-            records=_records_out,
-            type_errors=_type_errors,
-            )
+    for _shard, _result in load_datawarehouse.upload.map_bounded(
+        deconstruct_shard,
+        load_datawarehouse.data.iter_shards(records, shard_size=shard_size),
+        concurrency=processes,
+        executor_class=ProcessPoolExecutor,
+    ):
+        if (isinstance(_result, Exception)):
+            raise _result
 
-    except TypeError as e:
-        raise TypeError(f"Provided records are not iterable; expected Iterable[Dict], {type(records).__name__} found.")
+        _accumulator.merge(_result)
+
+    return _accumulator.result()
@@ -0,0 +1,635 @@
+import asyncio
+from collections import deque, namedtuple
+import json
+import os
+from collections.abc import AsyncIterable as AsyncIterableABC
+from concurrent.futures import Executor, ThreadPoolExecutor
+import random
+import time
+from typing import Any, AsyncGenerator, AsyncIterable, Awaitable, Callable, Dict, Generator, Iterable, List, Sequence, Tuple, Union
+
+from load_datawarehouse.exceptions import WarehouseJournalMismatch
+
+"""
+ChunkError records a chunk that failed to upload:
+- start             Index of the first row of the chunk in the input data.
+- rows              Number of rows in the chunk.
+- exception         The Exception describing the failure.
+"""
+ChunkError = namedtuple("ChunkError", [
+    "start",
+    "rows",
+    "exception",
+])
+
+"""
+RowError records a row that failed to insert after all retries:
+- index             Index of the row; relative to the chunk in ChunkResult, and to the input data in LoadResult.
+- errors            List of error dicts as reported by the API, e.g. {"reason": "invalid", "message": ...}.
+"""
+RowError = namedtuple("RowError", [
+    "index",
+    "errors",
+])
+
+"""
+ChunkResult is the outcome of uploading one chunk with insert_with_retries():
+- rows              Number of rows in the chunk.
+- retried           Number of row insertions that were retried; a row retried twice counts twice.
+- row_errors        List of RowError for the rows that still failed after all retries.
+"""
+ChunkResult = namedtuple("ChunkResult", [
+    "rows",
+    "retried",
+    "row_errors",
+])
+
+"""
+RetryPolicy for rows that failed to insert; the delay before retry #n (from 0) is a random number between 0 and
+    min(max_delay, initial_delay * multiplier ** n)
+i.e. exponential backoff with full jitter, so that concurrent uploads do not retry in lockstep.
+"""
+RetryPolicy = namedtuple("RetryPolicy", [
+    "max_retries",
+    "initial_delay",
+    "max_delay",
+    "multiplier",
+], defaults=[5, 1.0, 32.0, 2.0])
+
+DEFAULT_RETRY_POLICY = RetryPolicy()
+
+class LoadResult(namedtuple("LoadResult", [
+    "loaded",
+    "retried",
+    "failed",
+    "row_errors",
+    "skipped",
+], defaults=[0])):
+    """
+    Final result of a load:
+    - loaded            Number of rows loaded.
+    - retried           Number of row insertions that were retried.
+    - failed            Number of rows that failed to load, including those in chunks that failed as a whole.
+    - row_errors        List of RowError for each failed row, with index relative to the input data.
+    - skipped           Number of rows not loaded again, as a LoadJournal shows they were loaded by a previous run.
+
+    Evaluates to False if any row failed to load.
+    """
+    def __bool__(self):
+        return self.failed <= 0
+    __nonzero__ = __bool__
+
+class LoadTally():
+    """
+    Running totals of a load, fed with the results of each chunk in order of the input data.
+    """
+    def __init__(self):
+        self.rows = 0
+        self.chunks = 0
+        self.retried = 0
+        self.skipped = 0
+        self.row_errors = []
+        self.chunk_errors = []
+
+    def skip(
+        self,
+        rows:int,
+    ):
+        """
+        Skip the next chunk of rows rows, which was already loaded by a previous run.
+        """
+        self.chunks += 1
+        self.rows += rows
+        self.skipped += rows
+
+    def add(
+        self,
+        rows:int,
+        result:Union[
+            ChunkResult,
+            Exception,
+        ],
+        convert_exception:Callable[[Exception], Exception]=lambda e: e,
+        replay:Sequence[int]=None,
+    ):
+        """
+        Add the result of the next chunk of rows rows; Exceptions are recorded as ChunkError after convert_exception.
+
+        If replay is provided, only the rows at these indices of the chunk were uploaded, and the indices in result are relative to them;
+        the other rows of the chunk were loaded by a previous run, and are skipped.
+        """
+        if (replay is not None):
+            self.skipped += rows - len(replay)
+
+        if (isinstance(result, Exception)):
+            self.chunk_errors.append(
+                ChunkError(
+                    start=self.rows,
+                    rows=rows if (replay is None) else len(replay),
+                    exception=convert_exception(result),
+                )
+            )
+        else:
+            self.retried += result.retried
+            self.row_errors.extend(
+                RowError(
+                    index=self.rows + (_row_error.index if (replay is None) else replay[_row_error.index]),
+                    errors=_row_error.errors,
+                ) for _row_error in result.row_errors
+            )
+
+        self.chunks += 1
+        self.rows += rows
+
+    def add_entry(
+        self,
+        entry:"JournalEntry",
+        result:Union[
+            ChunkResult,
+            Exception,
+        ],
+        journal:"LoadJournal"=None,
+        convert_exception:Callable[[Exception], Exception]=lambda e: e,
+    ):
+        """
+        Add the result of the next JournalEntry from journal_items(); committed entries are skipped.
+
+        Unless the chunk failed as a whole, the entry is committed to journal, along with the indices of any rows that failed,
+        so that a rerun only loads those rows again.
+        """
+        if (entry.committed):
+            self.skip(entry.rows)
+        else:
+            self.add(
+                entry.rows,
+                result,
+                convert_exception=convert_exception,
+                replay=entry.replay,
+            )
+
+            if (journal is not None and \
+                not isinstance(result, Exception)):
+                journal.commit(
+                    entry.start,
+                    entry.rows,
+                    entry.digest,
+                    failed=[
+                        _row_error.index if (entry.replay is None) else entry.replay[_row_error.index] \
+                            for _row_error in result.row_errors
+                    ],
+                )
+
+    def result(self)->LoadResult:
+        _failed = len(self.row_errors) + sum(_chunk_error.rows for _chunk_error in self.chunk_errors)
+
+        return LoadResult(
+            loaded=self.rows - self.skipped - _failed,
+            retried=self.retried,
+            failed=_failed,
+            row_errors=self.row_errors,
+            skipped=self.skipped,
+        )
+
+"""
+JournalEntry is a chunk as tracked by a LoadJournal:
+- start             Index of the first row of the chunk in the input data.
+- rows              Number of rows in the chunk.
+- digest            Hex digest of the content of the chunk; None if not journaling.
+- item              The chunk itself; or only the rows of it in replay.
+- committed         True if the journal shows that the chunk was loaded by a previous run.
+- replay            Sorted indices of the rows of the chunk that failed in a previous run, and are to be loaded again;
+                    None if the chunk is to be loaded as a whole.
+"""
+JournalEntry = namedtuple("JournalEntry", [
+    "start",
+    "rows",
+    "digest",
+    "item",
+    "committed",
+    "replay",
+], defaults=[None])
+
+class LoadJournal():
+    """
+    Local progress journal of a load, so that a load which stopped part way can be resumed.
+
+    Each chunk that is loaded is appended to the file at path as a line of JSON, with the offset range and digest of its content,
+    and flushed to disk straight away. A rerun of the same load with the same journal, i.e. same input, limits and options,
+    then skips the chunks in the journal, and continues from the first chunk that was not loaded.
+
+    Chunks with rows that failed are journaled with the indices of those rows, so that a rerun only loads them again;
+    the latest line of a chunk is the one that counts. Chunks that failed as a whole are not journaled, and are loaded again on rerun.
+    A journal is only valid for one input; if a chunk in the journal does not match the input of a rerun, WarehouseJournalMismatch is raised.
+
+    Can be used as a context manager.
+    """
+    def __init__(
+        self,
+        path:str,
+    ):
+        self.path = path
+        self.entries = {}
+        self.failed = {}
+        _line = "\n"
+
+        if (os.path.exists(path)):
+            with open(path, "r") as _fHnd:
+                for _line in _fHnd:
+                    try:
+                        _entry = json.loads(_line)
+                        self.entries[_entry["start"]] = (_entry["rows"], _entry["digest"])
+                        self.failed[_entry["start"]] = tuple(_entry.get("failed", ()))
+                    except (ValueError, KeyError, TypeError):
+                        # The last line may be cut short if the previous run crashed while writing it
+                        continue
+
+        self._fHnd = open(path, "a")
+
+        if (not _line.endswith("\n")):
+            # Do not append onto a line that was cut short
+            self._fHnd.write("\n")
+
+    def is_committed(
+        self,
+        start:int,
+        rows:int,
+        digest:str,
+    )->bool:
+        """
+        Check if the chunk of rows rows from start was loaded by a previous run; see failed_rows() for the rows of it that failed.
+
+        Raises WarehouseJournalMismatch if the journal has a chunk from start with a different size or content.
+        """
+        _entry = self.entries.get(start, None)
+
+        if (_entry is None):
+            return False
+        elif (_entry != (rows, digest)):
+            raise WarehouseJournalMismatch(
+                f"Chunk of {rows:,d} rows from row #{start:,d} does not match journal {self.path}, which has {_entry[0]:,d} rows with digest {_entry[1]}; " + \
+                "the input or options differ from the run that wrote the journal."
+            )
+        else:
+            return True
+
+    def failed_rows(
+        self,
+        start:int,
+    )->Tuple[int]:
+        """
+        Indices of the rows of the committed chunk from start that failed to load, relative to the chunk.
+        """
+        return self.failed.get(start, ())
+
+    def commit(
+        self,
+        start:int,
+        rows:int,
+        digest:str,
+        failed:Sequence[int]=(),
+    ):
+        """
+        Record the chunk of rows rows from start as loaded, except for the rows at the indices in failed.
+        """
+        self.entries[start] = (rows, digest)
+        self.failed[start] = tuple(sorted(failed))
+
+        _entry = {"start":start, "rows":rows, "digest":digest}
+        if (self.failed[start]):
+            _entry["failed"] = self.failed[start]
+
+        self._fHnd.write(
+            json.dumps(_entry) + "\n"
+        )
+        self._fHnd.flush()
+        os.fsync(self._fHnd.fileno())
+
+    def close(self):
+        self._fHnd.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+def skip_committed(
+    func:Callable[[Any], Any],
+)->Callable[[JournalEntry], Any]:
+    """
+    Wrap func to take a JournalEntry instead; func is called on its item, unless it is committed.
+    """
+    def _wrapper(entry:JournalEntry)->Any:
+        if (entry.committed):
+            return None
+        else:
+            return func(entry.item)
+
+    return _wrapper
+
+def journal_items(
+    items:Iterable[Any],
+    rows:Callable[[Any], int],
+    journal:LoadJournal=None,
+    digest:Callable[[Any], str]=None,
+    subset:Callable[[Any, Sequence[int]], Any]=None,
+)->Generator[
+    JournalEntry,
+    None,
+    None
+]:
+    """
+    Generator function to wrap each chunk in items into a JournalEntry, marking those already committed to journal.
+
+    Parameters:
+    - rows              Function to get the number of rows of a chunk.
+    - journal           LoadJournal of the load. If None, no chunks are committed, and no digests are calculated.
+    - digest            Function to get the hex digest of the content of a chunk.
+    - subset            Function taking a chunk and a sequence of row indices, returning a chunk of only those rows.
+                        Committed chunks with rows that failed are then replayed with only those rows;
+                        if None, such chunks are loaded again as a whole.
+    """
+    _start = 0
+
+    for _item in items:
+        _rows = rows(_item)
+        _digest = digest(_item) if (journal is not None) else None
+        _committed = (journal is not None and journal.is_committed(_start, _rows, _digest))
+        _failed = journal.failed_rows(_start) if (_committed) else ()
+
+        if (_failed):
+            yield JournalEntry(
+                start=_start,
+                rows=_rows,
+                digest=_digest,
+                item=subset(_item, _failed) if (subset is not None) else _item,
+                committed=False,
+                replay=list(_failed) if (subset is not None) else None,
+            )
+        else:
+            yield JournalEntry(
+                start=_start,
+                rows=_rows,
+                digest=_digest,
+                item=_item,
+                committed=_committed,
+            )
+
+        _start += _rows
+
+def insert_with_retries(
+    insert:Callable[[Sequence[Any]], Sequence[Dict[str, Any]]],
+    rows:Sequence[Any],
+    policy:RetryPolicy=DEFAULT_RETRY_POLICY,
+    is_retryable:Callable[[Sequence[Dict[str, Any]]], bool]=lambda errors: True,
+    sleep:Callable[[float], Any]=time.sleep,
+)->ChunkResult:
+    """
+    Insert rows, then retry only the rows that failed, with exponential backoff and jitter as per policy.
+
+    Parameters:
+    - insert            Function to insert a sequence of rows, returning a list of per-row errors of the form
+                        {"index": index of the row in the sequence, "errors": [...]} - as does bigquery.Client.insert_rows().
+    - rows              The rows to insert.
+    - is_retryable      Function taking the errors of a row, returning False if the row will never succeed,
+                        e.g. if it is invalid. Such rows are not retried.
+    - sleep             Function to wait for a number of seconds.
+
+    Exceptions raised by insert are not caught; it is for the caller to deal with failures of the whole chunk.
+    """
+    _pending = list(range(len(rows)))   # Indices of rows in this attempt, relative to rows
+    _failed = {}
+    _retried = 0
+
+    for _attempt in range(max(0, policy.max_retries) + 1):
+        if (_attempt > 0):
+            sleep(
+                random.uniform(
+                    0,
+                    min(policy.max_delay, policy.initial_delay * policy.multiplier ** (_attempt-1)),
+                )
+            )
+            _retried += len(_pending)
+
+        _errors = insert(
+            rows if (_attempt == 0) else [rows[_index] for _index in _pending]
+        )
+
+        # Any pending rows not reported in _errors are loaded now
+        for _index in _pending:
+            _failed.pop(_index, None)
+
+        _retry = []
+        for _error in (_errors or []):
+            # The API reports indices relative to the rows sent in this attempt
+            _index = _pending[_error["index"]]
+            _failed[_index] = _error.get("errors", [])
+
+            if (is_retryable(_failed[_index])):
+                _retry.append(_index)
+
+        _pending = sorted(_retry)
+        if (not _pending):
+            break
+
+    return ChunkResult(
+        rows=len(rows),
+        retried=_retried,
+        row_errors=[
+            RowError(index=_index, errors=_failed[_index]) for _index in sorted(_failed)
+        ],
+    )
+
+
+def _call(
+    func:Callable[[Any], Any],
+    item:Any,
+)->Union[Any, Exception]:
+    """
+    Call func on item, returning the Exception instead if one is raised.
+
+    Internal function only, not supported.
+    """
+    try:
+        return func(item)
+    except Exception as e:
+        return e
+
+def map_bounded(
+    func:Callable[[Any], Any],
+    items:Iterable[Any],
+    concurrency:int=1,
+    executor_class:type=ThreadPoolExecutor,
+)->Generator[
+    Tuple[Any, Union[Any, Exception]],
+    None,
+    None
+]:
+    """
+    Generator function to call func on each of items, with up to concurrency calls in flight at the same time.
+
+    Yields (item, result) in the same order as items, where result is either the return value of func,
+    or the Exception it raised; one failed item does not stop the others.
+    If items itself raises, the calls already in flight are finished and yielded before the Exception is raised.
+
+    items is consumed lazily: a new item is only taken when one of the concurrency slots is free,
+    so a generator such as chunks() never runs more than concurrency items ahead of the uploads.
+
+    Parameters:
+    - concurrency       Maximum number of calls in flight. If 1 or less, func is called sequentially in the current thread.
+    - executor_class    concurrent.futures.Executor subclass to make the pool of concurrency workers with.
+                        For ProcessPoolExecutor, func and items have to be picklable.
+    """
+    if (concurrency <= 1):
+        for _item in items:
+            yield _item, _call(func, _item)
+        return
+
+    _items = iter(items)
+    _exhausted = object()
+
+    with executor_class(max_workers=concurrency) as _executor:
+        _in_flight = deque()
+
+        while (True):
+            if (len(_in_flight) >= concurrency):
+                # Wait for the oldest call to free up a slot before taking the next item; this keeps the results in order.
+                _done_item, _future = _in_flight.popleft()
+                yield _done_item, _future.result()
+
+            try:
+                _item = next(_items, _exhausted)
+            except Exception:
+                # Finish the calls already in flight before raising, so that their results are not lost
+                while (_in_flight):
+                    _done_item, _future = _in_flight.popleft()
+                    yield _done_item, _future.result()
+                raise
+
+            if (_item is _exhausted):
+                break
+
+            _in_flight.append(
+                (_item, _executor.submit(_call, func, _item))
+            )
+
+        while (_in_flight):
+            _done_item, _future = _in_flight.popleft()
+            yield _done_item, _future.result()
+
+
+async def _acall(
+    func:Callable[[Any], Awaitable[Any]],
+    item:Any,
+)->Union[Any, Exception]:
+    """
+    Await func on item, returning the Exception instead if one is raised.
+
+    Internal function only, not supported.
+    """
+    try:
+        return await func(item)
+    except Exception as e:
+        return e
+
+async def aiter_in_executor(
+    items:Iterable[Any],
+    executor:Executor=None,
+)->AsyncGenerator[Any, None]:
+    """
+    Async generator to take items from a blocking iterable one at a time in executor.
+
+    This allows CPU or IO heavy generators, such as load_datawarehouse.data.chunks(), to be consumed without blocking the event loop.
+
+    Parameters:
+    - executor          concurrent.futures.Executor to run the iteration in. If None, the event loop's default executor is used.
+    """
+    _loop = asyncio.get_running_loop()
+    _items = iter(items)
+    _exhausted = object()
+
+    while (True):
+        _item = await _loop.run_in_executor(executor, next, _items, _exhausted)
+        if (_item is _exhausted):
+            break
+
+        yield _item
+
+async def amap_bounded(
+    func:Callable[[Any], Awaitable[Any]],
+    items:Union[
+        Iterable[Any],
+        AsyncIterable[Any],
+    ],
+    concurrency:int=1,
+    semaphore:asyncio.Semaphore=None,
+)->AsyncGenerator[
+    Tuple[Any, Union[Any, Exception]],
+    None
+]:
+    """
+    asyncio version of map_bounded(): async generator to await coroutine function func on each of items,
+    with up to concurrency calls in flight at the same time.
+
+    Yields (item, result) in the same order as items, where result is either the return value of func,
+    or the Exception it raised. items can be an iterable or an async iterable, and is consumed lazily as slots free up.
+    If items itself raises, the calls already in flight are finished and yielded before the Exception is raised.
+
+    Parameters:
+    - semaphore         asyncio.Semaphore shared with other calls of amap_bounded() on the same event loop,
+                        to bound the calls in flight across all of them; it is acquired before each item is taken from items,
+                        so no item is produced before it can be worked on.
+    """
+    if (isinstance(items, AsyncIterableABC)):
+        _items = items.__aiter__()
+    else:
+        async def _aiter():
+            for _item in items:
+                yield _item
+        _items = _aiter()
+
+    _in_flight = deque()
+
+    try:
+        while (True):
+            if (len(_in_flight) >= max(1, concurrency)):
+                # Wait for the oldest call to free up a slot before taking the next item; this keeps the results in order.
+                _done_item, _task = _in_flight.popleft()
+                yield _done_item, await _task
+
+            if (semaphore is not None):
+                await semaphore.acquire()
+
+            try:
+                _item = await _items.__anext__()
+            except BaseException as e:
+                # No item to work on after all
+                if (semaphore is not None):
+                    semaphore.release()
+
+                if (isinstance(e, StopAsyncIteration)):
+                    break
+
+                if (isinstance(e, Exception)):
+                    # Finish the calls already in flight before raising, so that their results are not lost
+                    while (_in_flight):
+                        _done_item, _task = _in_flight.popleft()
+                        yield _done_item, await _task
+                raise
+
+            _task = asyncio.ensure_future(_acall(func, _item))
+            if (semaphore is not None):
+                # Released even if the task is cancelled before it starts
+                _task.add_done_callback(lambda _: semaphore.release())
+
+            _in_flight.append(
+                (_item, _task)
+            )
+
+        while (_in_flight):
+            _done_item, _task = _in_flight.popleft()
+            yield _done_item, await _task
+    finally:
+        # If the consumer stops early, do not leave orphaned tasks behind
+        for _, _task in _in_flight:
+            _task.cancel()
@@ -1,13 +1,125 @@
 import os, sys
+import asyncio
+from datetime import date, datetime
+import json
+import pickle
+import tempfile
+import threading
+import time
 import unittest
+from unittest import mock
 from io import StringIO, BytesIO
 from typing import Union
+from urllib.parse import urlparse
 
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 from pandas.testing import assert_frame_equal
 
-from load_datawarehouse.data import chunks, json_size
+# The BigQuery API is only made available with credentials; the tests below fake the client instead
+with mock.patch.dict(os.environ, {"GOOGLE_APPLICATION_CREDENTIALS": os.environ.get("GOOGLE_APPLICATION_CREDENTIALS", os.devnull)}):
+    from load_datawarehouse.data import ParquetFormat, RequestLimits, chunk_digest, chunks, encode_rows, make_encoded_chunk, chunk_spans, clean_dataframe_values, clean_keys, dataframe_chunk_spans, encoded_chunks, encoded_files, json_size, key_plan, parquet_files, prepare, sample
+    from load_datawarehouse.bigquery.cache import SchemaCache
+    from load_datawarehouse.bigquery.config import BIGQUERY_INSERT_ALL_FORMAT, BIGQUERY_PERMANENT_ROW_ERROR_REASONS
+    from load_datawarehouse.bigquery.schema import FingerprintCache, SchemaFromDataframeMethod, SchemaInferenceMethod, extract, get_schema_from_dataframe_dtypes, guess_bq_dtype, sample_records, sample_records_with_fingerprint
+    from load_datawarehouse.files import read_files
+    from load_datawarehouse.schema import DeconstructedList, ListField, RecordFields, RecordsAccumulator, is_records, deconstruct_records, deconstruct_records_parallel, deconstruct_shard, fingerprint_records
+    from load_datawarehouse.exceptions import WarehouseInvalidInput, WarehouseJournalMismatch, WarehouseTableLoadIncomplete, WarehouseKeyCollision, WarehouseRowOversize
+    from load_datawarehouse.upload import ChunkResult, LoadJournal, LoadTally, RetryPolicy, RowError, aiter_in_executor, amap_bounded, insert_with_retries, journal_items, map_bounded, skip_committed
+    from load_datawarehouse.bigquery import LoadMethod, WriteDisposition, aload_bigquery_table, get_insert_all_format, insert_encoded_rows_bigquery_table, load_bigquery_table, supports_encoded_inserts
+    from load_datawarehouse.api.google_bigquery import bigquery
+    from google.api_core.exceptions import BadRequest as bigquery_bad_request, NotFound as bigquery_not_found, ServiceUnavailable as bigquery_service_unavailable
+    from google.auth.credentials import AnonymousCredentials
+    import requests
+
+class FakeLoadJob():
+    def __init__(self, exception:Exception=None):
+        self.exception = exception
+
+    def result(self, timeout=None):
+        if (self.exception is not None):
+            raise self.exception
+        return self
+
+class FakeBigQueryClient():
+    """
+    Stands in for bigquery.Client at the transport level: insertAll requests and load job files are decoded and recorded.
+
+    Rows are told apart by their "id":
+    - errors            Rows reported back as insertErrors with this reason, by their position in the request;
+                        retryable reasons are only reported once, permanent ones every time.
+    - failing           Rows that fail the whole request or load job they are in.
+    """
+    def __init__(
+        self,
+        table:bigquery.Table=None,
+        errors:dict=None,
+        failing:set=None,
+    ):
+        self.project = "project"
+        self.table = table
+        self.errors = errors or {}
+        self.failing = failing or set()
+        self.requests = []
+        self.jobs = []
+        self.rows = []
+
+    def get_table(self, table, **kwargs):
+        if (self.table is None):
+            raise bigquery_not_found(f"{table} not found.")
+        return self.table
+
+    def create_table(self, table, **kwargs):
+        self.table = table
+        return table
+
+    def update_table(self, table, fields, **kwargs):
+        return table
+
+    def delete_table(self, table, not_found_ok=False, **kwargs):
+        self.table = None
+
+    def _call_api(self, retry, span_name=None, span_attributes=None, **kwargs):
+        self.requests.append(kwargs)
+        _rows = json.loads(kwargs["data"], parse_constant=self.reject_constant)["rows"]
+
+        if (any(_row["json"]["id"] in self.failing for _row in _rows)):
+            raise bigquery_service_unavailable("Connection lost")
+
+        _errors = []
+        for _index, _row in enumerate(_rows):
+            _reason = self.errors.get(_row["json"]["id"], None)
+
+            if (_reason is None):
+                self.rows.append(_row["json"])
+            else:
+                _errors.append({"index": _index, "errors": [{"reason": _reason}]})
+
+                if (_reason not in BIGQUERY_PERMANENT_ROW_ERROR_REASONS):
+                    del self.errors[_row["json"]["id"]]
+
+        return {"insertErrors": _errors} if (_errors) else {}
+
+    @staticmethod
+    def reject_constant(constant:str):
+        # NaN and Infinity are accepted by json.loads(), but not by the API
+        raise bigquery_bad_request(f"Invalid JSON payload: {constant}")
+
+    def load_table_from_file(self, file_obj, destination, job_config=None, **kwargs):
+        if (job_config.source_format == bigquery.SourceFormat.PARQUET):
+            _rows = pq.read_table(file_obj).to_pylist()
+        else:
+            _rows = [ json.loads(_line) for _line in file_obj ]
+
+        self.jobs.append(job_config)
+
+        if (any(_row["id"] in self.failing for _row in _rows)):
+            return FakeLoadJob(bigquery_bad_request("Error while reading data"))
+
+        self.rows.extend(_rows)
+        return FakeLoadJob()
 
 class TestCaseFileIOError(IOError):
     def __bool__(self):
@@ -199,6 +311,1322 @@ class TestLoadDataWarehouse(TestBaseClass):
 
         self.assertListEqual(_reconstructed, _data)
 
+    def test_json_size(self):
+        _data = [
+            {
+                "a":_id,
+                "b":"Größe ä € 😀",
+                "c":None,
+            } for _id in range(20)
+        ]
+        _expected = len(json.dumps(_data, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+        self.assertEqual(json_size(_data), _expected)
+        self.assertEqual(json_size(pd.DataFrame(_data)), _expected)
+        self.assertEqual(json_size([]), 2)
+
+        # Missing values are null, as they are in DataFrame.to_json()
+        _dataframe = pd.DataFrame({
+            "a": [1.5, np.nan, np.inf],
+            "b": [np.nan, 2.5, -np.inf],
+        })
+        self.assertEqual(json_size(_dataframe), json_size(prepare(_dataframe)))
+        self.assertEqual(json_size([{"a": float("nan"), "b": [float("inf")]}]), len('[{"a":null,"b":[null]}]'))
+
+    def test_chunks_size_limit(self):
+        _data = [
+            {
+                "a":_id,
+                "b":"x" * (_id % 7 * 100),
+            } for _id in range(500)
+        ]
+        _size_limit = 4096
+
+        for _source in (_data, pd.DataFrame(_data)):
+            _chunks = list(chunks(_source, size_limit=_size_limit))
+
+            self.assertEqual(sum(len(_chunk) for _chunk in _chunks), len(_data))
+            for _chunk in _chunks:
+                self.assertLessEqual(json_size(_chunk), _size_limit)
+
+        self.assertListEqual(list(chunks([], size_limit=_size_limit)), [])
+
+        with self.assertRaises(WarehouseRowOversize):
+            list(chunks(_data + [{"a":-1, "b":"x" * _size_limit}], size_limit=_size_limit))
+
+    def test_chunks_limits(self):
+        _data = [
+            {
+                "a":_id,
+                "b":"x" * (_id % 5 * 10),
+            } for _id in range(500)
+        ]
+        _limits = RequestLimits(max_bytes=4096, max_rows=7, max_row_bytes=256)
+
+        for _source in (_data, pd.DataFrame(_data)):
+            _chunks = list(chunks(_source, limits=_limits))
+
+            self.assertEqual(sum(len(_chunk) for _chunk in _chunks), len(_data))
+            for _chunk in _chunks:
+                self.assertLessEqual(len(_chunk), _limits.max_rows)
+                self.assertLessEqual(json_size(_chunk), _limits.max_bytes)
+
+            _encoded_chunks = list(chunks(_source, limits=_limits, encoded=True))
+            self.assertEqual(len(_encoded_chunks), len(_chunks))
+
+        with self.assertRaises(WarehouseRowOversize):
+            list(chunks(_data + [{"a":-1, "b":"x" * 256}], limits=_limits))
+
+    def test_chunks_stream(self):
+        _data = [
+            {
+                "a":_id,
+                "b c":"x" * (_id % 5 * 10),
+            } for _id in range(500)
+        ]
+        _cleaned = [
+            {
+                "a":_record["a"],
+                "b_c":_record["b c"],
+            } for _record in _data
+        ]
+        _limits = RequestLimits(max_bytes=4096, max_rows=7)
+
+        _dataframe = pd.DataFrame(_data)
+        _streams = (
+            lambda: (_record for _record in _data),
+            lambda: (_dataframe.iloc[_start:_start+64] for _start in range(0, len(_dataframe), 64)),
+        )
+
+        for _stream in _streams:
+            _reconstructed = []
+            for _chunk in chunks(prepare(_stream()), limits=_limits):
+                self.assertLessEqual(len(_chunk), _limits.max_rows)
+                self.assertLessEqual(json_size(_chunk), _limits.max_bytes)
+                _reconstructed += _chunk
+
+            self.assertListEqual(_reconstructed, _cleaned)
+
+            self.assertEqual(
+                sum(_chunk.rows for _chunk in chunks(_stream(), limits=_limits, encoded=True)),
+                len(_data),
+            )
+
+        self.assertEqual(len(sample((_record for _record in _data), 10)), 10)
+
+    def test_dataframe_chunk_spans(self):
+        _row_sizes = np.random.default_rng(0).integers(1, 400, size=2000)
+
+        for _size_limit in (500, 1000, 65536):
+            self.assertListEqual(
+                list(dataframe_chunk_spans(_row_sizes, size_limit=_size_limit, empty_size=2, separator_size=1)),
+                list(chunk_spans(_row_sizes, size_limit=_size_limit, empty_size=2, separator_size=1)),
+            )
+
+    def test_chunks_encoded(self):
+        _data = [
+            {
+                "a":_id,
+                "b":"ä" * (_id % 11),
+            } for _id in range(500)
+        ]
+        _size_limit = 2048
+
+        for _source in (_data, pd.DataFrame(_data)):
+            _reconstructed = []
+            for _chunk in chunks(_source, size_limit=_size_limit, encoded=True):
+                self.assertEqual(_chunk.size, len(_chunk.payload))
+                self.assertLessEqual(_chunk.size, _size_limit)
+                self.assertEqual(_chunk.start, len(_reconstructed))
+
+                _rows = json.loads(_chunk.payload)
+                self.assertEqual(_chunk.rows, len(_rows))
+                _reconstructed += _rows
+
+            self.assertListEqual(_reconstructed, _data)
+
+        # DataFrames are cut block by block, with the same boundaries as if they were cut row by row
+        for _block_size in (37, 10000):
+            self.assertListEqual(
+                [ (_chunk.start, _chunk.rows) for _chunk in encoded_chunks(pd.DataFrame(_data), size_limit=_size_limit, block_size=_block_size) ],
+                [ (_chunk.start, _chunk.rows) for _chunk in chunks(_data, size_limit=_size_limit, encoded=True) ],
+            )
+
+        # Bytes and dates are encoded as they are in records
+        _data = [
+            {"a": b"\x00\xff", "b": date(2022, 1, 31), "c": datetime(2022, 1, 31, 12, 30, 0, 123456)},
+            {"a": None, "b": None, "c": None},
+        ]
+        self.assertListEqual(
+            [ json.loads(_row) for _row in encode_rows(pd.DataFrame(_data)) ],
+            [
+                {"a": "AP8=", "b": "2022-01-31", "c": "2022-01-31T12:30:00.123456"},
+                {"a": None, "b": None, "c": None},
+            ],
+        )
+
+    def test_chunks_row_ids(self):
+        _data = [ {"a":_id, "b":"ä" * (_id % 11)} for _id in range(500) ]
+        _size_limit = 2048
+
+        _chunks = list(chunks(_data, limits=RequestLimits(_size_limit, None, None), encoded=True, payload_format=BIGQUERY_INSERT_ALL_FORMAT))
+        _ids = set()
+
+        for _chunk in _chunks:
+            self.assertEqual(_chunk.size, len(_chunk.payload))
+            self.assertLessEqual(_chunk.size, _size_limit)
+
+            _rows = json.loads(_chunk.payload)["rows"]
+            self.assertListEqual([ _row["json"] for _row in _rows ], _data[_chunk.start:_chunk.start+_chunk.rows])
+            self.assertListEqual([ _row["insertId"].encode("ascii") for _row in _rows ], list(_chunk.row_ids))
+            _ids.update(_chunk.row_ids)
+
+        self.assertEqual(len(_ids), len(_data))
+
+        # Rows re-wrapped for a retry keep their IDs; the digest does not depend on them
+        _chunk = _chunks[0]
+        _retry = make_encoded_chunk(_chunk.encoded_rows[1:3], payload_format=BIGQUERY_INSERT_ALL_FORMAT, row_ids=_chunk.row_ids[1:3])
+        self.assertListEqual([ _row["insertId"].encode("ascii") for _row in json.loads(_retry.payload)["rows"] ], list(_chunk.row_ids[1:3]))
+        self.assertEqual(
+            chunk_digest(_chunk),
+            chunk_digest(make_encoded_chunk(_chunk.encoded_rows, payload_format=BIGQUERY_INSERT_ALL_FORMAT)),
+        )
+        self.assertEqual(chunk_digest(_chunk), chunk_digest(_data[:_chunk.rows]))
+
+    def test_encoded_files(self):
+        _data = [
+            {
+                "a":_id,
+                "b":"ä" * (_id % 11),
+            } for _id in range(500)
+        ]
+        _limits = RequestLimits(max_bytes=2048, max_rows=100)
+
+        _reconstructed = []
+        for _file in encoded_files(iter(_data), limits=_limits):
+            try:
+                self.assertEqual(_file.size, os.path.getsize(_file.path))
+                self.assertLessEqual(_file.size, _limits.max_bytes)
+                self.assertLessEqual(_file.rows, _limits.max_rows)
+                self.assertEqual(_file.start, len(_reconstructed))
+
+                with open(_file.path, "rb") as _fHnd:
+                    _rows = [ json.loads(_line) for _line in _fHnd ]
+            finally:
+                os.remove(_file.path)
+
+            self.assertEqual(_file.rows, len(_rows))
+            _reconstructed += _rows
+
+        self.assertListEqual(_reconstructed, _data)
+
+    def test_clean_keys(self):
+        _clean_record = {
+            "a":1,
+            "b":[{"c":2}, {"d":3}],
+        }
+        self.assertIs(clean_keys(_clean_record), _clean_record)
+
+        _records = [
+            {
+                "a b":_id,
+                "c":{"d-e":[{"f.g":_id}]},
+            } for _id in range(100)
+        ]
+        _expected = [
+            {
+                "a_b":_id,
+                "c":{"d_e":[{"f_g":_id}]},
+            } for _id in range(100)
+        ]
+
+        key_plan.cache_clear()
+        self.assertListEqual(clean_keys(_records), _expected)
+        self.assertEqual(key_plan.cache_info().misses, 3)
+
+        with self.assertWarns(WarehouseKeyCollision):
+            _plan = key_plan(("a", "b 1", "b.1"))
+
+        self.assertTupleEqual(_plan.keys, ("a", "b_1", "b_1"))
+        self.assertDictEqual(_plan.collisions, {"b_1":("b 1", "b.1")})
+
+    def test_clean_dataframe_values(self):
+        _df = pd.DataFrame({
+            "a":[{"x y":1}, None, {"z":[{"p.q":2}]}],
+            "b":pd.Series(["s", "t", None], dtype=object),
+            "c":[1, 2, 3],
+        })
+
+        _cleaned = clean_dataframe_values(_df)
+        self.assertListEqual(_cleaned["a"].tolist(), [{"x_y":1}, None, {"z":[{"p_q":2}]}])
+        self.assertListEqual(_df["a"].tolist(), [{"x y":1}, None, {"z":[{"p.q":2}]}])
+        self.assertTrue(np.shares_memory(_cleaned["b"].to_numpy(), _df["b"].to_numpy()))
+
+        _text = _df[["b", "c"]]
+        self.assertIs(clean_dataframe_values(_text), _text)
+
+    def test_prepare_arrow(self):
+        _data = [
+            {
+                "a b":_id,
+                "c":{"d.e":[{"f g":_id}]},
+                "s":"ä" * (_id % 7),
+            } for _id in range(500)
+        ]
+        _expected = prepare(_data)
+
+        for _source in (_data, pd.DataFrame(_data), pa.Table.from_pylist(_data)):
+            _table = prepare(_source, arrow=True)
+            self.assertIsInstance(_table, pa.Table)
+            self.assertListEqual(_table.schema.names, ["a_b", "c", "s"])
+            self.assertEqual(json_size(_table), json_size(_expected))
+
+            _chunks = list(chunks(_table, size_limit=2048))
+            for _chunk in _chunks:
+                self.assertIsInstance(_chunk, pa.Table)
+                self.assertLessEqual(json_size(_chunk), 2048)
+
+            self.assertListEqual(pa.concat_tables(_chunks).to_pylist(), _expected)
+
+        _reader = prepare(iter(_data), arrow=True)
+        self.assertIsInstance(_reader, pa.RecordBatchReader)
+        self.assertEqual(
+            sum(len(_chunk) for _chunk in chunks(_reader, size_limit=2048)),
+            len(_data),
+        )
+
+    def test_parquet_files(self):
+        _data = [
+            {
+                "a":_id,
+                "b":f"category_{_id % 5}",
+                "c":[{"d":float(_id)}],
+            } for _id in range(20000)
+        ]
+        _schema = pa.schema([
+            pa.field("a", pa.int64()),
+            pa.field("b", pa.string()),
+            pa.field("c", pa.list_(pa.struct([pa.field("d", pa.float64())]))),
+        ])
+
+        _tables = []
+        for _file in parquet_files(
+            _data,
+            schema=_schema,
+            parquet_format=ParquetFormat(compression="zstd", row_group_bytes=2**16),
+            limits=RequestLimits(max_rows=6000),
+        ):
+            try:
+                self.assertLessEqual(_file.rows, 6000)
+                self.assertEqual(_file.start, sum(len(_table) for _table in _tables))
+
+                _metadata = pq.ParquetFile(_file.path).metadata
+                self.assertEqual(_metadata.num_rows, _file.rows)
+                self.assertGreater(_metadata.num_row_groups, 1)
+                self.assertIn("RLE_DICTIONARY", _metadata.row_group(0).column(1).encodings)
+
+                _tables.append(pq.read_table(_file.path))
+            finally:
+                os.remove(_file.path)
+
+        self.assertTrue(pa.concat_tables(_tables).schema.equals(_schema))
+        self.assertListEqual(pa.concat_tables(_tables).to_pylist(), _data)
+
+    def test_prepare_encoded(self):
+        _data = [
+            {
+                "a b":_id,
+                "c":{"d.e":[{"f g":"ä" * (_id % 11)}]},
+            } for _id in range(5000)
+        ]
+        _expected = list(encode_rows(prepare(_data)))
+
+        for _source in (_data, iter(_data)):
+            self.assertListEqual(list(prepare(_source, processes=2)), _expected)
+
+        _df = pd.DataFrame(_data)
+        self.assertListEqual(
+            list(prepare(_df, processes=2)),
+            list(encode_rows(clean_keys(_df))),
+        )
+
+        _reconstructed = []
+        for _chunk in chunks(prepare(iter(_data), processes=2), size_limit=4096, encoded=True):
+            self.assertLessEqual(_chunk.size, 4096)
+            _reconstructed += json.loads(_chunk.payload)
+
+        self.assertListEqual(_reconstructed, prepare(_data))
+
+    def test_read_files(self):
+        _data = [
+            {
+                "a":_id,
+                "b":f"row {_id}",
+            } for _id in range(3000)
+        ]
+
+        with tempfile.TemporaryDirectory() as _directory:
+            pd.DataFrame(_data[:1000]).to_csv(os.path.join(_directory, "1.csv"), index=False)
+            pd.DataFrame(_data[1000:]).to_csv(os.path.join(_directory, "2.csv"), index=False)
+            pq.write_table(pa.Table.from_pylist(_data), os.path.join(_directory, "1.parquet"), row_group_size=500)
+
+            with open(os.path.join(_directory, "1.ndjson"), "w") as _fHnd:
+                _fHnd.writelines(json.dumps(_record) + "\n" for _record in _data)
+
+            for _path in ("*.csv", "1.parquet"):
+                _reader = read_files(os.path.join(_directory, _path), batch_rows=1000)
+                self.assertIsInstance(_reader, pa.RecordBatchReader)
+                self.assertListEqual(_reader.read_all().to_pylist(), _data)
+
+            self.assertListEqual(list(read_files(os.path.join(_directory, "*.ndjson"))), _data)
+            self.assertListEqual(
+                list(prepare(read_files([os.path.join(_directory, "1.csv"), os.path.join(_directory, "1.ndjson")]))),
+                _data[:1000] + _data,
+            )
+
+            with self.assertRaises(FileNotFoundError):
+                read_files(os.path.join(_directory, "*.json"))
+
+    def test_sample_records(self):
+        _records = [
+            {
+                "a":"x" * (_id % 7),
+                "b":{"c":_id % 3 == 0, "d":["y"] * (_id % 4)},
+            } for _id in range(20000)
+        ]
+
+        _sample = sample_records(_records, method=SchemaInferenceMethod.EARLY_STOP, stable_records=50)
+        self.assertLess(len(_sample), 100)
+        self.assertListEqual(_sample, _records[:len(_sample)])
+
+        self.assertEqual(len(sample_records(_records, method=SchemaInferenceMethod.HEAD, sample_size=500)), 500)
+        self.assertEqual(len(sample_records(_records, method=SchemaInferenceMethod.RESERVOIR, sample_size=500)), 500)
+        self.assertIs(sample_records(_records, method=SchemaInferenceMethod.FULL), _records)
+
+        # A new field, a new type or a new nested type past the sample means all records are needed
+        for _record in (
+            {"a":"x", "e":"z"},
+            {"a":1},
+            {"b":{"d":[b"y"]}},
+            {"b":None},
+        ):
+            _records[-1] = _record
+
+            for _method in SchemaInferenceMethod:
+                _sample = sample_records(_records, method=_method, sample_size=500)
+
+                if (_sample is not _records):
+                    # A reservoir sample may happen to include the record itself
+                    self.assertIs(_method, SchemaInferenceMethod.RESERVOIR)
+                    self.assertTrue(any(_item is _record for _item in _sample))
+
+            self.assertEqual(len(sample_records(_records, method=SchemaInferenceMethod.HEAD, sample_size=500, validate=False)), 500)
+
+    def test_deconstruct_records(self):
+        _records = [
+            {"A":1, "B":2, "C":3},
+            {"A":1.23, "B":True, "C":56},
+            {"A":56, "B":"Google", "D":[{"D1":True, "D3":[{"D3a":123}]}, {"D2":False, "D3":[{"D3a":456, "D3b":"Something"}]}]},
+            None,
+            123,
+            {"E":None, "FFF":666},
+            {"G":123},
+            {"G":[1, 2, 3]},
+            {"FFF":456.123, "G":[2.5, 3]},
+        ]
+
+        _deconstructed = deconstruct_records(_records)
+        _fields = _deconstructed.fields
+
+        self.assertTupleEqual(_fields._fields, ("A", "B", "C", "D", "E", "FFF", "G"))
+        self.assertTupleEqual(_fields.A, (int, float))
+        self.assertTupleEqual(_fields.B, (int, bool, str))
+        self.assertTupleEqual(_fields.E, ())
+        self.assertTupleEqual(_fields.FFF, (int, float))
+
+        # Nested records are merged into one RecordFields, and lists into one ListField
+        self.assertEqual(len(_fields.D), 1)
+        self.assertTupleEqual(_fields.D[0]._fields, ("D1", "D3", "D2"))
+        self.assertTupleEqual(_fields.D[0].D3[0]._fields, ("D3a", "D3b"))
+        self.assertTupleEqual(_fields.G, (int, ListField((int, float))))
+
+        self.assertListEqual(_deconstructed.type_errors, [None, 123])
+        self.assertEqual(len(_deconstructed.records), 7)
+        self.assertAlmostEqual(_deconstructed.factor_of_records_adding_fields, 3/9)
+
+        # Batches give the same result as all at once
+        _accumulator = RecordsAccumulator()
+        for _start in range(0, len(_records), 4):
+            _accumulator.update(_records[_start:_start+4])
+        self.assertEqual(_accumulator.result(), _deconstructed)
+
+        self.assertIsInstance(deconstruct_records([1, "a"]), DeconstructedList)
+
+    def test_deconstruct_records_parallel(self):
+        _records = [
+            {
+                f"k{_id % 13}":"x",
+                f"l{_id % 7}":[_id, {"a":_id}][_id % 2],
+                "m":[_id, 1.5, "y"][_id % 3],
+            } for _id in range(1000)
+        ]
+        _fields = deconstruct_records(_records, keep_records=False).fields
+
+        self.assertEqual(deconstruct_records_parallel(_records, processes=2, shard_size=150).fields, _fields)
+
+        # Merging is associative
+        _shards = [ _records[_start:_start+300] for _start in range(0, len(_records), 300) ]
+        _left = deconstruct_shard(_shards[0]).merge(deconstruct_shard(_shards[1])).merge(deconstruct_shard(_shards[2]))
+        _right = deconstruct_shard(_shards[1]).merge(deconstruct_shard(_shards[2]))
+        self.assertEqual(deconstruct_shard(_shards[0]).merge(_right).record_fields(), _left.record_fields())
+
+    def test_fingerprint_records(self):
+        _records = [ {"a":_id, "b":{"c":str(_id), "d":[1.5] * (_id % 3)}} for _id in range(1000) ]
+        _fingerprint = fingerprint_records(_records)
+
+        # Same structure, different values, order and number of records
+        self.assertEqual(fingerprint_records([ {"b":{"d":[2.5], "c":"x"}, "a":0}, {"a":1, "b":{"c":"y", "d":[]}} ]), _fingerprint)
+
+        # A new key or type anywhere changes the fingerprint
+        for _record in (
+            {"a":1, "e":None},
+            {"a":1.5},
+            {"b":{"d":[1]}},
+            {"b":{"d":[{"e":1}]}},
+        ):
+            self.assertNotEqual(fingerprint_records(_records + [_record]), _fingerprint)
+
+        _cache = FingerprintCache(maxsize=2)
+        _schema = extract(_records, fingerprint_cache=_cache)
+        self.assertEqual(len(_cache), 1)
+        self.assertListEqual(_schema, extract(_records, fingerprint_cache=None))
+
+        # Cached schemas are copies, and are kept by existing schema too
+        _schema.clear()
+        self.assertListEqual(extract(_records[::-1], fingerprint_cache=_cache), extract(_records, fingerprint_cache=None))
+        self.assertEqual(len(_cache), 1)
+        extract(_records, schema=[{"name":"a", "type":"STRING", "mode":"NULLABLE"}], fingerprint_cache=_cache)
+        self.assertEqual(len(_cache), 2)
+
+        # Least recently used is dropped
+        extract([ {"x":1} ], fingerprint_cache=_cache)
+        self.assertEqual(len(_cache), 2)
+        self.assertIsNone(_cache.get(_cache.get_key(_fingerprint)))
+
+        # The fingerprint is taken in the same pass that samples and validates, not in one of its own
+        class _CountingList(list):
+            passes = 0
+            def __iter__(self):
+                type(self).passes += 1
+                return super().__iter__()
+
+        _counting = _CountingList(_records)
+        for _method in (SchemaInferenceMethod.EARLY_STOP, SchemaInferenceMethod.HEAD, SchemaInferenceMethod.FULL):
+            _CountingList.passes = 0
+            _sample, _sample_fingerprint = sample_records_with_fingerprint(_counting, method=_method, sample_size=100)
+            self.assertEqual(_CountingList.passes, 1)
+            self.assertEqual(_sample_fingerprint, _fingerprint)
+
+            if (_method is not SchemaInferenceMethod.FULL):
+                self.assertListEqual(_sample, sample_records(_records, method=_method, sample_size=100))
+
+        _CountingList.passes = 0
+        extract(_counting, fingerprint_cache=FingerprintCache())
+        self.assertEqual(_CountingList.passes, 1)
+
+        # A field outside of the sample is still found
+        _sample, _ = sample_records_with_fingerprint(_records + [{"a":1, "e":None}], method=SchemaInferenceMethod.HEAD, sample_size=100)
+        self.assertEqual(len(_sample), 1001)
+
+    def test_record_fields(self):
+        _node = RecordFields({"a":(str, ), "b":RecordFields(c=(int, ))})
+
+        self.assertTupleEqual(_node._fields, ("a", "b"))
+        self.assertTupleEqual(_node.a, (str, ))
+        self.assertEqual(_node[1].c, (int, ))
+        self.assertListEqual(list(_node), [(str, ), RecordFields(c=(int, ))])
+        self.assertTrue(is_records(_node))
+        self.assertTrue(is_records(RecordFields))
+        self.assertFalse(is_records(ListField((str, ))))
+
+        # Equal by field names as well as values, unlike tuples
+        self.assertNotEqual(RecordFields(x=(float, )), RecordFields(z=(float, )))
+        self.assertNotEqual(RecordFields(), ListField())
+        self.assertEqual(len({RecordFields(x=(float, )), RecordFields(x=(float, ))}), 1)
+
+        # Nodes of the same shape share their field names
+        self.assertIs(RecordFields(a=1, b=2)._fields, RecordFields(a=3, b=4)._fields)
+        self.assertEqual(pickle.loads(pickle.dumps(_node)), _node)
+
+    def test_get_schema_from_dataframe_dtypes(self):
+        _dataframe = pd.DataFrame({
+            "a":np.arange(3),
+            "b":[1.5, None, 2.5],
+            "c":[True, False, True],
+            "d":pd.date_range("2022-01-01", periods=3, tz="UTC"),
+            "e":pd.array([1, None, 3], dtype="Int64"),
+            "f":pd.Categorical(["x", "y", "x"]),
+            "g":pd.Series(["x", None, "z"], dtype=object),
+            "h":[None, None, None],
+            "i":[["x"], [], ["y", "z"]],
+        })
+
+        _schema = get_schema_from_dataframe_dtypes(
+            _dataframe,
+            schema=[{"name":"g", "type":"BYTES", "mode":"NULLABLE"}],
+        )
+
+        self.assertListEqual(
+            [ (_field["name"], _field["type"], _field["mode"]) for _field in _schema ],
+            [
+                ("a", "INTEGER", "NULLABLE"),
+                ("b", "FLOAT", "NULLABLE"),
+                ("c", "BOOLEAN", "NULLABLE"),
+                ("d", "TIMESTAMP", "NULLABLE"),
+                ("e", "INTEGER", "NULLABLE"),
+                ("f", "STRING", "NULLABLE"),
+                ("g", "BYTES", "NULLABLE"),
+                ("h", "STRING", "NULLABLE"),
+                ("i", "STRING", "REPEATED"),
+            ]
+        )
+
+    def test_get_schema_from_dataframe_methods(self):
+        _dataframe = pd.DataFrame({
+            "id":np.arange(4),
+            "value":[1.5, None, 2.5, np.nan],
+            "flag":[True, False, True, False],
+            "name":["w", "x", None, "z"],
+            "count":pd.array([1, None, 3, 4], dtype="Int64"),
+            "civil time":pd.date_range("2022-01-01", periods=4, freq="h"),
+            "civil time us":pd.date_range("2022-01-01", periods=4, freq="h").astype("datetime64[us]"),
+            "utc time":pd.date_range("2022-01-01", periods=4, freq="h", tz="UTC"),
+            "day":[date(2022, 1, _day) for _day in range(1, 5)],
+            "blob":[b"a", b"b", None, b"d"],
+            "tags":[["x"], [], ["y", "z"], None],
+        })
+
+        _dtypes = extract(_dataframe, dataframe_method=SchemaFromDataframeMethod.DTYPES)
+        _search_values = extract(_dataframe, dataframe_method=SchemaFromDataframeMethod.SEARCH_VALUES)
+
+        self.assertListEqual(_dtypes, _search_values)
+        self.assertDictEqual(
+            { _field["name"]:_field["type"] for _field in _dtypes if ("time" in _field["name"]) },
+            { "civil_time":"DATETIME", "civil_time_us":"DATETIME", "utc_time":"TIMESTAMP" },
+        )
+
+        # Naive timestamps are civil times from Arrow as well
+        self.assertListEqual(
+            [ _field["type"] for _field in extract(pa.Table.from_pandas(_dataframe[["civil time", "utc time"]], preserve_index=False)) ],
+            [ "DATETIME", "TIMESTAMP" ],
+        )
+
+    def test_guess_bq_dtype(self):
+        for _types, _expected in (
+            ((int, ), "INTEGER"),
+            ((bool, int), "INTEGER"),
+            ((int, float), "FLOAT"),
+            ((np.float32, np.int8), "FLOAT"),
+            ((bool, ), "BOOLEAN"),
+            ((int, str), "STRING"),
+            ((bytes, ), "BYTES"),
+            ((date, ), "DATE"),
+            ((datetime, date), "DATETIME"),
+            ((pd.Timestamp, ), "DATETIME"),
+            ((complex, ), None),
+            ((), None),
+        ):
+            self.assertEqual(guess_bq_dtype(_types), _expected, _types)
+
+        self.assertIsNone(guess_bq_dtype((int, str), force_numeric=True))
+
+        self.assertListEqual(
+            extract(
+                [
+                    {"a":1, "b":"x", "c":[1, 2], "d":[{"e":True}]},
+                    {"a":2.5, "b":None, "c":[1.5]},
+                ],
+                method=SchemaInferenceMethod.FULL,
+            ),
+            [
+                {"name":"a", "type":"FLOAT", "mode":"NULLABLE"},
+                {"name":"b", "type":"STRING", "mode":"NULLABLE"},
+                {"name":"c", "type":"FLOAT", "mode":"REPEATED"},
+                {"name":"d", "type":"RECORD", "mode":"REPEATED", "fields":[{"name":"e", "type":"BOOLEAN", "mode":"NULLABLE"}]},
+            ]
+        )
+
+    def test_map_bounded(self):
+        _taken = []
+        _ahead = []
+
+        def _items():
+            for _id in range(50):
+                _taken.append(_id)
+                yield _id
+
+        def _func(item):
+            _ahead.append(len(_taken) - item)
+            if (item % 10 == 3):
+                raise ValueError(item)
+            return item * 2
+
+        for _concurrency in (1, 4):
+            _taken.clear()
+            _ahead.clear()
+            _results = list(map_bounded(_func, _items(), concurrency=_concurrency))
+
+            self.assertListEqual([_item for _item, _ in _results], list(range(50)))
+            for _item, _result in _results:
+                if (_item % 10 == 3):
+                    self.assertIsInstance(_result, ValueError)
+                else:
+                    self.assertEqual(_result, _item * 2)
+
+            # Backpressure: items are never taken more than concurrency ahead of the item being processed
+            self.assertLessEqual(max(_ahead), _concurrency)
+
+        # If items raises, the calls in flight are still yielded before the Exception
+        def _failing_items():
+            yield from range(10)
+            raise WarehouseRowOversize("Row #10 is too large.")
+
+        _results = []
+        with self.assertRaises(WarehouseRowOversize):
+            for _pair in map_bounded(_func, _failing_items(), concurrency=4):
+                _results.append(_pair)
+
+        self.assertListEqual([_item for _item, _ in _results], list(range(10)))
+
+    def test_insert_with_retries(self):
+        _rows = list(range(100))
+        _attempts = {}
+        _loaded = []
+
+        def _insert(rows):
+            _errors = []
+            for _id, _row in enumerate(rows):
+                _attempts[_row] = _attempts.get(_row, 0) + 1
+
+                if (_row == 42):
+                    _errors.append({"index":_id, "errors":[{"reason":"invalid"}]})
+                elif (_row % 10 == 0 and _attempts[_row] <= 2):
+                    _errors.append({"index":_id, "errors":[{"reason":"backendError"}]})
+                else:
+                    _loaded.append(_row)
+
+            return _errors
+
+        _result = insert_with_retries(
+            _insert,
+            _rows,
+            policy=RetryPolicy(max_retries=3),
+            is_retryable=lambda errors: all(_error["reason"] != "invalid" for _error in errors),
+            sleep=lambda seconds: None,
+        )
+
+        self.assertEqual(_result.rows, 100)
+        self.assertEqual(_result.retried, 20)
+        self.assertListEqual([_row_error.index for _row_error in _result.row_errors], [42])
+        self.assertListEqual(sorted(_loaded), [_row for _row in _rows if _row != 42])
+        self.assertEqual(_attempts[42], 1)
+
+    def test_load_journal(self):
+        _data = [ {"a":_id} for _id in range(100) ]
+        _loaded = []
+
+        def _load(data, path, fail_at=None):
+            _tally = LoadTally()
+
+            def _upload(chunk):
+                if (chunk[0]["a"] == fail_at):
+                    raise RuntimeError("Connection lost")
+                _loaded.extend(chunk)
+                return ChunkResult(rows=len(chunk), retried=0, row_errors=[])
+
+            with LoadJournal(path) as _journal:
+                for _entry, _result in map_bounded(
+                    skip_committed(_upload),
+                    journal_items(
+                        chunks(data, limits=RequestLimits(None, 10, None)),
+                        rows=len,
+                        journal=_journal,
+                        digest=chunk_digest,
+                    ),
+                    concurrency=3,
+                ):
+                    _tally.add_entry(_entry, _result, journal=_journal)
+
+            return _tally.result()
+
+        with tempfile.TemporaryDirectory() as _directory:
+            _path = os.path.join(_directory, "journal.jsonl")
+
+            _result = _load(_data, _path, fail_at=50)
+            self.assertEqual(_result.loaded, 90)
+            self.assertEqual(_result.failed, 10)
+
+            # Only the failed chunk is loaded again
+            _loaded.clear()
+            _result = _load(_data, _path)
+            self.assertListEqual(_loaded, _data[50:60])
+            self.assertEqual(_result.loaded, 10)
+            self.assertEqual(_result.skipped, 90)
+            self.assertTrue(_result)
+
+            # A truncated last line is ignored
+            with open(_path, "a") as _fHnd:
+                _fHnd.write('{"start": 100, "ro')
+
+            _loaded.clear()
+            self.assertEqual(_load(_data, _path).skipped, 100)
+            self.assertListEqual(_loaded, [])
+
+            with self.assertRaises(WarehouseJournalMismatch):
+                _load([ {"a":-_id} for _id in range(100) ], _path)
+
+    def test_load_journal_row_errors(self):
+        _data = [ {"a":_id} for _id in range(100) ]
+        _loaded = []
+
+        def _load(path, fail=()):
+            _tally = LoadTally()
+
+            def _upload(chunk):
+                _loaded.extend(_row for _row in chunk if _row["a"] not in fail)
+                return ChunkResult(
+                    rows=len(chunk),
+                    retried=0,
+                    row_errors=[
+                        RowError(index=_index, errors=[{"reason": "invalid"}]) \
+                            for _index, _row in enumerate(chunk) if _row["a"] in fail
+                    ],
+                )
+
+            with LoadJournal(path) as _journal:
+                for _entry, _result in map_bounded(
+                    skip_committed(_upload),
+                    journal_items(
+                        chunks(_data, limits=RequestLimits(None, 10, None)),
+                        rows=len,
+                        journal=_journal,
+                        digest=chunk_digest,
+                        subset=lambda _chunk, _indices: [_chunk[_index] for _index in _indices],
+                    ),
+                ):
+                    _tally.add_entry(_entry, _result, journal=_journal)
+
+            return _tally.result()
+
+        with tempfile.TemporaryDirectory() as _directory:
+            _path = os.path.join(_directory, "journal.jsonl")
+
+            _result = _load(_path, fail=(53, 57))
+            self.assertEqual(_result.loaded, 98)
+            self.assertListEqual([_row_error.index for _row_error in _result.row_errors], [53, 57])
+
+            # Only the rows that failed are loaded again; the rest of their chunk is not duplicated
+            _loaded.clear()
+            _result = _load(_path, fail=(57,))
+            self.assertListEqual(_loaded, [{"a":53}])
+            self.assertEqual(_result.loaded, 1)
+            self.assertEqual(_result.skipped, 98)
+            self.assertListEqual([_row_error.index for _row_error in _result.row_errors], [57])
+
+            _loaded.clear()
+            _result = _load(_path)
+            self.assertListEqual(_loaded, [{"a":57}])
+            self.assertEqual(_result.skipped, 99)
+            self.assertTrue(_result)
+
+            _loaded.clear()
+            self.assertEqual(_load(_path).skipped, 100)
+            self.assertListEqual(_loaded, [])
+
+    def test_schema_cache(self):
+        _schema = [{"name":"a", "type":"INTEGER", "mode":"NULLABLE"}]
+
+        with tempfile.TemporaryDirectory() as _directory:
+            _cache = SchemaCache(_directory, ttl=60)
+            _other = SchemaCache(os.path.join(_directory, "other"), ttl=60)
+
+            self.assertIsNone(_cache.get("project.dataset.table"))
+
+            _cache.put("project.dataset.table", _schema, etag="abc")
+            _other.put("project.dataset.table", _schema)
+            _entry = _cache.get("project.dataset.table")
+            self.assertListEqual(_entry.schema, _schema)
+            self.assertEqual(_entry.etag, "abc")
+
+            # Shared through the directory
+            self.assertEqual(SchemaCache(_directory).get("project.dataset.table"), _entry)
+
+            # Expired
+            _cache.ttl = -1
+            self.assertIsNone(_cache.get("project.dataset.table"))
+            _cache.ttl = 60
+
+            # Our own changes to the table invalidate every cache
+            SchemaCache.invalidate_all("project.dataset.table")
+            self.assertIsNone(_cache.get("project.dataset.table"))
+            self.assertIsNone(_other.get("project.dataset.table"))
+
+            # A corrupt entry is a miss
+            with open(_cache.entry_path("project.dataset.table"), "w") as _fHnd:
+                _fHnd.write('{"table_id": "proj')
+            self.assertIsNone(_cache.get("project.dataset.table"))
+
+    def test_insert_encoded_rows_bigquery_table(self):
+        _requests = []
+
+        def _request(method, url, data=None, headers=None, timeout=None, **kwargs):
+            _requests.append((method, urlparse(url).path, json.loads(data), headers))
+
+            _response = requests.Response()
+            _response.status_code = 200
+            _response.headers["content-type"] = "application/json"
+            _response._content = json.dumps({"insertErrors": [{"index": 1, "errors": [{"reason": "invalid"}]}]}).encode("utf-8")
+            return _response
+
+        # A real client, with only the HTTP transport faked
+        _http = mock.Mock()
+        _http.request.side_effect = _request
+        _client = bigquery.Client(project="project", credentials=AnonymousCredentials(), _http=_http)
+
+        _table = bigquery.Table("project.dataset.table")
+        _chunk = make_encoded_chunk(
+            [ b'{"id":1,"name":"Gr\xc3\xb6\xc3\x9fe"}', b'{"id":2,"name":null}' ],
+            payload_format=get_insert_all_format(skip_invalid_rows=True),
+            start=0,
+            row_ids=[ b"row-1", b"row-2" ],
+        )
+        _expected_body = {
+            "rows": [
+                {"insertId": "row-1", "json": {"id": 1, "name": "Größe"}},
+                {"insertId": "row-2", "json": {"id": 2, "name": None}},
+            ],
+            "skipInvalidRows": True,
+        }
+
+        self.assertTrue(supports_encoded_inserts(bigquery.Client))
+
+        # The encoded payload is sent as the request body as-is...
+        _errors = insert_encoded_rows_bigquery_table(_client, _table, _chunk)
+
+        self.assertListEqual(_errors, [{"index": 1, "errors": [{"reason": "invalid"}]}])
+        _method, _path, _body, _headers = _requests.pop()
+        self.assertEqual(_method, "POST")
+        self.assertEqual(_path, "/bigquery/v2/projects/project/datasets/dataset/tables/table/insertAll")
+        self.assertEqual(_headers["Content-Type"], "application/json")
+        self.assertDictEqual(_body, _expected_body)
+
+        # ...or, if _call_api() is not as expected, decoded and sent through client.insert_rows_json()
+        class IncompatibleClient():
+            def _call_api(self, retry, path):
+                pass
+
+        self.assertFalse(supports_encoded_inserts(IncompatibleClient))
+
+        with mock.patch("load_datawarehouse.bigquery.supports_encoded_inserts", return_value=False):
+            _errors = insert_encoded_rows_bigquery_table(_client, _table, _chunk)
+
+        self.assertListEqual(_errors, [{"index": 1, "errors": [{"reason": "invalid"}]}])
+        _method, _path, _body, _headers = _requests.pop()
+        self.assertEqual(_method, "POST")
+        self.assertEqual(_path, "/bigquery/v2/projects/project/datasets/dataset/tables/table/insertAll")
+        self.assertDictEqual(_body, _expected_body)
+
+    def test_load_bigquery_table_streaming(self):
+        _limits = RequestLimits(max_bytes=4096, max_rows=500)
+        _data = [ {"id": _id, "text": "數據倉庫載入" * 20} for _id in range(100) ]
+        _client = FakeBigQueryClient(
+            bigquery.Table(
+                "project.dataset.table",
+                schema=[bigquery.SchemaField("id", "INTEGER"), bigquery.SchemaField("text", "STRING")],
+            ),
+        )
+
+        _result = load_bigquery_table(
+            _client,
+            "project.dataset.table",
+            _data,
+            method=LoadMethod.STREAMING,
+            limits=_limits,
+            skip_invalid_rows=True,
+            timeout=30,
+        )
+
+        self.assertEqual(_result.loaded, 100)
+        self.assertListEqual(_client.rows, _data)
+        self.assertGreater(len(_client.requests), 1)
+
+        # Measured as sent: non-ASCII bytes, insertId envelope and all
+        for _request in _client.requests:
+            self.assertLessEqual(len(_request["data"]), _limits.max_bytes)
+            self.assertEqual(_request["path"], "/projects/project/datasets/dataset/tables/table/insertAll")
+            self.assertEqual(_request["timeout"], 30)
+
+            _body = json.loads(_request["data"])
+            self.assertTrue(_body["skipInvalidRows"])
+            self.assertTrue(all(len(_row["insertId"]) == 32 for _row in _body["rows"]))
+
+        self.assertIsInstance(
+            load_bigquery_table(_client, "project.dataset.table", _data, method=LoadMethod.STREAMING, row_ids=[]),
+            WarehouseInvalidInput,
+        )
+
+        with self.assertWarns(DeprecationWarning):
+            _result = load_bigquery_table(_client, "project.dataset.table", _data, method=LoadMethod.STREAMING, encoded=False)
+
+        self.assertEqual(_result.loaded, 100)
+
+    def test_load_bigquery_table_streaming_retries(self):
+        _data = [ {"id": _id} for _id in range(20) ]
+        _client = FakeBigQueryClient(
+            bigquery.Table("project.dataset.table", schema=[bigquery.SchemaField("id", "INTEGER")]),
+            errors={4: "backendError", 7: "invalid"},
+        )
+
+        _result = load_bigquery_table(
+            _client,
+            "project.dataset.table",
+            _data,
+            method=LoadMethod.STREAMING,
+            retry=RetryPolicy(max_retries=3, initial_delay=0, max_delay=0),
+        )
+
+        self.assertEqual(_result.loaded, 19)
+        self.assertEqual(_result.retried, 1)
+        self.assertListEqual([ _row_error.index for _row_error in _result.row_errors ], [7])
+        self.assertListEqual(sorted(_row["id"] for _row in _client.rows), [ _id for _id in range(20) if _id != 7 ])
+
+        # Only the retryable row is sent again, with the same insertId so that BigQuery can deduplicate it
+        _first, _retry = [ json.loads(_request["data"])["rows"] for _request in _client.requests ]
+        self.assertEqual(len(_first), 20)
+        self.assertEqual(len({ _row["insertId"] for _row in _first }), 20)
+        self.assertListEqual(_retry, [_first[4]])
+
+    def test_load_bigquery_table_journal(self):
+        _data = [ {"id": _id} for _id in range(100) ]
+        _limits = RequestLimits(None, 10, None)
+        _table = bigquery.Table("project.dataset.table", schema=[bigquery.SchemaField("id", "INTEGER")])
+
+        for _method in (LoadMethod.STREAMING, LoadMethod.BATCH_JSON):
+            with tempfile.TemporaryDirectory() as _directory:
+                _path = os.path.join(_directory, "journal.jsonl")
+
+                # One chunk fails as a whole, and one row on its own
+                _client = FakeBigQueryClient(_table, errors={43: "invalid"}, failing={25})
+                _result = load_bigquery_table(_client, "project.dataset.table", _data, method=_method, limits=_limits, journal=_path)
+
+                self.assertIsInstance(_result, WarehouseTableLoadIncomplete)
+                self.assertEqual(len(_result.chunk_errors), 1)
+                self.assertEqual(_result.chunk_errors[0].start, 20)
+
+                # Only the failed chunk and row are loaded again
+                _client = FakeBigQueryClient(_table)
+                _result = load_bigquery_table(_client, "project.dataset.table", _data, method=_method, limits=_limits, journal=_path)
+
+                if (_method is LoadMethod.STREAMING):
+                    self.assertListEqual(sorted(_row["id"] for _row in _client.rows), list(range(20, 30)) + [43])
+                    self.assertEqual(_result.skipped, 89)
+                else:
+                    # Load jobs fail file by file, so the row was lost with its file
+                    self.assertListEqual(sorted(_row["id"] for _row in _client.rows), list(range(20, 30)))
+                    self.assertEqual(_result.skipped, 90)
+
+                self.assertTrue(_result)
+
+    def test_load_bigquery_table_interrupted(self):
+        _table = bigquery.Table("project.dataset.table", schema=[bigquery.SchemaField("id", "INTEGER"), bigquery.SchemaField("name", "STRING")])
+
+        def _data():
+            for _id in range(200):
+                # A row that cannot fit into any request stops the load part way
+                yield {"id": _id, "name": "x" * (2000 if (_id == 125) else 10)}
+
+        for _method in (LoadMethod.STREAMING, LoadMethod.BATCH_JSON):
+            with tempfile.TemporaryDirectory() as _directory:
+                _path = os.path.join(_directory, "journal.jsonl")
+
+                _client = FakeBigQueryClient(_table)
+                _result = load_bigquery_table(
+                    _client,
+                    "project.dataset.table",
+                    _data(),
+                    method=_method,
+                    limits=RequestLimits(None, 10, 1000),
+                    concurrency=4,
+                    journal=_path,
+                )
+
+                # The chunks in flight when the row was reached are all accounted for
+                self.assertIsInstance(_result, WarehouseTableLoadIncomplete)
+                self.assertIsInstance(_result.exception, WarehouseRowOversize)
+                self.assertEqual(_result.result.loaded, 120)
+                self.assertListEqual(sorted(_row["id"] for _row in _client.rows), list(range(120)))
+
+                # ...and committed, so that they are not sent again
+                _client = FakeBigQueryClient(_table)
+                _result = load_bigquery_table(
+                    _client,
+                    "project.dataset.table",
+                    _data(),
+                    method=_method,
+                    limits=RequestLimits(None, 10, 1000),
+                    concurrency=4,
+                    journal=_path,
+                )
+
+                self.assertIsInstance(_result.exception, WarehouseRowOversize)
+                self.assertEqual(_result.result.skipped, 120)
+                self.assertListEqual(_client.rows, [])
+
+    def test_load_bigquery_table_batch(self):
+        _data = [ {"id": _id, "name": f"row {_id}"} for _id in range(100) ]
+        _table = bigquery.Table(
+            "project.dataset.table",
+            schema=[bigquery.SchemaField("id", "INTEGER"), bigquery.SchemaField("name", "STRING")],
+        )
+
+        for _method in (LoadMethod.BATCH_JSON, LoadMethod.BATCH_PARQUET):
+            _client = FakeBigQueryClient(_table)
+
+            with tempfile.TemporaryDirectory() as _directory, \
+                mock.patch.object(tempfile, "tempdir", _directory):
+                _result = load_bigquery_table(
+                    _client,
+                    "project.dataset.table",
+                    _data,
+                    method=_method,
+                    write_disposition=WriteDisposition.WRITE_TRUNCATE,
+                    limits=RequestLimits(None, 30, None),
+                    concurrency=2,
+                )
+
+                # Temporary files are removed once loaded
+                self.assertListEqual(os.listdir(_directory), [])
+
+            self.assertEqual(_result.loaded, 100)
+            self.assertListEqual(sorted(_client.rows, key=lambda _row: _row["id"]), _data)
+
+            # Only the first job replaces the table; the rest append to it
+            self.assertListEqual(
+                [ _job.write_disposition for _job in _client.jobs ],
+                ["WRITE_TRUNCATE", "WRITE_APPEND", "WRITE_APPEND", "WRITE_APPEND"],
+            )
+
+            if (_method is LoadMethod.BATCH_JSON):
+                self.assertListEqual(_client.jobs[0].schema, _table.schema)
+            else:
+                self.assertEqual(_client.jobs[0].source_format, bigquery.SourceFormat.PARQUET)
+
+    def test_load_bigquery_table_schema_cache(self):
+        _data = [ {"id": _id} for _id in range(10) ]
+        _client = FakeBigQueryClient()
+
+        with tempfile.TemporaryDirectory() as _directory:
+            # The table is created, and cached
+            self.assertTrue(load_bigquery_table(_client, "project.dataset.table", _data, method=LoadMethod.STREAMING, schema_cache=_directory))
+            self.assertListEqual(SchemaCache(_directory).get("project.dataset.table").schema, [ _field.to_api_repr() for _field in _client.table.schema ])
+
+            # The next load takes it from the cache, without fetching it
+            with mock.patch.object(_client, "get_table", side_effect=AssertionError("Table fetched")), \
+                mock.patch.object(_client, "create_table", side_effect=AssertionError("Table created")):
+                self.assertTrue(load_bigquery_table(_client, "project.dataset.table", _data, method=LoadMethod.STREAMING, schema_cache=_directory))
+
+            self.assertEqual(len(_client.rows), 20)
+
+    def test_load_bigquery_table_schema_cache_refresh(self):
+        _table = bigquery.Table(
+            "project.dataset.table",
+            schema=[bigquery.SchemaField("id", "INTEGER"), bigquery.SchemaField("text", "STRING")],
+        )
+        _table._properties["etag"] = "changed"
+        _client = FakeBigQueryClient(_table)
+        _data = [ {"id": _id, "text": str(_id)} for _id in range(10) ]
+
+        with tempfile.TemporaryDirectory() as _directory:
+            _cache = SchemaCache(_directory)
+            _cache.put("project.dataset.table", [{"name":"id", "type":"INTEGER", "mode":"NULLABLE"}], etag="cached")
+
+            # A load that succeeds trusts the cache
+            with mock.patch.object(_client, "get_table", wraps=_client.get_table) as _get_table:
+                self.assertTrue(load_bigquery_table(_client, "project.dataset.table", _data, method=LoadMethod.STREAMING, schema_cache=_cache))
+                _get_table.assert_not_called()
+
+            # A load that fails checks the etag, and caches the table again as it changed
+            _client.errors = {3: "invalid"}
+            self.assertFalse(load_bigquery_table(_client, "project.dataset.table", _data, method=LoadMethod.STREAMING, schema_cache=_cache))
+
+            _entry = _cache.get("project.dataset.table")
+            self.assertEqual(_entry.etag, "changed")
+            self.assertListEqual([ _field["name"] for _field in _entry.schema ], ["id", "text"])
+
+            # A table dropped elsewhere is removed from the cache
+            _client.table = None
+            load_bigquery_table(_client, "project.dataset.table", _data, method=LoadMethod.STREAMING, schema_cache=_cache)
+            self.assertIsNone(_cache.get("project.dataset.table"))
+
+    def test_load_bigquery_table_dataframe_schema(self):
+        _dataframe = pd.DataFrame({
+            "id": np.arange(1000),
+            "value": np.linspace(0, 1, 1000),
+            "name": [ f"row {_id}" for _id in range(1000) ],
+            "created at": pd.date_range("2022-01-01", periods=1000, freq="h"),
+        })
+        _client = FakeBigQueryClient()
+
+        # The schema comes from the dtypes, without scanning the records the DataFrame is prepared into
+        with mock.patch(
+            "load_datawarehouse.bigquery.schema.get_schema_from_records",
+            side_effect=AssertionError("Records scanned"),
+        ):
+            _result = load_bigquery_table(_client, "project.dataset.table", _dataframe, method=LoadMethod.STREAMING)
+
+        self.assertEqual(_result.loaded, 1000)
+        self.assertListEqual(
+            [ (_field.name, _field.field_type) for _field in _client.table.schema ],
+            [ ("id", "INTEGER"), ("value", "FLOAT"), ("name", "STRING"), ("created_at", "DATETIME") ],
+        )
+
+    def test_load_bigquery_table_missing_values(self):
+        _dataframe = pd.DataFrame({
+            "id": np.arange(100),
+            "value": [ np.nan if (_id % 3 == 0) else float(_id) for _id in range(100) ],
+            "ratio": [ np.inf if (_id % 7 == 0) else 0.5 for _id in range(100) ],
+            "created_at": [ pd.NaT if (_id % 5 == 0) else pd.Timestamp("2022-01-01") for _id in range(100) ],
+        })
+        _client = FakeBigQueryClient()
+
+        _result = load_bigquery_table(
+            _client,
+            "project.dataset.table",
+            _dataframe,
+            limits=RequestLimits(max_rows=30),
+            method=LoadMethod.STREAMING,
+        )
+
+        self.assertEqual(_result.loaded, 100)
+        self.assertEqual(_result.failed, 0)
+
+        _rows = sorted(_client.rows, key=lambda _row: _row["id"])
+        self.assertListEqual(
+            [ _row["value"] for _row in _rows ],
+            [ None if (_id % 3 == 0) else float(_id) for _id in range(100) ],
+        )
+        self.assertListEqual(
+            [ _row["ratio"] for _row in _rows ],
+            [ None if (_id % 7 == 0) else 0.5 for _id in range(100) ],
+        )
+        self.assertListEqual(
+            [ _row["created_at"] for _row in _rows ],
+            [ None if (_id % 5 == 0) else "2022-01-01T00:00:00.000000" for _id in range(100) ],
+        )
+
+    def test_amap_bounded(self):
+        _running = []
+        _peak = []
+
+        async def _func(item):
+            _running.append(item)
+            _peak.append(len(_running))
+            await asyncio.sleep(0.001)
+            _running.remove(item)
+
+            if (item % 10 == 3):
+                raise ValueError(item)
+            return item * 2
+
+        async def _collect():
+            return [
+                _pair async for _pair in amap_bounded(
+                    _func,
+                    aiter_in_executor(range(50)),
+                    concurrency=4,
+                )
+            ]
+
+        _results = asyncio.run(_collect())
+
+        self.assertListEqual([_item for _item, _ in _results], list(range(50)))
+        for _item, _result in _results:
+            if (_item % 10 == 3):
+                self.assertIsInstance(_result, ValueError)
+            else:
+                self.assertEqual(_result, _item * 2)
+
+        self.assertEqual(max(_peak), 4)
+
+        # A shared semaphore bounds the calls in flight across concurrent runs
+        _running.clear()
+        _peak.clear()
+
+        async def _collect_all():
+            _semaphore = asyncio.Semaphore(3)
+
+            async def _collect_one(start):
+                return [
+                    _pair async for _pair in amap_bounded(
+                        _func,
+                        range(start, start+20),
+                        concurrency=2,
+                        semaphore=_semaphore,
+                    )
+                ]
+
+            return await asyncio.gather(*(_collect_one(_start) for _start in (0, 100, 200)))
+
+        _results = asyncio.run(_collect_all())
+
+        self.assertListEqual([ len(_pairs) for _pairs in _results ], [20, 20, 20])
+        self.assertEqual(max(_peak), 3)
+
+    def test_aload_bigquery_table(self):
+        _lock = threading.Lock()
+        _running = [0]
+        _peak = [0]
+
+        class SlowBigQueryClient(FakeBigQueryClient):
+            def _call_api(self, retry, **kwargs):
+                with _lock:
+                    _running[0] += 1
+                    _peak[0] = max(_peak[0], _running[0])
+
+                time.sleep(0.01)
+
+                try:
+                    return super()._call_api(retry, **kwargs)
+                finally:
+                    with _lock:
+                        _running[0] -= 1
+
+        _clients = [ SlowBigQueryClient() for _ in range(4) ]
+
+        async def _load_all():
+            _semaphore = asyncio.Semaphore(3)
+
+            return await asyncio.gather(*(
+                aload_bigquery_table(
+                    _client,
+                    f"project.dataset.table_{_index}",
+                    ( {"id": _id, "value": float(_id)} for _id in range(1000) ),
+                    limits=RequestLimits(max_rows=50),
+                    concurrency=2,
+                    semaphore=_semaphore,
+                )
+                for _index, _client in enumerate(_clients)
+            ))
+
+        _results = asyncio.run(_load_all())
+
+        for _result, _client in zip(_results, _clients):
+            self.assertEqual(_result.loaded, 1000)
+            self.assertListEqual(sorted(_row["id"] for _row in _client.rows), list(range(1000)))
+
+        self.assertGreater(_peak[0], 1)
+        self.assertLessEqual(_peak[0], 3)
+
     
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file